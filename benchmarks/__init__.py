@@ -0,0 +1,6 @@
+"""
+Performance benchmarks of the tradertools engines and chart renderers.
+
+Run from the repository root with `python -m benchmarks` (see the README). Nothing here imports
+Streamlit: the cases call the same functions the pages do.
+"""
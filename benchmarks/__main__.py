@@ -0,0 +1,61 @@
+"""
+Command line entry point: `python -m benchmarks --help`.
+"""
+import argparse
+import os
+import sys
+
+from benchmarks.harness import (DEFAULT_MEMORY_THRESHOLD, DEFAULT_REPEAT, DEFAULT_TIME_THRESHOLD, find_regressions,
+                                format_result, load_baseline, machine_info, run_cases, save_baseline)
+from benchmarks.suite import PRESETS, benchmark_cases
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Benchmark the Monte Carlo engines, sizing kernels and chart renderers.")
+    parser.add_argument('--preset', choices=list(PRESETS), default='quick', help="Size matrix to run (default: quick).")
+    parser.add_argument('--filter', default='', help="Only run cases whose name contains this text.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline file to compare with or save to.")
+    parser.add_argument('--save', action='store_true', help="Save the results as the new baseline instead of comparing.")
+    parser.add_argument('--time-threshold', type=float, default=DEFAULT_TIME_THRESHOLD,
+                        help="Allowed slowdown as a fraction of the baseline time (default: %(default)s).")
+    parser.add_argument('--memory-threshold', type=float, default=DEFAULT_MEMORY_THRESHOLD,
+                        help="Allowed peak memory increase as a fraction of the baseline (default: %(default)s).")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Maximum timed samples per case; the median is kept.")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the peak memory measurements.")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in benchmark_cases(args.preset) if args.filter in case.name]
+    print(f"Running {len(cases)} cases of the '{args.preset}' preset")
+    results = run_cases(cases, repeat=args.repeat, memory=not args.no_memory)
+
+    if args.save:
+        save_baseline(args.baseline, results, args.preset)
+        print(f"Saved the baseline to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save to create one.")
+        return 0
+    if baseline.get('machine') != machine_info():
+        print("Warning: the baseline was measured on a different machine or environment:", baseline.get('machine'))
+
+    print("\nCompared with the baseline:")
+    for name, result in results.items():
+        print(format_result(name, result, baseline['results'].get(name)))
+    regressions = find_regressions(results, baseline['results'], args.time_threshold, args.memory_threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s):")
+        for regression in regressions:
+            print("  " + regression)
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Throughput benchmark of the E*Trade Web Alerts conversion: `python -m benchmarks.alerts_throughput`.
+
+Generates an alerts export of realistic shape (executions split in partial fills, order placements,
+cancellations and rejections over a few months of sessions) and converts it twice: with the
+reference parser, the way the Tradervue page used to (`readlines`, then a regex search and a
+`strptime` per line), and with the streaming pipeline of `tradertools.tradervue`. Both outputs must
+be identical. Parsing is also measured alone, over lines already in memory, and the command exits
+with status 1 when its speedup is below the target.
+"""
+import argparse
+from io import BytesIO, StringIO
+import random
+import sys
+import time
+
+from tradertools import tradervue
+from tradertools.tradervue import (aggregate_trades, convert_alerts, format_trade, parse_trade_line,
+                                   parse_trade_line_reference, write_generic_import)
+
+
+DEFAULT_NUM_LINES = 1000000
+
+# Default minimum speedup of the parser over the reference parser
+DEFAULT_TARGET_SPEEDUP = 5.0
+
+SYMBOLS = ('AAPL', 'AMD', 'TSLA', 'NVDA', 'SPY', 'QQQ', 'F', 'SOFI', 'PLTR', 'MARA')
+
+
+def alert_lines(num_lines, num_sessions=60, seed=0):
+    # Alerts of orders in time order: each order is placed, then filled in one to four parts or cancelled
+    rng = random.Random(seed)
+    lines = []
+    while len(lines) < num_lines:
+        session = len(lines) * num_sessions // num_lines
+        date = f"{1 + session // 20:02d}/{1 + session % 20:02d}/24"
+        # Most trading happens in the first hour and a half
+        minute = 9 * 60 + 30 + int(rng.expovariate(1 / 45)) % 390
+        hour_minute = f"{(minute // 60 - 1) % 12 + 1:02d}:{minute % 60:02d} {'AM' if minute < 720 else 'PM'}"
+        side = rng.choice(('Buy', 'Sell', 'Sell Short', 'Buy to cover'))
+        symbol = rng.choice(SYMBOLS)
+        price = f"{rng.randint(100, 50000) / 100:.2f}".rstrip('0').rstrip('.')
+        quantity = rng.choice((10, 50, 100, 200, 500, 1000))
+        lines.append(f"{date} {hour_minute} ET Your order to {side} {quantity} {symbol} has been placed.")
+        outcome = rng.random()
+        if outcome < 0.1:
+            lines.append(f"{date} {hour_minute} ET {side} {quantity} {symbol} Cancelled @ ${price}")
+        elif outcome < 0.13:
+            lines.append(f"{date} {hour_minute} ET {side} {quantity} {symbol} Rejected @ ${price}")
+        else:
+            for _ in range(rng.randint(1, 4)):
+                fill = max(1, quantity // rng.randint(1, 4))
+                lines.append(f"{date} {hour_minute} ET {side} {fill} {symbol} Executed @ ${price}")
+        lines.append("")
+    return lines[:num_lines]
+
+
+def reference_conversion(file_obj):
+    # The conversion as the page used to do it: the whole file in memory and the reference parser
+    trade_lines = [line.decode('utf-8') if isinstance(line, bytes) else line for line in file_obj.readlines()]
+    trades = (parse_trade_line_reference(line) for line in trade_lines
+              if 'Cancelled' not in line and 'Rejected' not in line)
+    return [format_trade(trade) for trade in aggregate_trades(trade for trade in trades if trade)]
+
+
+def clear_caches():
+    # Every run starts without memoized timestamps, like a fresh upload
+    for cache in (tradervue._alert_time, tradervue._alert_date, tradervue._alert_time_of_day):
+        cache.cache_clear()
+
+
+def measure_parsing(functions, lines, repeat):
+    # Best wall time of every function parsing lines already in memory. The functions take turns, so that a
+    # slow period of the machine does not weigh on one of them only
+    best = [None] * len(functions)
+    for _ in range(repeat):
+        for i, function in enumerate(functions):
+            clear_caches()
+            start = time.perf_counter()
+            for line in lines:
+                function(line)
+            elapsed = time.perf_counter() - start
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return best
+
+
+def measure_conversion(function, data, repeat):
+    # Best wall time of converting the data, and the Generic Import text produced
+    best = None
+    for _ in range(repeat):
+        clear_caches()
+        buffer = StringIO()
+        start = time.perf_counter()
+        write_generic_import(function(BytesIO(data)), buffer)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, buffer.getvalue()
+
+
+def describe(name, num_lines, elapsed):
+    return f"{name:>20}: {num_lines / elapsed:>12,.0f} lines/s ({elapsed:.2f} s)"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.alerts_throughput",
+                                     description="Measure the throughput of the E*Trade Web Alerts conversion.")
+    parser.add_argument("--lines", type=int, default=DEFAULT_NUM_LINES, help="Number of alert lines.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the best is kept.")
+    parser.add_argument("--target-speedup", type=float, default=DEFAULT_TARGET_SPEEDUP,
+                        help="Minimum parsing speedup over the reference (default: %(default)s).")
+    args = parser.parse_args(argv)
+
+    lines = alert_lines(args.lines)
+    data = '\n'.join(lines).encode()
+    print(f"{len(lines):,} alert lines, {len(data) / 1e6:.1f} MB")
+
+    # Parsing alone, over lines already in memory, then the whole conversion of the uploaded bytes
+    reference_time, parser_time = measure_parsing((parse_trade_line_reference, parse_trade_line), lines, args.repeat)
+    print(describe("reference parser", len(lines), reference_time))
+    print(describe("parser", len(lines), parser_time))
+    reference_conversion_time, reference_text = measure_conversion(reference_conversion, data, args.repeat)
+    pipeline_time, pipeline_text = measure_conversion(convert_alerts, data, args.repeat)
+    print(describe("reference conversion", len(lines), reference_conversion_time))
+    print(describe("pipeline", len(lines), pipeline_time))
+
+    if pipeline_text != reference_text:
+        print("The pipeline output differs from the reference")
+        return 1
+    speedup = reference_time / parser_time
+    print(f"Parsing speedup {speedup:.1f}x, conversion speedup {reference_conversion_time / pipeline_time:.1f}x, "
+          f"{pipeline_text.count(chr(10)):,} aggregated executions, identical output")
+    if speedup < args.target_speedup:
+        print(f"Parsing speedup is below the {args.target_speedup}x target")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Equivalence check and benchmark of the fee engine: `python -m benchmarks.fee_equivalence`.
+
+Computes the fees of two sets of random executions with `transaction_fees` and, one by one, with the
+Decimal reference `transaction_fee_reference`; every fee text must be identical. The mixed set has many
+edge cases: quantities around the FINRA TAF maximum, prices with up to six decimals and notionals too
+large for int64, trade dates on and around every change of rates. The typical set looks like an
+import (round lots, cent prices, a few years of trade dates) and is the one the speedup is measured on.
+Exits with status 1 on any difference or when the speedup is below `--target-speedup`.
+"""
+import argparse
+from datetime import date, timedelta
+import random
+import sys
+import time
+
+from tradertools.fees import (FINRA_TAF_SCHEDULE, FIRST_FEE_DATE, SEC_FEE_SCHEDULE, transaction_fee_reference,
+                              transaction_fees)
+
+
+DEFAULT_NUM_EXECUTIONS = 200000
+
+# Default minimum speedup of the engine over the reference, on typical executions
+DEFAULT_TARGET_SPEEDUP = 10.0
+
+
+def mixed_executions(num_executions, seed=0):
+    # Quantities, prices, sales and trade dates of random executions, with many edge cases
+    rng = random.Random(seed)
+    first_date = date.fromisoformat(FIRST_FEE_DATE)
+    changes = [date.fromisoformat(row[0]) for row in SEC_FEE_SCHEDULE + FINRA_TAF_SCHEDULE]
+    quantities, prices, sales, dates = [], [], [], []
+    for _ in range(num_executions):
+        quantities.append(rng.choice((0, 1, 7, 100, 1000, 43793, 43794, 50000, 50001,
+                                      rng.randint(1, 100000), rng.randint(1, 10 ** 9))))
+        decimals = rng.randint(0, 6)
+        prices.append(rng.choice((f"{rng.randint(0, 10 ** 6) / 100:.2f}",
+                                  f"{rng.randint(0, 10 ** 10) / 10 ** decimals:.{decimals}f}",
+                                  '0.0001', '12.5', '012.50', '1E+2', '99999.999999')))
+        sales.append(rng.random() < 0.5)
+        if rng.random() < 0.3:
+            dates.append(max(first_date, rng.choice(changes) + timedelta(days=rng.choice((-1, 0, 1)))))
+        else:
+            dates.append(first_date + timedelta(days=rng.randrange(5 * 365)))
+    return quantities, prices, sales, dates
+
+
+def typical_executions(num_executions, seed=0):
+    # Quantities, prices, sales and trade dates of random executions like those of an import
+    rng = random.Random(seed)
+    quantities = [rng.choice((10, 50, 100, 200, 500, 1000, 5000)) for _ in range(num_executions)]
+    prices = [f"{rng.randint(100, 50000) / 100:.2f}" for _ in range(num_executions)]
+    sales = [rng.random() < 0.5 for _ in range(num_executions)]
+    dates = [date.fromisoformat(FIRST_FEE_DATE) + timedelta(days=rng.randrange(3 * 365)) for _ in range(num_executions)]
+    return quantities, prices, sales, dates
+
+
+def compare(name, executions):
+    # Wall times of the reference and of the engine, or None when their fees differ
+    quantities, prices, sales, dates = executions
+    start = time.perf_counter()
+    reference_fees = [str(transaction_fee_reference(quantity, price, is_sale, trade_date))
+                      for quantity, price, is_sale, trade_date in zip(quantities, prices, sales, dates)]
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fees = transaction_fees(quantities, prices, sales, dates).tolist()
+    engine_time = time.perf_counter() - start
+
+    mismatches = [i for i, (fee, reference_fee) in enumerate(zip(fees, reference_fees)) if fee != reference_fee]
+    if mismatches:
+        i = mismatches[0]
+        print(f"{name}: {len(mismatches):,} fees differ from the reference, first: quantity {quantities[i]}, price "
+              f"{prices[i]}, sale {sales[i]}, date {dates[i]}: {fees[i]} instead of {reference_fees[i]}")
+        return None
+    print(f"{name:>8}: reference {len(fees) / reference_time:>10,.0f} executions/s, engine "
+          f"{len(fees) / engine_time:>12,.0f} executions/s, speedup {reference_time / engine_time:.1f}x, "
+          f"{len(fees):,} identical fees")
+    return reference_time, engine_time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.fee_equivalence",
+                                     description="Compare the fee engine with the Decimal reference.")
+    parser.add_argument("--executions", type=int, default=DEFAULT_NUM_EXECUTIONS,
+                        help="Number of random executions.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random executions.")
+    parser.add_argument("--target-speedup", type=float, default=DEFAULT_TARGET_SPEEDUP,
+                        help="Minimum speedup over the reference (default: %(default)s).")
+    args = parser.parse_args(argv)
+
+    mixed = compare("mixed", mixed_executions(args.executions, args.seed))
+    typical = compare("typical", typical_executions(args.executions, args.seed))
+    if mixed is None or typical is None:
+        return 1
+    reference_time, engine_time = typical
+    if reference_time / engine_time < args.target_speedup:
+        print(f"Speedup is below the {args.target_speedup}x target")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
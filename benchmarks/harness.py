@@ -0,0 +1,193 @@
+"""
+A small asv-style harness: measures cases, stores a baseline file and flags regressions against it.
+
+Every case is measured twice: wall time as the median of several timed samples, then peak memory in
+one more run under `tracemalloc` (NumPy reports its array buffers to it). Setup work (such as
+simulating the paths a chart renders) happens before either measurement and is not counted.
+
+Short cases are called several times per sample, so that no sample is shorter than
+`MIN_SAMPLE_SECONDS`. The spread of the samples is kept with the median: a case only regresses when it
+got slower by more than the spread of both measurements, so one noisy run does not flag it.
+"""
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+
+# Maximum and minimum number of timed samples of a case, and the time after which no more samples are
+# started once the minimum is reached
+DEFAULT_REPEAT = 7
+MIN_REPEAT = 3
+MAX_SECONDS_PER_CASE = 5.0
+
+# Shortest duration of one timed sample
+MIN_SAMPLE_SECONDS = 0.05
+
+# Default regression thresholds, as fractions of the baseline value
+DEFAULT_TIME_THRESHOLD = 0.25
+DEFAULT_MEMORY_THRESHOLD = 0.10
+
+# Differences below these are measurement noise and never count as regressions
+MIN_TIME_DELTA_S = 0.005
+MIN_MEMORY_DELTA_MB = 1.0
+
+
+class Case:
+    """
+    One benchmark: `setup()` prepares the inputs and returns the zero-argument function to measure.
+    """
+
+    def __init__(self, name, setup):
+        self.name = name
+        self.setup = setup
+
+
+# Function to time a function as the median of several samples
+def time_function(function, repeat=DEFAULT_REPEAT, max_seconds=MAX_SECONDS_PER_CASE,
+                  min_sample_seconds=MIN_SAMPLE_SECONDS):
+    """
+    Times up to `repeat` samples of `function`, after an untimed warm-up run that also sets how many
+    calls make up a sample (enough to last `min_sample_seconds`). At least `MIN_REPEAT` samples are
+    taken, and no new one starts after that once `max_seconds` have been spent. A function slower
+    than `max_seconds` is only timed once.
+
+    Returns:
+    - The median time of one call and the spread (slowest minus fastest) of the samples, in seconds.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    function()
+    first = time.perf_counter() - start
+    number = max(1, int(min_sample_seconds / max(first, 1e-9)) + 1) if first < min_sample_seconds else 1
+
+    samples = []
+    spent = 0.0
+    while len(samples) < repeat:
+        if samples and (first >= max_seconds or (len(samples) >= MIN_REPEAT and spent >= max_seconds)):
+            break
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        spent += elapsed
+        samples.append(elapsed / number)
+    return float(np.median(samples)), max(samples) - min(samples)
+
+
+# Function to measure the peak memory allocated while a function runs
+def peak_memory_mb(function):
+    """
+    Returns the peak memory traced by `tracemalloc` during one run of `function`, in megabytes.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+# Function to measure a list of benchmark cases
+def run_cases(cases, repeat=DEFAULT_REPEAT, memory=True, report=print):
+    """
+    Measures every case and returns {case name: {'time_s': ..., 'time_spread_s': ..., 'peak_mb': ...}}
+    (see `time_function`). 'peak_mb' is None when `memory` is False. `report` is called with one line
+    per finished case.
+    """
+    results = {}
+    for case in cases:
+        function = case.setup()
+        time_s, time_spread_s = time_function(function, repeat=repeat)
+        result = {'time_s': time_s, 'time_spread_s': time_spread_s,
+                  'peak_mb': peak_memory_mb(function) if memory else None}
+        results[case.name] = result
+        del function
+        report(format_result(case.name, result))
+    return results
+
+
+def format_result(name, result, baseline=None):
+    # One report line: time, memory and, with a baseline, their ratios to it
+    line = f"{name:<60} {result['time_s'] * 1000:>11.1f} ms ±{result.get('time_spread_s', 0.0) * 1000 / 2:.1f}"
+    if result['peak_mb'] is not None:
+        line += f" {result['peak_mb']:>10.1f} MB"
+    if baseline is not None:
+        line += f"   x{result['time_s'] / max(baseline['time_s'], 1e-12):.2f} time"
+        if result['peak_mb'] is not None and baseline.get('peak_mb') is not None:
+            line += f", x{result['peak_mb'] / max(baseline['peak_mb'], 1e-12):.2f} memory"
+    return line
+
+
+# Function to describe the machine the results were measured on
+def machine_info():
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+    }
+
+
+# Function to write results to a baseline file
+def save_baseline(path, results, preset):
+    """
+    Writes the results with the machine description, merged into the existing baseline file so that
+    cases of other presets are kept.
+    """
+    baseline = load_baseline(path) or {'results': {}}
+    baseline['results'].update(results)
+    baseline.update(machine=machine_info(), preset=preset)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+# Function to read a baseline file
+def load_baseline(path):
+    """
+    Returns the baseline dictionary, or None when the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+# Function to find the cases that got slower or use more memory than the baseline
+def find_regressions(results, baseline_results, time_threshold=DEFAULT_TIME_THRESHOLD,
+                     memory_threshold=DEFAULT_MEMORY_THRESHOLD):
+    """
+    Compares results with baseline results of the same cases.
+
+    Args:
+    - results, baseline_results: Dictionaries returned by `run_cases`.
+    - time_threshold: Allowed slowdown, as a fraction of the baseline time (0.25 allows 25% slower). A
+      slowdown within the spread of the two measurements (or `MIN_TIME_DELTA_S`) is noise and allowed.
+    - memory_threshold: Allowed peak memory increase, as a fraction of the baseline peak.
+
+    Returns:
+    - A list of messages, one per regression. Cases missing from the baseline are skipped.
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline = baseline_results.get(name)
+        if baseline is None:
+            continue
+        slower = result['time_s'] - baseline['time_s']
+        noise = max(MIN_TIME_DELTA_S, result.get('time_spread_s', 0.0) + baseline.get('time_spread_s', 0.0))
+        if slower > noise and result['time_s'] > baseline['time_s'] * (1 + time_threshold):
+            regressions.append(f"{name}: {result['time_s'] * 1000:.1f} ms vs {baseline['time_s'] * 1000:.1f} ms")
+        if result['peak_mb'] is None or baseline.get('peak_mb') is None:
+            continue
+        larger = result['peak_mb'] - baseline['peak_mb']
+        if larger > MIN_MEMORY_DELTA_MB and result['peak_mb'] > baseline['peak_mb'] * (1 + memory_threshold):
+            regressions.append(f"{name}: {result['peak_mb']:.1f} MB vs {baseline['peak_mb']:.1f} MB peak memory")
+    return regressions
@@ -0,0 +1,88 @@
+"""
+Throughput benchmark of the Power E*Trade CSV conversion: `python -m benchmarks.power_etrade_throughput`.
+
+Generates an orders export of realistic shape (filled, cancelled and open orders of a few symbols over
+three years from June 2022, all within the fee schedules) and converts it with `convert_power_etrade_csv`. The row by row reference is much slower,
+so it only converts the first `--reference-rows` rows, which must give identical lines. Exits with
+status 1 when the full conversion takes longer than the target.
+"""
+import argparse
+from io import BytesIO
+import random
+import sys
+import time
+
+from tradertools.tradervue import convert_power_etrade_csv, process_power_etrade_csv_reference
+
+
+DEFAULT_NUM_ROWS = 1000000
+DEFAULT_REFERENCE_ROWS = 50000
+
+# Default longest accepted conversion time of the full export, in seconds
+DEFAULT_TARGET_SECONDS = 10.0
+
+SYMBOLS = ('AAPL', 'AMD', 'TSLA', 'NVDA', 'SPY', 'QQQ', 'F', 'SOFI', 'PLTR', 'MARA')
+
+DESCRIPTIONS = ('Buy {quantity} {symbol} to Open', 'Sell {quantity} {symbol} to Close',
+                'Sell {quantity} {symbol} to Open', 'Buy {quantity} {symbol} to Close')
+
+
+def power_etrade_csv(num_rows, seed=0):
+    # Orders export: a title line, the header, then one order per row in time order
+    rng = random.Random(seed)
+    lines = ["Orders for account XXXX-1234",
+             "Order Number,Symbol,Description,Status,Fill,Order Type,Limit Price,Time"]
+    for i in range(num_rows):
+        day = i * 750 // num_rows
+        date = f"{6 + day // 250 % 12:02d}/{1 + day % 28:02d}/{2022 + day // 250}"
+        second = 9 * 3600 + 30 * 60 + rng.randrange(6 * 3600 + 30 * 60)
+        hour = second // 3600
+        clock = f"{(hour - 1) % 12 + 1:02d}:{second // 60 % 60:02d}:{second % 60:02d} {'AM' if hour < 12 else 'PM'}"
+        symbol = rng.choice(SYMBOLS)
+        quantity = rng.choice((10, 50, 100, 200, 500, 1000, 5000))
+        price = f"{rng.randint(100, 50000) / 100:.2f}"
+        status = rng.choices(('Executed', 'Cancelled', 'Open'), weights=(6, 3, 1))[0]
+        fill = f"{quantity} @ {price}" if status == 'Executed' else '--'
+        description = rng.choice(DESCRIPTIONS).format(quantity=quantity, symbol=symbol)
+        lines.append(f'{100000 + i},{symbol},{description},{status},{fill},Limit,{price},"{date}, {clock}"')
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.power_etrade_throughput",
+                                     description="Measure the throughput of the Power E*Trade CSV conversion.")
+    parser.add_argument("--rows", type=int, default=DEFAULT_NUM_ROWS, help="Number of orders in the export.")
+    parser.add_argument("--reference-rows", type=int, default=DEFAULT_REFERENCE_ROWS,
+                        help="Number of orders also converted row by row, to compare.")
+    parser.add_argument("--target-seconds", type=float, default=DEFAULT_TARGET_SECONDS,
+                        help="Longest accepted conversion time of the export (default: %(default)s).")
+    args = parser.parse_args(argv)
+
+    data = power_etrade_csv(args.rows)
+    print(f"{args.rows:,} orders, {len(data) / 1e6:.1f} MB")
+
+    reference_data = power_etrade_csv(args.reference_rows)
+    start = time.perf_counter()
+    reference_lines = process_power_etrade_csv_reference(BytesIO(reference_data))
+    reference_time = time.perf_counter() - start
+    if list(convert_power_etrade_csv(BytesIO(reference_data))) != reference_lines:
+        print("The vectorized conversion differs from the reference")
+        return 1
+    print(f"{'reference':>11}: {args.reference_rows / reference_time:>12,.0f} rows/s "
+          f"({args.reference_rows:,} rows in {reference_time:.2f} s)")
+
+    start = time.perf_counter()
+    num_lines = sum(1 for _ in convert_power_etrade_csv(BytesIO(data)))
+    elapsed = time.perf_counter() - start
+    print(f"{'vectorized':>11}: {args.rows / elapsed:>12,.0f} rows/s ({args.rows:,} rows in {elapsed:.2f} s, "
+          f"{num_lines:,} executions)")
+    print(f"Speedup {reference_time / args.reference_rows * args.rows / elapsed:.0f}x, identical output on the "
+          f"first {args.reference_rows:,} rows")
+    if elapsed > args.target_seconds:
+        print(f"Conversion is slower than the {args.target_seconds} s target")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Latency benchmark of the sizing service: `python -m benchmarks.sizing_latency`.
+
+Starts `tradertools.sizing_server` on a free local port and measures, over one kept-alive connection,
+the round trip of single-order requests and of batch requests. Every response is checked against
+`size_order`, so the service is also verified to return exactly what the page shows. Exits with status 1
+when the p99 latency per order is above the target.
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+from tradertools.sizing import ROUNDING_METHODS, size_order
+from tradertools.sizing_server import make_server
+
+
+# Default p99 latency target per order, in milliseconds
+DEFAULT_TARGET_MS = 1.0
+
+PERCENTILES = (50, 90, 99)
+
+
+def random_orders(num_orders, seed=0):
+    # Long and short orders with realistic prices, stops 0.5% to 5% away and various risks and roundings
+    rng = np.random.default_rng(seed)
+    entry = rng.uniform(1, 500, num_orders).round(2)
+    offset = rng.uniform(0.005, 0.05, num_orders)
+    is_long = rng.random(num_orders) < 0.5
+    stop = np.where(is_long, entry * (1 - offset), entry * (1 + offset)).round(2)
+    risk = rng.choice([25.0, 50.0, 100.0, 250.0], num_orders)
+    rounding = rng.choice(ROUNDING_METHODS, num_orders)
+    return [{"side": "Long" if is_long[i] else "Short", "entry": float(entry[i]), "stop": float(stop[i]),
+             "risk": float(risk[i]), "rounding": str(rounding[i])} for i in range(num_orders)]
+
+
+def post(connection, path, payload):
+    connection.request("POST", path, body=json.dumps(payload), headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def expected_result(order):
+    return size_order(order["entry"], order["stop"], order["side"], order["risk"], order["rounding"])
+
+
+def measure_single(connection, orders):
+    # Round trip of every order sent on its own; returns the latencies in milliseconds
+    latencies = []
+    for order in orders:
+        start = time.perf_counter()
+        status, result = post(connection, "/size", order)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if status != 200 or result != expected_result(order):
+            raise AssertionError(f"Unexpected response to {order}: {status} {result}")
+    return np.array(latencies)
+
+
+def measure_batch(connection, orders, batch_size):
+    # Round trip of batches of orders; returns the latencies per batch in milliseconds
+    latencies = []
+    for start_index in range(0, len(orders), batch_size):
+        batch = orders[start_index:start_index + batch_size]
+        start = time.perf_counter()
+        status, response = post(connection, "/size/batch", {"orders": batch})
+        latencies.append((time.perf_counter() - start) * 1000)
+        if status != 200 or response["results"] != [expected_result(order) for order in batch]:
+            raise AssertionError("Unexpected response to a batch request")
+    return np.array(latencies)
+
+
+def describe(latencies):
+    return ", ".join(f"p{p} {value:.3f} ms" for p, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.sizing_latency",
+                                     description="Measure the latency of the local sizing service.")
+    parser.add_argument("--orders", type=int, default=5000, help="Number of single-order requests.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Orders per batch request.")
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS,
+                        help="p99 latency target per order, in milliseconds (default: %(default)s).")
+    args = parser.parse_args(argv)
+
+    server = make_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    connection = http.client.HTTPConnection(*server.server_address)
+    try:
+        orders = random_orders(args.orders)
+        measure_single(connection, orders[:200])  # Warm-up
+        single = measure_single(connection, orders)
+        batch = measure_batch(connection, orders * 4, args.batch_size)
+    finally:
+        connection.close()
+        server.shutdown()
+        server.server_close()
+
+    per_order = batch / args.batch_size
+    print(f"Single order ({single.size:,} requests): {describe(single)}")
+    print(f"Batch of {args.batch_size} ({batch.size:,} requests): {describe(batch)}")
+    print(f"Batch, per order: {describe(per_order)}")
+    p99 = np.percentile(single, 99)
+    if p99 > args.target_ms:
+        print(f"p99 latency of single orders is above the {args.target_ms} ms target")
+        return 1
+    print(f"p99 latency of single orders is within the {args.target_ms} ms target; all responses match the page")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Benchmark cases over a matrix of run sizes (simulated paths x trades).
+
+- Engines: `monte_carlo_simulation` and `simulate_equity_curve`. Runs too large to hold as one
+  matrix are measured through their streaming counterparts, the way the pages run them.
+- Renders: the matplotlib PNG of `render_monte_carlo_chart` and the Vega-Lite spec of the interactive
+  chart, from paths simulated during setup.
+- Sizing: the engines of `sized_equity_curves`, each checked against the Python reference during setup,
+  and the reference itself on small sizes so that the speedup shows in the report.
+"""
+import altair as alt
+import numpy as np
+
+from tradertools.interactive import build_interactive_chart, interactive_chart_data
+from tradertools.montecarlo import monte_carlo_simulation, simulate_equity_curve, stream_equity_curve, stream_monte_carlo
+from tradertools.plotting import render_monte_carlo_chart
+from tradertools.sizing import sized_equity_curve_reference, sized_equity_curves, _sized_curves_numba
+
+from benchmarks.harness import Case
+
+
+# Master seed of every simulated input
+SEED = 42
+
+# Size matrices: simulated paths x trades, skipping runs with more path values than 'max_cells'
+PRESETS = {
+    'quick': {'paths': (100, 10_000), 'trades': (100, 1_000), 'max_cells': 10 ** 7},
+    'default': {'paths': (100, 10_000, 100_000), 'trades': (100, 1_000, 10_000), 'max_cells': 10 ** 8},
+    'full': {'paths': (100, 10_000, 100_000, 1_000_000), 'trades': (100, 1_000, 10_000), 'max_cells': None},
+}
+
+# Larger runs are simulated in streaming mode, since their full matrix would not fit in memory
+FULL_MATRIX_MAX_CELLS = 2 * 10 ** 7
+
+# Largest runs of the sizing engines, and of the much slower Python reference
+SIZING_MAX_CELLS = 2 * 10 ** 7
+REFERENCE_MAX_CELLS = 10 ** 6
+
+# Paths of every sizing run checked against the reference
+SIZING_CHECK_PATHS = 200
+
+# System parameters of the benchmarked runs
+MONTE_CARLO_PARAMETERS = {'avg_win': 2.0, 'avg_loss': -1.0, 'std_dev': 1.0, 'win_ratio': 0.45}
+EQUITY_CURVE_PARAMETERS = {'balance': 10000.0, 'risk_per_trade': 1.0, 'win_percent': 45.0, 'win_loss_ratio': 2.0,
+                           'risk_type': 'Percentage of Equity'}
+SIZING_PARAMETERS = {'balance': 10000.0, 'risk_percent': 1.0, 'win_loss_ratio': 2.0, 'stop_distance': 0.25,
+                     'rounding_method': 'Round nearest 10', 'max_risk': 500.0, 'losing_streak': 3, 'risk_cut': 0.5}
+
+
+def _sizes(preset):
+    # (paths, trades) pairs of a preset, smallest runs first
+    matrix = PRESETS[preset]
+    sizes = [(p, t) for p in matrix['paths'] for t in matrix['trades']
+             if matrix['max_cells'] is None or p * t <= matrix['max_cells']]
+    return sorted(sizes, key=lambda size: (size[0] * size[1], size))
+
+
+def _equity_curves(num_paths, num_trades):
+    return simulate_equity_curve(num_trades=num_trades, num_simulations=num_paths, seed=SEED, **EQUITY_CURVE_PARAMETERS)
+
+
+def engine_cases(preset):
+    cases = []
+    for num_paths, num_trades in _sizes(preset):
+        size = f"paths={num_paths}, trades={num_trades}"
+        if num_paths * num_trades <= FULL_MATRIX_MAX_CELLS:
+            monte_carlo = lambda p=num_paths, t=num_trades: lambda: monte_carlo_simulation(
+                num_trades=t, num_simulations=p, seed=SEED, **MONTE_CARLO_PARAMETERS)
+            equity_curve = lambda p=num_paths, t=num_trades: lambda: _equity_curves(p, t)
+            cases += [Case(f"monte_carlo_simulation({size})", monte_carlo),
+                      Case(f"simulate_equity_curve({size})", equity_curve)]
+        else:
+            monte_carlo = lambda p=num_paths, t=num_trades: lambda: stream_monte_carlo(
+                num_trades=t, num_simulations=p, seed=SEED, **MONTE_CARLO_PARAMETERS)
+            equity_curve = lambda p=num_paths, t=num_trades: lambda: stream_equity_curve(
+                num_trades=t, num_simulations=p, seed=SEED, **EQUITY_CURVE_PARAMETERS)
+            cases += [Case(f"stream_monte_carlo({size})", monte_carlo),
+                      Case(f"stream_equity_curve({size})", equity_curve)]
+    return cases
+
+
+def _render_png(num_paths, num_trades):
+    paths = _equity_curves(num_paths, num_trades)
+    return lambda: render_monte_carlo_chart(paths, None)
+
+
+def _render_interactive(num_paths, num_trades):
+    # Serialized with its data inline and no row limit, like Streamlit sends it to the browser
+    paths = _equity_curves(num_paths, num_trades)
+
+    def render():
+        with alt.data_transformers.disable_max_rows():
+            return build_interactive_chart(interactive_chart_data(paths, None)).to_json()
+    return render
+
+
+def render_cases(preset):
+    cases = []
+    for num_paths, num_trades in _sizes(preset):
+        if num_paths * num_trades > FULL_MATRIX_MAX_CELLS:
+            continue
+        size = f"paths={num_paths}, trades={num_trades}"
+        cases += [Case(f"render_monte_carlo_chart[png]({size})", lambda p=num_paths, t=num_trades: _render_png(p, t)),
+                  Case(f"render_monte_carlo_chart[interactive]({size})",
+                       lambda p=num_paths, t=num_trades: _render_interactive(p, t))]
+    return cases
+
+
+def _sizing_wins(num_paths, num_trades):
+    rng = np.random.default_rng(SEED)
+    return rng.random((num_paths, num_trades)) < EQUITY_CURVE_PARAMETERS['win_percent'] / 100
+
+
+def _sizing_engine(num_paths, num_trades, engine):
+    # Checks the engine against the reference on the first paths, which also compiles the Numba kernel
+    wins = _sizing_wins(num_paths, num_trades)
+    check = wins[:SIZING_CHECK_PATHS]
+    expected = sized_equity_curve_reference(check, **SIZING_PARAMETERS)
+    if not np.array_equal(sized_equity_curves(check, engine=engine, **SIZING_PARAMETERS), expected):
+        raise AssertionError(f"The {engine} sizing engine does not match sized_equity_curve_reference")
+    return lambda: sized_equity_curves(wins, engine=engine, **SIZING_PARAMETERS)
+
+
+def _sizing_reference(num_paths, num_trades):
+    wins = _sizing_wins(num_paths, num_trades)
+    return lambda: sized_equity_curve_reference(wins, **SIZING_PARAMETERS)
+
+
+def sizing_cases(preset):
+    engines = ('numba', 'numpy') if _sized_curves_numba is not None else ('numpy',)
+    cases = []
+    for num_paths, num_trades in _sizes(preset):
+        if num_paths * num_trades > SIZING_MAX_CELLS:
+            continue
+        size = f"paths={num_paths}, trades={num_trades}"
+        if num_paths * num_trades <= REFERENCE_MAX_CELLS:
+            cases.append(Case(f"sized_equity_curve_reference({size})",
+                              lambda p=num_paths, t=num_trades: _sizing_reference(p, t)))
+        cases += [Case(f"sized_equity_curves[{engine}]({size})",
+                       lambda p=num_paths, t=num_trades, e=engine: _sizing_engine(p, t, e))
+                  for engine in engines]
+    return cases
+
+
+# Function to list every benchmark case of a preset
+def benchmark_cases(preset='quick'):
+    """
+    Returns the engine, render and sizing cases of a preset of `PRESETS`.
+    """
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown preset: {preset}")
+    return engine_cases(preset) + render_cases(preset) + sizing_cases(preset)
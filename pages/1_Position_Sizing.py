@@ -1,5 +1,9 @@
+import base64
+from io import StringIO
+
 import streamlit as st
-from math import floor, ceil
+
+from tradertools.sizing import ROUNDING_METHODS, SizingGrid, load_watchlist_csv, size_watchlist
 
 # Setting up the page configuration
 st.set_page_config(page_title="Position Sizing · Tradertools", page_icon="🧮", layout="wide")
@@ -26,96 +30,87 @@ def add_logo():
 
 add_logo()
 
-# Function to apply rounding based on the selected method
-def apply_rounding(shares, method):
-    if method == "No Rounding":
-        return ceil(shares) 
-    elif method == "Round nearest 10":
-        return round(shares / 10) * 10
-    elif method == "Round nearest 50":
-        return round(shares / 50) * 50
-    elif method == "Round nearest 100":
-        return round(shares / 100) * 100
-    elif method == "Round nearest 500":
-        return round(shares / 500) * 500
-    elif method == "Round nearest 1000":
-        return round(shares / 1000) * 1000
-
-# Function to calculate the initial number of shares based on risk, stop loss, and rounding method
-def calculate_shares(risk_amount, entry_price, stop_loss_price, rounding_method, trade_type):
-    # Calcula la distancia de stop loss dependiendo del tipo de operación
-    if trade_type == "Long":
-        stop_loss_distance = entry_price - stop_loss_price
-    elif trade_type == "Short":
-        stop_loss_distance = stop_loss_price - entry_price
-    else:
-        raise ValueError("Invalid trade type specified.")
-    
-    if stop_loss_distance <= 0:
-        raise ValueError("Stop loss distance must be positive.")
-
-    number_of_shares = risk_amount / abs(stop_loss_distance)
-    return apply_rounding(number_of_shares, rounding_method)
-
+# Function to get the sizing grid around the current prices, computed again only when the inputs leave it
+def get_sizing_grid(key, risk_amount, entry_price, stop_loss_price, rounding_method, trade_type):
+    grid = st.session_state.get(key)
+    if grid is None or not grid.matches(risk_amount, rounding_method, trade_type) or grid.lookup(entry_price, stop_loss_price) is None:
+        grid = SizingGrid(risk_amount, entry_price, stop_loss_price, rounding_method, trade_type)
+        st.session_state[key] = grid
+    return grid
+
+# Function to display the sizing ladder of the current entry price
+def display_sizing_ladder(grid, entry_price):
+    with st.expander("Sizing Ladder"):
+        st.dataframe(grid.ladder(entry_price), hide_index=True, column_config={
+            "Stop Loss Price ($)": st.column_config.NumberColumn(format="$%.2f"),
+            "Stop Distance ($)": st.column_config.NumberColumn(format="$%.2f"),
+            "Real R ($)": st.column_config.NumberColumn(format="$%.2f"),
+        })
 
 # Function to display the initial number of shares and the real risk
-def display_initial_shares():
+def display_initial_shares(risk_amount, entry_price, stop_loss_price, rounding_method, trade_type):
+    if trade_type == "Long" and stop_loss_price >= entry_price:
+        st.error("For Long Trades, the Stop Loss Price must be below the Entry Price. Please adjust your Stop Loss or Entry Price.")
+        return None
+    if trade_type == "Short" and stop_loss_price <= entry_price:
+        st.error("For Short Trades, the Stop Loss Price must be above the Entry Price. Please adjust your Stop Loss or Entry Price.")
+        return None
+
+    grid = get_sizing_grid(f"sizing_grid_{trade_type.lower()}", risk_amount, entry_price, stop_loss_price, rounding_method, trade_type)
+    real_shares, real_risk = grid.lookup(entry_price, stop_loss_price)
+    action = "buy" if trade_type == "Long" else "sell short"
+    formatted_shares = "{:,}".format(int(real_shares))
+    formatted_real_risk = "${:,.2f}".format(real_risk)  # Formatting real risk for display
+    st.markdown(f"<h3 style='text-align: left; color: #56b0f0;'>You should {action} <span style='font-size: 1.5em;'>{formatted_shares}</span> shares (R is <span style='font-size: 1em;'>{formatted_real_risk}</span>)</h3>", unsafe_allow_html=True)
+    return grid
+
+# Function to create a download link for the sized watchlist
+def get_table_download_link_csv(sized):
+    csv = sized.to_csv(index=False).encode()
+    b64 = base64.b64encode(csv).decode()
+    href = f'<a href="data:file/csv;base64,{b64}" download="sized_watchlist.csv">Download CSV file</a>'
+    return href
+
+# Function to size and display every setup of an uploaded or pasted watchlist
+def display_sized_watchlist(file_obj, risk_amount, rounding_method):
     try:
-        if stop_loss_price >= buy_price:
-            st.error("For Long Trades, the Stop Loss Price must be below the Entry Price. Please adjust your Stop Loss or Entry Price.")
-            return
-        
-        real_shares = calculate_shares(risk_amount, buy_price, stop_loss_price, rounding_method, "Long")
-        stop_loss_distance = abs(buy_price - stop_loss_price)
-        real_risk = real_shares * stop_loss_distance
-        formatted_shares = "{:,}".format(int(real_shares))
-        formatted_real_risk = "${:,.2f}".format(real_risk)  # Formatting real risk for display
-        st.markdown(f"<h3 style='text-align: left; color: #56b0f0;'>You should buy <span style='font-size: 1.5em;'>{formatted_shares}</span> shares (R is <span style='font-size: 1em;'>{formatted_real_risk}</span>)</h3>", unsafe_allow_html=True)
-    
+        sized = size_watchlist(load_watchlist_csv(file_obj), risk_amount, rounding_method)
     except ValueError as e:
         st.error(str(e))
-
-def display_initial_shares_short():
-    try:
-        if stop_loss_price_short <= entry_price_short:
-            st.error("For Short Trades, the Stop Loss Price must be above the Entry Price. Please adjust your Stop Loss or Entry Price.")
-            return
-        real_shares_short = calculate_shares(risk_amount_short, entry_price_short, stop_loss_price_short, rounding_method, "Short")
-        stop_loss_distance_short = stop_loss_price_short - entry_price_short
-        real_risk_short = real_shares_short * abs(stop_loss_distance_short)
-        formatted_shares_short = "{:,}".format(int(real_shares_short))
-        formatted_real_risk_short = "${:,.2f}".format(real_risk_short)
-        st.markdown(f"<h3 style='text-align: left; color: #56b0f0;'>You should sell short <span style='font-size: 1.5em;'>{formatted_shares_short}</span> shares (R is <span style='font-size: 1em;'>{formatted_real_risk_short}</span>)</h3>", unsafe_allow_html=True)
-    except ValueError as e:
-        st.error(str(e))
-
-
-# Warning message in the sidebar
-st.sidebar.warning("Tip: Use keyboard arrow keys (↑↓) to quickly adjust number inputs.")
-
-
-# Main section for initial position sizing
-st.markdown("""
-            ## Position Sizing Helper
-            Quickly calculate the optimal trade size based on your risk tolerance and strategy. This tool simplifies risk management by using Risk units (R), helping you make informed decisions to align each trade with your trading goals.
-            # 
-            """)
-
-# Create tabs for different simulation options
-tab1, tab2 = st.tabs(["Long Trade", "Short Trade"])
-
-# Tab 1: Equity Curve Simulator
-with tab1:
+        return
+
+    valid = sized["Error"] == ""
+    col_rows, col_risk, col_notional = st.columns(3)
+    col_rows.metric("Setups Sized", f"{int(valid.sum()):,} of {len(sized):,}")
+    col_risk.metric("Total Risk", "${:,.2f}".format(sized.loc[valid, "Real R ($)"].sum()))
+    col_notional.metric("Total Notional", "${:,.2f}".format(sized.loc[valid, "Notional ($)"].sum()))
+    if not valid.all():
+        st.warning(f"{int((~valid).sum()):,} row(s) could not be sized; see the Error column.")
+    st.dataframe(sized, hide_index=True, width="stretch", column_config={
+        "Entry": st.column_config.NumberColumn(format="$%.2f"),
+        "Stop": st.column_config.NumberColumn(format="$%.2f"),
+        "Risk ($)": st.column_config.NumberColumn(format="$%.2f"),
+        "Shares": st.column_config.NumberColumn(format="%d"),
+        "Real R ($)": st.column_config.NumberColumn(format="$%.2f"),
+        "Notional ($)": st.column_config.NumberColumn(format="$%.2f"),
+    })
+    st.markdown(get_table_download_link_csv(sized), unsafe_allow_html=True)
+
+
+# Function to draw the calculator of one trade direction. As a fragment, changing one of its inputs only reruns
+# this calculator, and its widgets and variables are its own
+@st.fragment
+def sizing_calculator(trade_type, default_stop, default_entry):
+    suffix = "_" + trade_type.lower()
     st.markdown("####")
 
     # Radio button for selecting risk type and rounding method
     col10, col20 = st.columns(2)
     with col10:
         risk_type = st.radio("Risk Method:",
-                        ("Percentage of Account", "Fixed Dollar Amount"), horizontal=True)
+                        ("Percentage of Account", "Fixed Dollar Amount"), horizontal=True, key="risk_type" + suffix)
     with col20:
-        rounding_options = ["No Rounding", "Round nearest 10", "Round nearest 50", "Round nearest 100", "Round nearest 500", "Round nearest 1000"]
-        rounding_method = st.selectbox("Rounding Method:", rounding_options, key="rounding_method") 
+        rounding_method = st.selectbox("Rounding Method:", ROUNDING_METHODS, key="rounding_method" + suffix)
 
     st.markdown("#####")
 
@@ -123,79 +118,96 @@ with tab1:
     if risk_type == "Percentage of Account":
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            account_size = st.number_input("Account Size ($):", min_value=0.0, value=2000.00, step=1000.0, format="%.2f", key="account_size")
+            account_size = st.number_input("Account Size ($):", min_value=0.0, value=2000.00, step=1000.0, format="%.2f", key="account_size" + suffix)
         with col2:
-            risk_percentage = st.number_input("Select your Risk (%):", min_value=0.05, max_value=3.0, value=1.0, step=0.05, format="%.2f", key="risk_percentage")
+            risk_percentage = st.number_input("Select your Risk (%):", min_value=0.05, max_value=3.0, value=1.0, step=0.05, format="%.2f", key="risk_percentage" + suffix)
             risk_amount = account_size * (risk_percentage / 100)
     else:
         col2, col3, col4 = st.columns(3)
         with col2:
-            risk_amount = st.number_input("Risk Amount ($):", min_value=0, value=100, step=1, key="fixed_risk_amount")
+            risk_amount = st.number_input("Risk Amount ($):", min_value=0, value=100, step=1, key="fixed_risk_amount" + suffix)
 
     with col3:
-        stop_loss_price = st.number_input("Stop Loss Price ($):", min_value=0.01, value=1.0, format="%.2f", key="stop_loss_price")
+        stop_loss_price = st.number_input("Stop Loss Price ($):", min_value=0.01, value=default_stop, format="%.2f", key="stop_loss_price" + suffix)
 
     with col4:
-        buy_price = st.number_input("Entry Price ($):", min_value=0.01, value=1.05, format="%.2f", key="buy_price")
-    
-
-
-    # Show R size
-    formatted_risk_amount = "${:,.2f}".format(risk_amount)
+        entry_price = st.number_input("Entry Price ($):", min_value=0.01, value=default_entry, format="%.2f", key="entry_price" + suffix)
 
-    # Display the initial number of shares
-    display_initial_shares()
+    # Display the initial number of shares, and the shares of nearby stops
+    sizing_grid = display_initial_shares(risk_amount, entry_price, stop_loss_price, rounding_method, trade_type)
+    if sizing_grid is not None:
+        display_sizing_ladder(sizing_grid, entry_price)
 
     st.divider()
 
-
     # Sección para la Piramidación de Posiciones
     st.markdown("### Pyramid into your Position")
     st.markdown("Section Under Construction ⚠️")
 
-
-# Tab 2: Short Trade
-with tab2:
+# Function to draw the watchlist sizer, as its own fragment too
+@st.fragment
+def watchlist_sizer():
     st.markdown("####")
-    
+    st.markdown("Size a whole watchlist at once. The CSV needs Symbol, Side (Long or Short), Entry and Stop columns, "
+                "plus an optional Risk column to override the risk of a row.")
+
     # Radio button for selecting risk type and rounding method
     col10, col20 = st.columns(2)
     with col10:
         risk_type = st.radio("Risk Method:",
-                        ("Percentage of Account", "Fixed Dollar Amount"), horizontal=True, key="risk_type_short")
+                        ("Percentage of Account", "Fixed Dollar Amount"), horizontal=True, key="risk_type_watchlist")
     with col20:
-        rounding_method = st.selectbox("Rounding Method:", rounding_options, key="rounding_method_short") 
-
-    st.markdown("#####")
+        rounding_method = st.selectbox("Rounding Method:", ROUNDING_METHODS, key="rounding_method_watchlist")
 
-    # Conditional inputs based on risk type for Short Trades
     if risk_type == "Percentage of Account":
-        col1, col2, col3, col4 = st.columns(4)
+        col1, col2, _ = st.columns(3)
         with col1:
-            account_size_short = st.number_input("Account Size ($):", min_value=0.0, value=2000.00, step=1000.0, format="%.2f", key="account_size_short")
+            account_size = st.number_input("Account Size ($):", min_value=0.0, value=2000.00, step=1000.0, format="%.2f", key="account_size_watchlist")
         with col2:
-            risk_percentage_short = st.number_input("Select your Risk (%):", min_value=0.05, max_value=3.0, value=1.0, step=0.05, format="%.2f", key="risk_percentage_short")
-            risk_amount_short = account_size_short * (risk_percentage_short / 100)
+            risk_percentage = st.number_input("Select your Risk (%):", min_value=0.05, max_value=3.0, value=1.0, step=0.05, format="%.2f", key="risk_percentage_watchlist")
+            risk_amount = account_size * (risk_percentage / 100)
     else:
-        col2, col3, col4 = st.columns(3)
+        col2, _ = st.columns([1, 2])
         with col2:
-            risk_amount_short = st.number_input("Risk Amount ($):", min_value=0, value=100, step=1, key="fixed_risk_amount_short")
+            risk_amount = st.number_input("Risk Amount ($):", min_value=0, value=100, step=1, key="fixed_risk_amount_watchlist")
 
-    with col3:
-        stop_loss_price_short = st.number_input("Stop Loss Price ($):", min_value=0.01, value=1.10, format="%.2f", key="stop_loss_price_short")
+    input_mode = st.radio("Watchlist Source:", ("Upload CSV", "Paste CSV"), horizontal=True, key="watchlist_source")
+    if input_mode == "Upload CSV":
+        watchlist_file = st.file_uploader("Choose a CSV file", type=['csv', 'txt'], key="watchlist_file")
+        if watchlist_file is not None:
+            display_sized_watchlist(watchlist_file, risk_amount, rounding_method)
+    else:
+        watchlist_text = st.text_area("Paste the watchlist", height=200, key="watchlist_text",
+                                      placeholder="Symbol,Side,Entry,Stop,Risk\nAAPL,Long,190.50,188.90,\nTSLA,Short,250.00,254.00,50")
+        if watchlist_text.strip():
+            display_sized_watchlist(StringIO(watchlist_text), risk_amount, rounding_method)
 
-    with col4:
-        entry_price_short = st.number_input("Entry Price ($):", min_value=0.01, value=1.00, format="%.2f", key="entry_price_short")
 
-    # Show R size for Short Trades
-    formatted_risk_amount_short = "${:,.2f}".format(risk_amount_short)
-    display_initial_shares_short()
+# Warning message in the sidebar
+st.sidebar.warning("Tip: Use keyboard arrow keys (↑↓) to quickly adjust number inputs.")
 
-    st.divider()
 
-    # Sección para la Piramidación de Posiciones
-    st.markdown("### Pyramid into your Position")
-    st.markdown("Section Under Construction ⚠️")
+# Main section for initial position sizing
+st.markdown("""
+            ## Position Sizing Helper
+            Quickly calculate the optimal trade size based on your risk tolerance and strategy. This tool simplifies risk management by using Risk units (R), helping you make informed decisions to align each trade with your trading goals.
+            # 
+            """)
+
+# Create tabs for different simulation options
+tab1, tab2, tab3 = st.tabs(["Long Trade", "Short Trade", "Watchlist"])
+
+# Tab 1: Long Trade
+with tab1:
+    sizing_calculator("Long", default_stop=1.0, default_entry=1.05)
+
+# Tab 2: Short Trade
+with tab2:
+    sizing_calculator("Short", default_stop=1.10, default_entry=1.00)
+
+# Tab 3: Watchlist, every setup of a CSV sized at once
+with tab3:
+    watchlist_sizer()
 
 # Disclaimer
 st.markdown("""
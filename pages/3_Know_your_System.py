@@ -1,8 +1,19 @@
-import streamlit as st
+import os
+import time
+
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
-from matplotlib.ticker import ScalarFormatter
+import streamlit as st
+import pandas as pd
+
+from tradertools.bootstrap import bootstrap_run, load_executions_csv, load_r_multiples_csv
+from tradertools.cache import chart_cache, fingerprint, simulation_cache
+from tradertools.interactive import build_heatmap, build_interactive_chart, interactive_chart_data
+from tradertools.montecarlo import equity_curve_run, monte_carlo_run
+from tradertools.optimize import optimize_risk
+from tradertools.plotting import CHART_TYPES, render_monte_carlo_chart
+from tradertools.ruin import ruin_analysis
+from tradertools.sizing import ROUNDING_METHODS, sized_equity_curve_run
+from tradertools.sweep import sweep_equity_curve, sweep_monte_carlo
 
 
 # Set page configuration
@@ -30,193 +41,237 @@ def add_logo():
 add_logo()
 
 
-# Function for Monte Carlo simulation including drawdown statistics
-def monte_carlo_simulation(avg_win, avg_loss, std_dev, win_ratio, num_trades, num_simulations):
-    # Initialize arrays to store simulation results and drawdowns
-    simulations_results = np.zeros((num_simulations, num_trades))
-    all_drawdowns = []
-
-    # Calculate expected performance based on given stats
-    expected_performance = avg_win * win_ratio + avg_loss * (1 - win_ratio)
+# Trade models of the Know Your System tab, with the builders of their progressive runs
+TRADE_MODELS = ("Parametric (Avg. Win/Loss)", "Bootstrap from Trade Log")
+MODEL_RUNS = {
+    TRADE_MODELS[0]: monte_carlo_run,
+    TRADE_MODELS[1]: bootstrap_run,
+}
+TRADE_LOG_TYPES = ("R-Multiples", "Tradervue Executions")
+BOOTSTRAP_METHODS = ("I.I.D.", "Block")
 
-    # Loop over each simulation
-    for sim in range(num_simulations):
-        trade_results = []
-        equity_curve = []
-        # Loop over each trade within a simulation
-        for trade in range(num_trades):
-            # Determine trade result based on win ratio and add random variation
-            result = (avg_win + np.random.randn() * std_dev) if np.random.rand() < win_ratio else (avg_loss + np.random.randn() * std_dev)
-            trade_results.append(result)
-            equity_curve.append(sum(trade_results))
+# Ruin thresholds of the Equity Curve Simulator
+RUIN_TYPES = ("None", "Drawdown from Peak (%)", "Minimum Account Size ($)")
 
-        simulations_results[sim] = equity_curve
+# Models of the Parameter Sweep tab and the largest number of values per swept parameter
+SWEEP_MODELS = ("Equity Curve Simulator", "Know Your System (R)")
+MAX_SWEEP_STEPS = 40
 
-        # Calculate drawdowns from the equity curve
-        equity_highs = np.maximum.accumulate(equity_curve)
-        drawdowns = (equity_curve - equity_highs) / equity_highs
-        all_drawdowns.extend(drawdowns[drawdowns < 0])  # Only negative values are considered valid drawdowns
+# Seconds between two chart previews of a running simulation, and paths used by a preview
+PREVIEW_INTERVAL = 0.5
+MAX_PREVIEW_PATHS = 2000
 
-    # Calculate drawdown statistics
-    max_drawdown = min(all_drawdowns)
-    avg_drawdown = np.mean(all_drawdowns)
-    median_drawdown = np.median(all_drawdowns)
+# Chart backends: server-side image or browser-side interactive chart
+CHART_BACKENDS = ("Static (Matplotlib)", "Interactive (Vega-Lite)")
 
-    # Calculate expected equity curve based on expected performance
-    expected_equity_curve = np.arange(1, num_trades + 1) * expected_performance
 
-    # Package drawdown stats in a dictionary
-    drawdown_stats = {
-        'Max Drawdown (R)': max_drawdown,
-        'Avg Drawdown (R)': avg_drawdown,
-        'Median Drawdown (R)': median_drawdown
-    }
-
-    return simulations_results, expected_equity_curve
-
-
-# Function to simulate the equity curve based on trading parameters
-def simulate_equity_curve(balance, risk_per_trade, win_percent, win_loss_ratio, num_trades, num_simulations, risk_type):
+# Function to show a Monte Carlo chart, built once and then served from the chart cache
+def plot_monte_carlo_simulations(simulations_results, expected_equity_curve, x_label='Trade Number', y_label='Equity ($)',
+                                 scale_type='Arithmetic Scale', chart_type='Auto', bands=None, sample_paths=20,
+                                 backend=CHART_BACKENDS[0], cache_chart=True):
     """
-    Simulate multiple equity curves based on the specified trading parameters.
-    
-    Args:
-    - balance: Initial trading balance.
-    - risk_per_trade: Risk per trade, as a percentage of equity or fixed dollar amount.
-    - win_percent: Percentage of winning trades.
-    - win_loss_ratio: Ratio of average win to average loss.
-    - num_trades: Number of trades per simulation.
-    - num_simulations: Number of simulations to run.
-    - risk_type: 'Percentage of Equity' or 'Fixed Dollar Amount' to specify how risk is calculated.
-    
-    Returns:
-    - A list of equity curves, one for each simulation.
+    Displays the chart of `render_monte_carlo_chart` (see its arguments), or its interactive Vega-Lite
+    version when `backend` is 'Interactive (Vega-Lite)'. The encoded image or the compact chart payload
+    is cached, keyed on a fingerprint of the plotted data plus the plot options, so repeat views skip
+    rendering. Previews of unfinished runs pass `cache_chart=False`.
     """
-    simulations_results = []
-    for _ in range(num_simulations):
-        equity_curve = [balance]
-        for _ in range(num_trades):
-            current_balance = equity_curve[-1]
-            if risk_type == "Percentage of Equity":
-                trade_risk = current_balance * (risk_per_trade / 100)
-            else:  # Fixed Dollar Amount
-                trade_risk = risk_per_trade
-
-            trade_result = np.random.rand()
-            if trade_result < win_percent / 100:
-                # Win
-                profit_loss = trade_risk * win_loss_ratio
-            else:
-                # Loss
-                profit_loss = -trade_risk
+    if bands is not None:
+        bands = {'steps': bands['steps'], 'bands': bands['bands']}
+    interactive = backend == CHART_BACKENDS[1]
+    if cache_chart:
+        options = (x_label, y_label, scale_type, chart_type, sample_paths, 'vega' if interactive else 'png')
+        key = (fingerprint(simulations_results, expected_equity_curve, bands), options)
+    else:
+        key = None
+
+    if interactive:
+        data = chart_cache.get(key) if cache_chart else None
+        if data is None:
+            data = interactive_chart_data(simulations_results, expected_equity_curve, chart_type=chart_type,
+                                          bands=bands, sample_paths=sample_paths)
+            if cache_chart:
+                chart_cache.put(key, data)
+        st.altair_chart(build_interactive_chart(data, x_label=x_label, y_label=y_label, scale_type=scale_type),
+                        width='stretch')
+        return
+
+    image = chart_cache.get(key) if cache_chart else None
+    if image is None:
+        image = render_monte_carlo_chart(simulations_results, expected_equity_curve, x_label=x_label, y_label=y_label,
+                                         scale_type=scale_type, chart_type=chart_type, bands=bands,
+                                         sample_paths=sample_paths, image_format='png')
+        if cache_chart:
+            chart_cache.put(key, image)
 
-            new_balance = current_balance + profit_loss
-            equity_curve.append(new_balance)
+    # Display the plot in Streamlit
+    st.image(image, width='stretch')
 
-        simulations_results.append(equity_curve)
 
-    return simulations_results
+# Function to run the last requested simulation block by block, or fetch it from the cache
+def run_progressively(request_key, preview):
+    """
+    Runs the simulation requested under `request_key` in the session state, a dictionary with the
+    run 'builder' (e.g. `monte_carlo_run`) and its 'args' and 'kwargs'. A progress bar follows the
+    blocks and `preview` is called with the partial results about every PREVIEW_INTERVAL seconds.
 
+    The run lives in the session state between blocks: when a widget change reruns the page, the run
+    resumes where it was, and once the request is marked 'stopped' it keeps the blocks done so far.
+    Finished runs are stored in the simulation cache.
 
-# Custom formatter function for the Y-axis
-def format_func(value, tick_number):
-    """
-    Converts numerical value to a string with K, M, or B suffix.
-    Args:
-    - value: The numerical value of the tick.
-    - tick_number: The tick number (unused here but required by FuncFormatter).
     Returns:
-    - Formatted string with appropriate suffix.
+    - (result, run): the result (partial if the run was stopped) and the `ProgressiveRun`, or None
+      instead of the run when the result came from the cache.
     """
-    if value >= 1_000_000_000:
-        return f'{value / 1_000_000_000:.1f}B'
-    elif value >= 1_000_000:
-        return f'{value / 1_000_000:.1f}M'
-    elif value >= 1_000:
-        return f'{value / 1_000:.1f}K'
+    request = st.session_state[request_key]
+    key = simulation_cache.make_key(request['builder'], request['args'], request['kwargs'], ignore=('workers',))
+    result = simulation_cache.get(key)
+    if result is not None:
+        return result, None
+
+    progress_key = f'{request_key}_progress'
+    saved = st.session_state.get(progress_key)
+    if saved is None or saved[0] != key:
+        saved = (key, request['builder'](*request['args'], **request['kwargs']))
+        st.session_state[progress_key] = saved
+    run = saved[1]
+
+    if not request.get('stopped'):
+        progress_bar = st.progress(run.num_done / run.num_simulations, text="Starting the simulation...")
+        preview_area = st.empty()
+        last_preview = 0.0
+        for _ in run.advance():
+            progress_bar.progress(run.num_done / run.num_simulations,
+                                  text=f"Simulated {run.num_done:,} of {run.num_simulations:,} paths")
+            if not run.complete and time.perf_counter() - last_preview >= PREVIEW_INTERVAL:
+                with preview_area.container():
+                    preview(run.preview())
+                last_preview = time.perf_counter()
+        progress_bar.empty()
+        preview_area.empty()
+
+    result = run.result()
+    if run.complete:
+        simulation_cache.put(key, result)
+        del st.session_state[progress_key]
+    return result, run
+
+
+# Function to stop the running simulation, keeping the paths simulated so far
+def stop_run(request_key):
+    saved = st.session_state.get(f'{request_key}_progress')
+    if saved is not None and saved[1].num_done > 0:
+        st.session_state[request_key]['stopped'] = True
     else:
-        return int(value)
+        # Nothing simulated yet (or already finished): forget the request
+        st.session_state.pop(f'{request_key}_progress', None)
+        if saved is not None:
+            st.session_state.pop(request_key, None)
 
 
-# Custom formatter for logarithmic scale, adjusting labels to reflect K, M, or B
-def log_format_func(value, pos):
+# Function to preview the chart of an unfinished run
+def preview_simulations(partial, chart_backend):
     """
-    Converts log-scaled tick values to formatted strings with K, M, or B suffix.
-    This function assumes that the input 'value' is the logarithm of the actual value.
+    Draws the partial results of a `ProgressiveRun` (a path matrix or a summary dictionary).
     """
-    # Convert the log value back to the real value
-    real_value = np.power(10, value)
-    if real_value >= 1_000_000_000:
-        return f'{real_value / 1_000_000_000:.1f}B'
-    elif real_value >= 1_000_000:
-        return f'{real_value / 1_000_000:.1f}M'
-    elif real_value >= 1_000:
-        return f'{real_value / 1_000:.1f}K'
+    if isinstance(partial, dict):
+        simulations_results, bands = partial['sample_paths'], partial
     else:
-        return f'{real_value:.1f}'
-    
-class CustomScalarFormatter(ScalarFormatter):
-    def __call__(self, x, pos=None):
-        # Esta función se llama para cada tick; `x` es el valor original
-        if x >= 1_000_000_000:
-            return f'{x / 1_000_000_000:.1f}B'
-        elif x >= 1_000_000:
-            return f'{x / 1_000_000:.1f}M'
-        elif x >= 1_000:
-            return f'{x / 1_000:.1f}K'
-        else:
-            return f'{x:.1f}'
+        # An evenly strided subset of the paths keeps previews cheap while the matrix grows
+        stride = -(-len(partial) // MAX_PREVIEW_PATHS)
+        simulations_results, bands = partial[::stride], None
+    plot_monte_carlo_simulations(simulations_results, None, y_label='', bands=bands, backend=chart_backend,
+                                 cache_chart=False)
 
-# Adjust the plot_monte_carlo_simulations function to use the custom formatter
-def plot_monte_carlo_simulations(simulations_results, expected_equity_curve, x_label='Trade Number', y_label='Equity ($)', scale_type='Arithmetic Scale'):
+
+# Function to show how much of a stopped run was simulated
+def display_stopped_run(run):
+    if run is not None and not run.complete:
+        st.info(f"Simulation stopped after {run.num_done:,} of {run.num_simulations:,} paths. "
+                "The results below only cover these paths; run it again to resume.")
+
+
+# Function to display the drawdown statistics and the max drawdown distribution
+def display_drawdown_stats(drawdown_stats, histogram, unit):
     """
-    Plots the results of Monte Carlo simulations with options for custom axis labels
-    and a choice between arithmetic and logarithmic scale for the Y-axis.
+    Shows the drawdown table and a histogram of the max drawdown of every simulation.
 
     Args:
-    - simulations_results: A list of lists or a numpy array containing the simulation results.
-    - expected_equity_curve: A list containing the expected equity curve. Can be None.
-    - x_label: The label for the X-axis.
-    - y_label: The label for the Y-axis.
-    - scale_type: 'Arithmetic Scale' or 'Logarithmic Scale' to specify the Y-axis scale.
+    - drawdown_stats: Dictionary of drawdown figures keyed by label.
+    - histogram: (counts, bin_edges) pair of the per-simulation max drawdown.
+    - unit: Unit label of the histogram axis (e.g. '$' or 'R').
     """
-    plt.style.use('dark_background')  # Use dark theme for the plot
-    fig, ax = plt.subplots(figsize=(14, 8))  # Set figure size
-
-
-    # Apply 'plain' formatting to avoid scientific notation
-    ax.ticklabel_format(style='plain', axis='y', useOffset=False)
+    st.markdown("#### Drawdown Analysis")
+    col_table, col_chart = st.columns(2)
+    with col_table:
+        st.table({"Statistic": list(drawdown_stats.keys()),
+                  "Value": [f"{value:,.2f}" for value in drawdown_stats.values()]})
+    with col_chart:
+        counts, edges = histogram
+        if len(counts):
+            centers = (edges[:-1] + edges[1:]) / 2
+            st.markdown(f"Distribution of Max Drawdown ({unit})")
+            st.bar_chart(pd.DataFrame({'Simulations': counts}, index=[f"{center:,.1f}" for center in centers]))
+
+
+# Function to read the range of a swept parameter as evenly spaced values
+def sweep_range_inputs(label, min_default, max_default, step, key, min_value=None, max_value=None):
+    """
+    Shows From / To / Steps inputs for one swept parameter, within `min_value` and `max_value` when given.
 
-    # Set the Y-axis scale and formatter based on the user's choice
-    if scale_type == 'Logarithmic Scale':
-        ax.set_yscale('log')
-        ax.yaxis.set_major_formatter(CustomScalarFormatter())
-    else:
-        ax.yaxis.set_major_formatter(ticker.FuncFormatter(format_func))
-
-
-    # Plot simulation results and expected performance curve if provided
-    for sim_results in simulations_results:
-        ax.plot(sim_results, alpha=0.75, linewidth=0.7)
-    if expected_equity_curve is not None:
-        ax.plot(expected_equity_curve, color='white', linestyle='--', label='Expected Performance', linewidth=2)
-
-    # Set plot properties including custom axis labels
-    ax.set_xlabel(x_label, fontsize=14, color='white')
-    ax.set_ylabel(y_label, fontsize=14, color='white')
-    ax.set_title('Monte Carlo Simulation of Trading Performance', fontsize=18, color='white', fontweight='bold')
-    ax.grid(color='gray', linestyle='-', linewidth=0.5)
-    ax.spines['bottom'].set_color('grey')
-    ax.spines['top'].set_color('grey')
-    ax.spines['right'].set_color('grey')
-    ax.spines['left'].set_color('grey')
-    if expected_equity_curve is not None:
-        ax.legend(loc='upper left', frameon=False)
-    fig.text(0.95, 0.01, 'tradertools.streamlit.app', ha='right', va='bottom', fontsize=10, color='white', alpha=0.85)
+    Returns:
+    - The tuple of evenly spaced values from `From` to `To`.
+    """
+    col_from, col_to, col_steps = st.columns(3)
+    with col_from:
+        low = st.number_input(f"{label} From", min_value=min_value, max_value=max_value, value=min_default, step=step,
+                              key=f'{key}_from')
+    with col_to:
+        high = st.number_input(f"{label} To", min_value=min_value, max_value=max_value, value=max_default, step=step,
+                               key=f'{key}_to')
+    with col_steps:
+        steps = st.number_input("Steps", min_value=1, max_value=MAX_SWEEP_STEPS, value=10, key=f'{key}_steps')
+    return tuple(float(value) for value in np.linspace(low, high, steps))
+
+
+# Function to display the probability of ruin and how fast ruin comes
+def display_ruin_stats(ruin):
+    """
+    Shows the ruin figures, the share of simulations ruined by every trade and the time-to-ruin histogram.
 
-    # Display the plot in Streamlit
-    st.pyplot(fig)
+    Args:
+    - ruin: Dictionary returned by `tradertools.ruin.summarize_ruin`.
+    """
+    st.markdown("#### Risk of Ruin")
+    col_table, col_curve, col_chart = st.columns(3)
+    with col_table:
+        st.table({"Statistic": list(ruin['stats'].keys()),
+                  "Value": [f"{value:,.2f}" for value in ruin['stats'].values()]})
+    with col_curve:
+        st.markdown("Ruined Simulations by Trade Number (%)")
+        st.line_chart(pd.DataFrame({'Ruined (%)': ruin['cumulative_probability'] * 100}))
+    with col_chart:
+        counts, edges = ruin['histogram']
+        if len(counts):
+            st.markdown("Distribution of Trades to Ruin")
+            st.bar_chart(pd.DataFrame({'Simulations': counts}, index=[f"{edge:,}" for edge in edges[:-1]]))
+
+
+# Function to display the statistics of a streamed simulation run
+def display_summary_stats(summary, unit):
+    """
+    Shows terminal-value percentiles, mean/std and drawdown figures of a streamed run.
 
+    Args:
+    - summary: Dictionary returned by the streaming simulators.
+    - unit: Unit label used in the table (e.g. '$' or 'R').
+    """
+    rows = {f"Terminal P{p} ({unit})": value for p, value in summary['terminal_quantiles'].items()}
+    rows[f"Terminal Mean ({unit})"] = summary['terminal_mean']
+    rows[f"Terminal Std. Dev. ({unit})"] = summary['terminal_std']
+    st.markdown(f"Summary of {summary['num_simulations']:,} simulations "
+                f"({len(summary['sample_paths']):,} sample paths plotted)")
+    st.table({"Statistic": list(rows.keys()), "Value": [f"{value:,.2f}" for value in rows.values()]})
+    display_drawdown_stats(summary['drawdown_stats'], summary['drawdown_histogram'], unit)
 
 
 # Main section with introduction to Monte Carlo simulation
@@ -226,8 +281,12 @@ st.markdown("""
             # 
             """)
 
+# Chart backend shared by both tabs
+chart_backend = st.sidebar.radio("Chart Backend:", CHART_BACKENDS, key='chart_backend',
+                                 help="Interactive charts are drawn in the browser and support zoom and hover.")
+
 # Create tabs for different simulation options
-tab1, tab2 = st.tabs(["Equity Curve Simulator", "Know Your System"])
+tab1, tab2, tab3 = st.tabs(["Equity Curve Simulator", "Know Your System", "Parameter Sweep"])
 
 # Tab 1: Equity Curve Simulator
 with tab1:
@@ -238,7 +297,7 @@ with tab1:
     """)
 
     # Create two columns for log scale option and risk method selection
-    col_risk, col_scale = st.columns(2)
+    col_risk, col_scale, col_chart = st.columns(3)
 
     with col_risk:
         risk_type = st.radio(
@@ -254,6 +313,10 @@ with tab1:
             key='use_log_scale', horizontal=True
         )
 
+    with col_chart:
+        chart_type = st.radio("Chart Type:", CHART_TYPES, key='chart_type_tab2', horizontal=True,
+                              help="Percentile bands stay fast and readable with thousands of simulations.")
+
 
 
     # Initialize input columns for initial balance and trading stats below the options
@@ -262,34 +325,166 @@ with tab1:
         balance = st.number_input("Initial Balance ($)", value=10000.0, key='balance_tab2')
         # Conditional input for risk per trade based on the selected risk method
         if risk_type == "Percentage of Equity":
-            risk_per_trade = st.number_input("Risk per Trade (%)", min_value=0.01, max_value=100.0, value=1.0, step=0.01, key='risk_per_trade_percent')
+            # The default lives in the session state so the risk optimizer can fill the input in
+            st.session_state.setdefault('risk_per_trade_percent', 1.0)
+            risk_per_trade = st.number_input("Risk per Trade (%)", min_value=0.01, max_value=100.0, step=0.01, key='risk_per_trade_percent')
         else:
             risk_per_trade = st.number_input("Risk per Trade ($)", min_value=1.0, value=100.0, step=1.0, key='risk_per_trade_dollar')
 
     with col5:
-        win_percent = st.number_input("Winning Trades (%)", value=50.0, key='win_percent_tab2')
-        win_loss_ratio = st.number_input("Win/Loss Ratio", value=1.0, key='win_loss_ratio_tab2')
+        win_percent = st.number_input("Winning Trades (%)", min_value=0.0, max_value=100.0, value=50.0,
+                                      key='win_percent_tab2')
+        win_loss_ratio = st.number_input("Win/Loss Ratio", min_value=0.01, value=1.0, key='win_loss_ratio_tab2')
 
     with col6:
         trades = st.number_input("Number of Trades", min_value=1, value=100, key='trades_tab2')
         simulations = st.number_input("Number of Simulations", min_value=1, value=100, key='simulations_tab2')
 
-    # Button to trigger the simulation
-    if st.button('Run Simulation', key='simulate_equity_curve'):
-        st.warning('Simulations may take some time to complete. Please, wait patiently...')
-        # Perform Monte Carlo simulation and display results
-        simulations_results = simulate_equity_curve(balance, risk_per_trade, win_percent, win_loss_ratio, trades, 
-                                                    simulations, risk_type)
-        st.empty()
-        
+    # Optional ruin threshold: a simulation that crosses it stops trading for good
+    col_ruin, col_ruin_level, _ = st.columns(3)
+    with col_ruin:
+        ruin_type = st.radio("Stop a Simulation at Ruin:", RUIN_TYPES, key='ruin_type_tab2', horizontal=True,
+                             help="Ruined simulations stay at the balance where they crossed the threshold.")
+    with col_ruin_level:
+        ruin_balance = ruin_drawdown = None
+        if ruin_type == RUIN_TYPES[1]:
+            ruin_drawdown = st.number_input("Ruin Drawdown (%)", min_value=1.0, max_value=100.0, value=50.0,
+                                            step=1.0, key='ruin_drawdown_tab2')
+        elif ruin_type == RUIN_TYPES[2]:
+            ruin_balance = st.number_input("Minimum Account Size ($)", min_value=0.0, value=balance / 2,
+                                           key='ruin_balance_tab2')
+
+    # Advanced settings: streaming mode keeps memory bounded, seed and workers control reproducibility and speed
+    with st.expander("Advanced Settings"):
+        col_stream, col_budget, col_seed, col_workers = st.columns(4)
+        with col_stream:
+            streaming = st.checkbox("Streaming mode (bounded memory)", key='streaming_tab2',
+                                    help="Simulate in chunks and keep only summary statistics and a sample of paths.")
+        with col_budget:
+            memory_budget = st.number_input("Memory Budget per Worker (MB)", min_value=16, value=256, step=16,
+                                            key='memory_budget_tab2', disabled=not streaming)
+        with col_seed:
+            seed = st.number_input("Random Seed", min_value=0, value=42, step=1, key='seed_tab2',
+                                   help="The same seed and inputs always reproduce the same simulations.")
+        with col_workers:
+            workers = st.number_input("Worker Processes", min_value=1, max_value=os.cpu_count() or 1, value=1,
+                                      key='workers_tab2')
+
+    # Sizing rules: whole-share sizing and risk caps make every trade depend on the path so far
+    with st.expander("Position Sizing Rules"):
+        use_sizing_rules = st.checkbox("Size trades in shares", key='sizing_rules_tab2',
+                                       disabled=risk_type != "Percentage of Equity",
+                                       help="Round every position like the Position Sizing page, cap the dollar risk "
+                                            "and cut the risk after a losing streak.")
+        col_stop_distance, col_rounding, col_max_risk, col_streak, col_cut = st.columns(5)
+        with col_stop_distance:
+            stop_distance = st.number_input("Stop Distance ($ per share)", min_value=0.01, value=0.50, step=0.01,
+                                            key='stop_distance_tab2')
+        with col_rounding:
+            rounding_method = st.selectbox("Rounding Method:", ROUNDING_METHODS, key='rounding_method_tab2')
+        with col_max_risk:
+            max_risk = st.number_input("Max Risk per Trade ($, 0 = no cap)", min_value=0.0, value=0.0, step=10.0,
+                                       key='max_risk_tab2')
+        with col_streak:
+            losing_streak = st.number_input("Cut Risk after Losses (0 = never)", min_value=0, value=0, step=1,
+                                            key='losing_streak_tab2')
+        with col_cut:
+            risk_cut = st.number_input("Risk during a Losing Streak (%)", min_value=1.0, max_value=100.0, value=50.0,
+                                       step=5.0, key='risk_cut_tab2')
+        use_sizing_rules = use_sizing_rules and risk_type == "Percentage of Equity"
+
+    # Risk optimizer: growth-optimal and drawdown-constrained risk per trade for the stats above
+    with st.expander("Risk per Trade Optimizer"):
+        if risk_type != "Percentage of Equity":
+            st.info("The optimizer searches the risk per trade as a percentage of equity.")
+        col_max_drawdown, col_tolerance, col_optimize = st.columns(3)
+        with col_max_drawdown:
+            optimizer_drawdown = st.number_input("Max Acceptable Drawdown (%)", min_value=1.0, max_value=99.0,
+                                                 value=20.0, step=1.0, key='optimizer_drawdown')
+        with col_tolerance:
+            optimizer_tolerance = st.number_input("Max Probability of Exceeding It (%)", min_value=0.1,
+                                                  max_value=100.0, value=5.0, step=0.5, key='optimizer_tolerance')
+        with col_optimize:
+            if st.button('Optimize Risk', key='optimize_risk', disabled=risk_type != "Percentage of Equity"):
+                st.session_state['risk_optimizer_run'] = (win_percent, win_loss_ratio, trades, simulations,
+                                                          optimizer_drawdown, optimizer_tolerance, seed)
+
+        risk_optimizer_run = st.session_state.get('risk_optimizer_run')
+        if risk_optimizer_run:
+            optimum = simulation_cache.call(optimize_risk, *risk_optimizer_run[:6], seed=risk_optimizer_run[6])
+            col_kelly, col_optimal, col_half, col_constrained = st.columns(4)
+            col_kelly.metric("Kelly Fraction", f"{optimum['kelly']:.2f}%")
+            col_optimal.metric("Simulated Growth-Optimal Risk", f"{optimum['optimal']:.2f}%",
+                               help=f"Mean log growth of {optimum['optimal_growth'] * 100:.3f}% per trade.")
+            col_half.metric("Half Kelly", f"{optimum['optimal'] / 2:.2f}%")
+            if optimum['max_risk'] is None:
+                col_constrained.metric("Max Risk for Drawdown Limit", "None")
+                st.warning("Even the smallest risk per trade exceeds the drawdown limit too often.")
+            else:
+                col_constrained.metric("Max Risk for Drawdown Limit", f"{optimum['max_risk']:.2f}%",
+                                       help=f"Exceeds a {risk_optimizer_run[4]:.0f}% drawdown in "
+                                            f"{optimum['max_risk_probability']:.2f}% of the simulations.")
+                st.button("Use as Risk per Trade", key='apply_optimized_risk',
+                          disabled=risk_type != "Percentage of Equity",
+                          on_click=lambda: st.session_state.update(
+                              risk_per_trade_percent=round(optimum['max_risk'], 2)))
+
+    # Buttons to run and stop the simulation. The inputs of the last run are kept in the session so that
+    # display-only changes (like the Y-axis scale) re-plot the cached results instead of re-simulating.
+    col_run, col_stop, _ = st.columns([1, 1, 4])
+    with col_run:
+        if st.button('Run Simulation', key='simulate_equity_curve'):
+            run_kwargs = {'streaming': streaming, 'seed': seed, 'workers': workers, 'ruin_balance': ruin_balance,
+                          'ruin_drawdown': ruin_drawdown, **({'memory_budget_mb': memory_budget} if streaming else {})}
+            if use_sizing_rules:
+                st.session_state['equity_curve_run'] = {
+                    'builder': sized_equity_curve_run,
+                    'args': (balance, risk_per_trade, win_percent, win_loss_ratio, trades, simulations, stop_distance,
+                             rounding_method, max_risk or None, losing_streak or None, risk_cut / 100),
+                    'kwargs': run_kwargs,
+                }
+            else:
+                st.session_state['equity_curve_run'] = {
+                    'builder': equity_curve_run,
+                    'args': (balance, risk_per_trade, win_percent, win_loss_ratio, trades, simulations, risk_type),
+                    'kwargs': run_kwargs,
+                }
+    with col_stop:
+        if st.button('Stop', key='stop_equity_curve'):
+            stop_run('equity_curve_run')
+
+    equity_curve_request = st.session_state.get('equity_curve_run')
+    if equity_curve_request:
+        # Perform Monte Carlo simulation (or fetch it from the cache) and display results
+        result, run = run_progressively('equity_curve_run', lambda partial: preview_simulations(partial, chart_backend))
+        display_stopped_run(run)
+        if equity_curve_request['kwargs']['streaming']:
+            summary = result
+            simulations_results, bands = summary['sample_paths'], summary
+        else:
+            simulations_results, bands = result, None
+
         st.markdown("#### Simulation Visualization")
         plot_monte_carlo_simulations(
             simulations_results=simulations_results, 
             expected_equity_curve=None,
             x_label='Trade Number', 
             y_label='Equity ($)', 
-            scale_type=use_log_scale 
+            scale_type=use_log_scale,
+            chart_type=chart_type,
+            bands=bands,
+            backend=chart_backend
         )
+        ruin_kwargs = equity_curve_request['kwargs']
+        if ruin_kwargs['streaming']:
+            display_summary_stats(summary, '$')
+            ruin = summary.get('ruin')
+        elif ruin_kwargs['ruin_balance'] is not None or ruin_kwargs['ruin_drawdown'] is not None:
+            ruin = ruin_analysis(simulations_results, ruin_kwargs['ruin_balance'], ruin_kwargs['ruin_drawdown'])
+        else:
+            ruin = None
+        if ruin is not None:
+            display_ruin_stats(ruin)
 
 
 # Tab 2: Know Your System
@@ -298,37 +493,218 @@ with tab2:
     ##### 
     ##### Monte Carlo Simulator Based on Van K. Tharp's Methods
     Input your trading system's stats in R (Risk) units, including standard deviation. This tool will help you understand the expected variability in your trading outcomes, making informed strategic decisions easier.
+    You can also upload your real trade history, as a CSV of R-multiples or as the executions file created by the Tradervue Helper, and resample it instead.
     #
     """)
+    # Trades are either modelled from summary stats or resampled from the trader's own history
+    trade_model = st.radio("Trade Model:", TRADE_MODELS, key='trade_model', horizontal=True,
+                           help="The bootstrap resamples your real R-multiples, keeping fat tails and skew.")
+
     # Initialize input columns for trading system stats
     col1, col2, col3 = st.columns(3)
+    r_multiples = None
 
-    with col1:
-        avg_win = st.number_input("Average Winning Trade (R)", value=1.0, key='avg_win')
-        avg_loss = st.number_input("Average Losing Trade (R)", value=-1.0, key='avg_loss')
+    if trade_model == TRADE_MODELS[0]:
+        with col1:
+            avg_win = st.number_input("Average Winning Trade (R)", value=1.0, key='avg_win')
+            avg_loss = st.number_input("Average Losing Trade (R)", value=-1.0, key='avg_loss')
 
-    with col2:
-        std_dev = st.number_input("Trade Std. Dev. (R)", value=1.0, key='std_dev')
-        win_ratio = st.number_input("Win %", min_value=0.0, max_value=100.0, value=50.0, key='win_ratio') / 100
+        with col2:
+            std_dev = st.number_input("Trade Std. Dev. (R)", value=1.0, key='std_dev')
+            win_ratio = st.number_input("Win %", min_value=0.0, max_value=100.0, value=50.0, key='win_ratio') / 100
+    else:
+        with col1:
+            log_type = st.radio("Trade Log Format:", TRADE_LOG_TYPES, key='trade_log_type', horizontal=True)
+            trade_log = st.file_uploader("Upload your Trade Log (CSV)", type=['csv', 'txt'], key='trade_log')
+            if log_type == TRADE_LOG_TYPES[1]:
+                risk_amount_r = st.number_input("Risk Amount per Trade, 1R ($)", min_value=0.01, value=100.0,
+                                                key='risk_amount_tab1')
+
+        with col2:
+            bootstrap_method = st.radio("Bootstrap Method:", BOOTSTRAP_METHODS, key='bootstrap_method', horizontal=True,
+                                        help="The block bootstrap resamples runs of consecutive trades to keep streaks.")
+            block_length = st.number_input("Block Length (trades)", min_value=2, value=5, step=1, key='block_length',
+                                           disabled=bootstrap_method == BOOTSTRAP_METHODS[0])
+            if bootstrap_method == BOOTSTRAP_METHODS[0]:
+                block_length = 1
+
+        if trade_log is not None:
+            try:
+                if log_type == TRADE_LOG_TYPES[0]:
+                    r_multiples = load_r_multiples_csv(trade_log)
+                else:
+                    r_multiples = load_executions_csv(trade_log, risk_amount_r)
+                st.info(f"Loaded {r_multiples.size:,} trades · Expectancy {r_multiples.mean():.2f}R · "
+                        f"Win {(r_multiples > 0).mean() * 100:.1f}% · Std. Dev. {r_multiples.std():.2f}R")
+            except (ValueError, KeyError) as e:
+                st.error(f"Could not read the trade log: {e}")
+
+    with col1:
+        risk_percent = st.number_input("Risk per Trade (% of Account)", min_value=0.01, max_value=100.0, value=1.0,
+                                       step=0.01, key='risk_percent_tab1',
+                                       help="Size of 1R relative to the starting account, used to express drawdowns in %.")
 
     with col3:
         num_trades = st.number_input("Number of Trades", min_value=1, value=100, key='num_trades_tab1')
         num_simulations = st.number_input("Number of Simulations", min_value=1, value=100, key='num_simulations_tab1')
 
-    # Button to run the simulation
-    if st.button('Run Simulation'):
-        st.warning('Simulations may take some time to complete. Please, wait patiently...')
-        # Perform Monte Carlo simulation and display results
-        results, expected_curve = monte_carlo_simulation(avg_win, avg_loss, std_dev, win_ratio, num_trades, num_simulations)
-        
-        # Clear warning message after simulation is complete
-        st.empty()
+    # Advanced settings: streaming mode keeps memory bounded, seed and workers control reproducibility and speed
+    with st.expander("Advanced Settings"):
+        col_stream_r, col_budget_r, col_seed_r, col_workers_r = st.columns(4)
+        with col_stream_r:
+            streaming_r = st.checkbox("Streaming mode (bounded memory)", key='streaming_tab1',
+                                      help="Simulate in chunks and keep only summary statistics and a sample of paths.")
+        with col_budget_r:
+            memory_budget_r = st.number_input("Memory Budget per Worker (MB)", min_value=16, value=256, step=16,
+                                              key='memory_budget_tab1', disabled=not streaming_r)
+        with col_seed_r:
+            seed_r = st.number_input("Random Seed", min_value=0, value=42, step=1, key='seed_tab1',
+                                     help="The same seed and inputs always reproduce the same simulations.")
+        with col_workers_r:
+            workers_r = st.number_input("Worker Processes", min_value=1, max_value=os.cpu_count() or 1, value=1,
+                                        key='workers_tab1')
+
+    chart_type_r = st.radio("Chart Type:", CHART_TYPES, key='chart_type_tab1', horizontal=True,
+                            help="Percentile bands stay fast and readable with thousands of simulations.")
+
+    # Buttons to run and stop the simulation. The inputs of the last run are kept in the session so that
+    # reruns of the page re-plot the cached results instead of re-simulating.
+    col_run_r, col_stop_r, _ = st.columns([1, 1, 4])
+    with col_run_r:
+        if st.button('Run Simulation', disabled=trade_model == TRADE_MODELS[1] and r_multiples is None):
+            if trade_model == TRADE_MODELS[0]:
+                model_args = (avg_win, avg_loss, std_dev, win_ratio, num_trades, num_simulations)
+            else:
+                model_args = (r_multiples, num_trades, num_simulations, block_length)
+            st.session_state['monte_carlo_run'] = {
+                'builder': MODEL_RUNS[trade_model],
+                'args': model_args,
+                'kwargs': {'streaming': streaming_r, 'seed': seed_r, 'workers': workers_r, 'risk_percent': risk_percent,
+                           **({'memory_budget_mb': memory_budget_r} if streaming_r else {})},
+            }
+    with col_stop_r:
+        if st.button('Stop', key='stop_monte_carlo'):
+            stop_run('monte_carlo_run')
+
+    monte_carlo_request = st.session_state.get('monte_carlo_run')
+    if monte_carlo_request:
+        # Perform Monte Carlo simulation (or fetch it from the cache) and display results
+        result, run = run_progressively('monte_carlo_run', lambda partial: preview_simulations(partial, chart_backend))
+        display_stopped_run(run)
+        if monte_carlo_request['kwargs']['streaming']:
+            summary = result
+            results, expected_curve, bands = summary['sample_paths'], summary['expected_equity_curve'], summary
+        else:
+            results, expected_curve, drawdown_stats = result
+            bands = None
 
         # Display the simulation chart
         st.markdown("#### Simulation Visualization")
-        plot_monte_carlo_simulations(results, expected_curve)
+        plot_monte_carlo_simulations(results, expected_curve, chart_type=chart_type_r, bands=bands, backend=chart_backend)
+        if monte_carlo_request['kwargs']['streaming']:
+            display_summary_stats(summary, 'R')
+        else:
+            display_drawdown_stats(drawdown_stats['stats'], drawdown_stats['histogram'], 'R')
         
 
+# Tab 3: Parameter Sweep
+with tab3:
+    st.markdown("""
+    ##### Parameter Sweep
+    Explore how sensitive your results are to your stats. A whole grid of parameter values is simulated in one batch, and every grid point uses the same random draws, so differences between cells come from the parameters and not from luck.
+    # 
+    """)
+
+    sweep_model = st.radio("Model:", SWEEP_MODELS, key='sweep_model', horizontal=True)
+    col_x, col_y, col_fixed = st.columns(3)
+
+    if sweep_model == SWEEP_MODELS[0]:
+        with col_x:
+            sweep_risk_type = st.radio("Risk per Trade:", ("Percentage of Equity", "Fixed Dollar Amount"),
+                                       key='sweep_risk_type', horizontal=True)
+            if sweep_risk_type == "Percentage of Equity":
+                risk_values = sweep_range_inputs("Risk per Trade (%)", 0.5, 5.0, 0.01, 'sweep_risk_percent',
+                                                 min_value=0.01, max_value=99.99)
+            else:
+                risk_values = sweep_range_inputs("Risk per Trade ($)", 50.0, 500.0, 1.0, 'sweep_risk_dollar')
+        with col_y:
+            sweep_axis = st.radio("Sweep Against:", ("Win %", "Win/Loss Ratio"), key='sweep_axis', horizontal=True)
+            if sweep_axis == "Win %":
+                y_values = sweep_range_inputs("Winning Trades (%)", 30.0, 70.0, 1.0, 'sweep_win_percent',
+                                              min_value=0.0, max_value=100.0)
+            else:
+                y_values = sweep_range_inputs("Win/Loss Ratio", 0.5, 3.0, 0.1, 'sweep_win_loss_ratio')
+        with col_fixed:
+            sweep_balance = st.number_input("Initial Balance ($)", value=10000.0, key='sweep_balance')
+            if sweep_axis == "Win %":
+                fixed_value = st.number_input("Win/Loss Ratio", value=1.5, key='sweep_fixed_ratio')
+            else:
+                fixed_value = st.number_input("Winning Trades (%)", value=50.0, key='sweep_fixed_win_percent')
+    else:
+        with col_x:
+            y_values = sweep_range_inputs("Win %", 30.0, 70.0, 1.0, 'sweep_win_ratio', min_value=0.0, max_value=100.0)
+        with col_y:
+            risk_values = sweep_range_inputs("Win/Loss Ratio", 0.5, 3.0, 0.1, 'sweep_r_win_loss_ratio')
+        with col_fixed:
+            sweep_avg_loss = st.number_input("Average Losing Trade (R)", value=-1.0, key='sweep_avg_loss')
+            sweep_std_dev = st.number_input("Trade Std. Dev. (R)", value=1.0, key='sweep_std_dev')
+            sweep_risk_percent = st.number_input("Risk per Trade (% of Account)", min_value=0.01, max_value=100.0,
+                                                 value=1.0, step=0.01, key='sweep_risk_percent_r')
+
+    col_trades, col_simulations, col_sweep_seed = st.columns(3)
+    with col_trades:
+        sweep_trades = st.number_input("Number of Trades", min_value=1, value=100, key='sweep_trades')
+    with col_simulations:
+        sweep_simulations = st.number_input("Simulations per Grid Point", min_value=1, value=1000,
+                                            key='sweep_simulations')
+    with col_sweep_seed:
+        sweep_seed = st.number_input("Random Seed", min_value=0, value=42, step=1, key='sweep_seed')
+
+    # The sweep inputs are kept in the session, like the simulations of the other tabs
+    if st.button('Run Sweep', key='run_sweep'):
+        if sweep_model == SWEEP_MODELS[0]:
+            win_percent_values, ratio_values = (y_values, (fixed_value,)) if sweep_axis == "Win %" else ((fixed_value,), y_values)
+            st.session_state['sweep_run'] = {
+                'function': sweep_equity_curve,
+                'args': (sweep_balance, risk_values, win_percent_values, ratio_values, sweep_trades, sweep_simulations,
+                         sweep_risk_type),
+                'kwargs': {'seed': sweep_seed},
+                'labels': ("Risk per Trade (%)" if sweep_risk_type == "Percentage of Equity" else "Risk per Trade ($)",
+                           "Winning Trades (%)" if sweep_axis == "Win %" else "Win/Loss Ratio", "Equity ($)"),
+            }
+        else:
+            st.session_state['sweep_run'] = {
+                'function': sweep_monte_carlo,
+                'args': (tuple(value / 100 for value in y_values), risk_values, sweep_avg_loss, sweep_std_dev,
+                         sweep_trades, sweep_simulations),
+                'kwargs': {'seed': sweep_seed, 'risk_percent': sweep_risk_percent},
+                'labels': ("Win/Loss Ratio", "Win %", "R"),
+            }
+
+    sweep_run = st.session_state.get('sweep_run')
+    if sweep_run:
+        sweep = simulation_cache.call(sweep_run['function'], *sweep_run['args'], **sweep_run['kwargs'])
+        x_label, y_label, unit = sweep_run['labels']
+        if sweep_run['function'] is sweep_equity_curve:
+            # Rows of the heatmap are the swept win % or win/loss ratio, columns the risk per trade
+            x_values = sweep['risk']
+            y_values = sweep['win_percent'] if sweep['win_percent'].size > 1 else sweep['win_loss_ratio']
+            median_terminal = sweep['median_terminal'].reshape(x_values.size, y_values.size).T
+            p95_drawdown = sweep['p95_drawdown_pct'].reshape(x_values.size, y_values.size).T
+        else:
+            x_values, y_values = sweep['win_loss_ratio'], sweep['win_ratio'] * 100
+            median_terminal, p95_drawdown = sweep['median_terminal'], sweep['p95_drawdown_pct']
+
+        col_terminal, col_drawdown = st.columns(2)
+        with col_terminal:
+            st.altair_chart(build_heatmap(median_terminal, x_values, y_values, x_label, y_label,
+                                          f"Median ({unit})", title=f"Median Terminal {unit}"), width='stretch')
+        with col_drawdown:
+            st.altair_chart(build_heatmap(p95_drawdown, x_values, y_values, x_label, y_label, "Drawdown (%)",
+                                          title="95th Percentile Max Drawdown (%)", reverse_colors=True),
+                            width='stretch')
+
+
 # Display a disclaimer for educational purposes
 st.markdown("""
     #     
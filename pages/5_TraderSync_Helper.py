@@ -1,10 +1,12 @@
 import streamlit as st
 from datetime import datetime, timedelta
-from decimal import Decimal, ROUND_UP
+from decimal import Decimal
 import re
 import base64
 from io import StringIO
 
+from tradertools.fees import FIRST_FEE_DATE, covered_dates, transaction_fees
+
 
 st.set_page_config(
     page_title="TraderSync Helper · Tradertools",
@@ -34,36 +36,6 @@ def add_logo():
 
 add_logo()
 
-# Constants for the fees
-FINRA_TAF_RATE = Decimal('0.000145')
-FINRA_TAF_CAP = Decimal('7.27')
-SEC_FEE_RATE = Decimal('0.000008')
-
-def calculate_finra_taf(quantity):
-    # Calculate the FINRA TAF fee with a cap and round up to 0.0001
-    fee = (FINRA_TAF_RATE * quantity).quantize(Decimal('0.0001'), rounding=ROUND_UP)
-    return min(fee, FINRA_TAF_CAP)
-
-def calculate_sec_fee(quantity, price):
-    # Calculate the SEC fee and round up to the next penny only for sells
-    fee = (SEC_FEE_RATE * quantity * price).quantize(Decimal('0.01'), rounding=ROUND_UP)
-    return fee
-
-def calculate_transaction_fee(quantity, price, side):
-    # Calculate FINRA TAF for both buy and sell
-    finra_taf_fee = calculate_finra_taf(quantity)
-
-    # Initialize SEC fee to 0
-    sec_fee = Decimal('0')
-
-    # Calculate SEC fee only for sells
-    if side == 'Sell':
-        sec_fee = calculate_sec_fee(quantity, price)
-
-    # The total transaction fee is the sum of both fees
-    total_fee = finra_taf_fee + sec_fee
-    return total_fee
-
 def parse_trade_line(line):
     match = re.search(
         r'(\d{2}/\d{2}/\d{2})\s+(\d{2}:\d{2})\s+(AM|PM)\s+ET\s+(Buy(?: to cover)?|Sell(?: Short)?)\s+(\d+)\s+([A-Z]+)\s+Executed\s+@\s+\$(\d+\.?\d*)', line
@@ -89,8 +61,7 @@ def parse_trade_line(line):
 # Resto del código...
 
 
-def format_trade(trade):
-    trans_fee = calculate_transaction_fee(trade['quantity'], trade['price'], trade['side'])
+def format_trade(trade, trans_fee):
     time_str = trade['time'].strftime('%H:%M:%S')
     return ','.join([
         trade['date'],
@@ -103,7 +74,7 @@ def format_trade(trade):
         str(trans_fee)  # Tarifa de transacción
     ])
 
-def main(file_obj):
+def main(file_obj, skipped=None):
     trades = []
     trade_times = {}
     formatted_trades = []
@@ -121,8 +92,22 @@ def main(file_obj):
                 trade_times[trade_key] = len(trades)
                 trades.append(trade)
     
-    for trade in trades:
-        formatted_trades.append(format_trade(trade))
+    # Executions dated before the fee schedules are left out, and listed in skipped
+    dates = [datetime.strptime(trade['date'], '%m/%d/%Y').date() for trade in trades]
+    covered = covered_dates(dates)
+    if skipped is not None:
+        skipped.extend(f"{trade['date']} {trade['time'].strftime('%H:%M:%S')} {trade['symbol']}"
+                       for trade, is_covered in zip(trades, covered) if not is_covered)
+    trades = [trade for trade, is_covered in zip(trades, covered) if is_covered]
+    dates = [trade_date for trade_date, is_covered in zip(dates, covered) if is_covered]
+
+    # Fees of all the executions at once: the FINRA TAF for both buys and sells, the SEC fee only for sells
+    fees = transaction_fees([trade['quantity'] for trade in trades],
+                            [trade['price'] for trade in trades],
+                            [trade['side'] == 'Sell' for trade in trades],
+                            dates)
+    for trade, trans_fee in zip(trades, fees):
+        formatted_trades.append(format_trade(trade, trans_fee))
     
     return formatted_trades
 
@@ -133,6 +118,12 @@ def display_results_and_download_button(results, key):
         st.text_area("Results", result_text, height=300, key=key)
         st.markdown(get_table_download_link_csv([header] + results), unsafe_allow_html=True)
 
+def show_skipped_executions(skipped):
+    # The executions left out of the conversion, because their fees are not known
+    if skipped:
+        st.warning(f"{len(skipped)} execution(s) dated before {FIRST_FEE_DATE} were left out, as their fees are not "
+                   f"known: {', '.join(skipped[:5])}{', ...' if len(skipped) > 5 else ''}")
+
 def get_table_download_link_csv(results):
     csv = '\n'.join(results).encode('utf-8')
     b64 = base64.b64encode(csv).decode()
@@ -157,9 +148,14 @@ st.markdown("---")
 st.subheader("Upload your text file with Alerts")
 uploaded_file = st.file_uploader("Choose a file", type=['txt'])
 if uploaded_file is not None:
-    results = main(uploaded_file)
-    # Pass a unique key for the uploaded file's results
-    display_results_and_download_button(results, key="uploaded_file_results_text_area")
+    try:
+        skipped = []
+        results = main(uploaded_file, skipped)
+        # Pass a unique key for the uploaded file's results
+        display_results_and_download_button(results, key="uploaded_file_results_text_area")
+        show_skipped_executions(skipped)
+    except ValueError as e:
+        st.error(str(e))
 
 st.markdown("---")
 st.subheader("Or paste your Alerts Text here")
@@ -168,9 +164,14 @@ apply_button = st.button('Apply pasted data')
 if apply_button and trade_data:
     from io import StringIO
     trade_data_file = StringIO(trade_data)
-    results = main(trade_data_file)
-    # Pass a unique key for the pasted data's results
-    display_results_and_download_button(results, key="pasted_data_results_text_area")
+    try:
+        skipped = []
+        results = main(trade_data_file, skipped)
+        # Pass a unique key for the pasted data's results
+        display_results_and_download_button(results, key="pasted_data_results_text_area")
+        show_skipped_executions(skipped)
+    except ValueError as e:
+        st.error(str(e))
 
 # Disclaimer
 st.markdown("""
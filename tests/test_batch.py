@@ -0,0 +1,52 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from tradertools.__main__ import main
+from tradertools.batch import MANIFEST_NAME, run_batch
+
+
+def bootstrap_config():
+    return {"engine": "bootstrap", "parameters": {"r_multiples_file": "history.csv", "num_trades": 20},
+            "num_simulations": 50, "seed": 7}
+
+
+def test_manifest_reproduces_a_batch_with_an_r_multiples_file(tmp_path):
+    (tmp_path / "inputs").mkdir()
+    history = tmp_path / "inputs" / "history.csv"
+    history.write_text("R\n2\n-1\n-1\n3\n-1\n")
+    manifest = run_batch(bootstrap_config(), tmp_path / "first", base_directory=tmp_path / "inputs")
+    assert manifest["config"]["parameters"]["r_multiples_file"] == str(history)
+    assert list(manifest["config"]["file_hashes"]) == [str(history)]
+
+    # The manifest lives in another directory than the history, which it still finds
+    assert main([str(tmp_path / "first" / MANIFEST_NAME), "--output", str(tmp_path / "second")]) == 0
+    np.testing.assert_array_equal(np.load(tmp_path / "first" / "point_0000.npy"),
+                                  np.load(tmp_path / "second" / "point_0000.npy"))
+
+
+def test_manifest_refuses_a_changed_r_multiples_file(tmp_path):
+    (tmp_path / "history.csv").write_text("R\n2\n-1\n")
+    run_batch(bootstrap_config(), tmp_path / "first", base_directory=tmp_path)
+    (tmp_path / "history.csv").write_text("R\n5\n-1\n")
+    with open(os.path.join(tmp_path, "first", MANIFEST_NAME)) as f:
+        config = json.load(f)["config"]
+    with pytest.raises(ValueError, match="changed"):
+        run_batch(config, tmp_path / "second")
+
+
+@pytest.mark.parametrize("grid", [{"grid": None}, {}])
+def test_missing_or_null_grid(tmp_path, grid):
+    parameters = {"balance": 10000, "risk_per_trade": 1, "win_percent": 50, "win_loss_ratio": 2, "num_trades": 20,
+                  "risk_type": "Percentage of Equity"}
+    config = {"engine": "equity_curve", "parameters": parameters, "num_simulations": 10, "seed": 3, **grid}
+    manifest = run_batch(config, tmp_path)
+    assert manifest["config"]["grid"] == {}
+    assert len(manifest["points"]) == 1
+
+
+def test_invalid_grid(tmp_path):
+    with pytest.raises(ValueError, match="'grid' must be an object"):
+        run_batch({"engine": "equity_curve", "grid": [1, 2]}, tmp_path)
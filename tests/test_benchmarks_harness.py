@@ -0,0 +1,23 @@
+import time
+
+from benchmarks.harness import find_regressions, time_function
+
+
+def test_short_functions_are_timed_per_call():
+    median, spread = time_function(lambda: time.sleep(0.002), repeat=3, min_sample_seconds=0.02)
+    assert 0.0015 < median < 0.02
+    assert spread >= 0
+
+
+def test_slowdowns_within_the_noise_are_not_regressions():
+    baseline = {"case": {"time_s": 0.100, "time_spread_s": 0.040, "peak_mb": None}}
+    noisy = {"case": {"time_s": 0.140, "time_spread_s": 0.030, "peak_mb": None}}
+    slower = {"case": {"time_s": 0.250, "time_spread_s": 0.010, "peak_mb": None}}
+    assert find_regressions(noisy, baseline) == []
+    assert len(find_regressions(slower, baseline)) == 1
+
+
+def test_baselines_without_a_spread_still_compare():
+    baseline = {"case": {"time_s": 0.100, "peak_mb": 10.0}}
+    result = {"case": {"time_s": 0.200, "time_spread_s": 0.001, "peak_mb": 20.0}}
+    assert len(find_regressions(result, baseline)) == 2
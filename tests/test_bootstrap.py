@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradertools.bootstrap import bootstrap_paths, r_multiples_from_executions
+
+# Distinct R-multiples, so that every resampled trade tells which trade of the history it is
+HISTORY = np.arange(7) + 0.5
+
+
+def resampled_indices(paths):
+    trades = np.diff(paths, axis=1, prepend=0)
+    return np.rint(trades - 0.5).astype(int)
+
+
+def test_iid_bootstrap_draws_trades_of_the_history():
+    paths = bootstrap_paths(np.random.default_rng(0), 50, HISTORY, 40)
+    assert paths.shape == (50, 40)
+    indices = resampled_indices(paths)
+    np.testing.assert_allclose(HISTORY[indices], np.diff(paths, axis=1, prepend=0))
+    assert set(indices.ravel().tolist()) == set(range(HISTORY.size))
+
+
+@pytest.mark.parametrize("block_length, num_trades", [(3, 10), (7, 14), (10, 25)])
+def test_circular_block_bootstrap_keeps_runs_of_consecutive_trades(block_length, num_trades):
+    paths = bootstrap_paths(np.random.default_rng(1), 200, HISTORY, num_trades, block_length=block_length)
+    indices = resampled_indices(paths)
+    assert paths.shape == (200, num_trades)
+    # Within a block every trade follows the previous one in the history, wrapping around at its end
+    follows = indices[:, 1:] == (indices[:, :-1] + 1) % HISTORY.size
+    within_block = np.arange(1, num_trades) % block_length != 0
+    assert follows[:, within_block].all()
+    # Blocks start anywhere in the history
+    assert set(indices[:, 0].tolist()) == set(range(HISTORY.size))
+
+
+def test_bootstrap_is_reproducible():
+    first, second = (bootstrap_paths(np.random.default_rng(2), 20, HISTORY, 30, block_length=4) for _ in range(2))
+    np.testing.assert_array_equal(first, second)
+
+
+def executions():
+    # Two AAPL trades, a short AMD trade closed in between and a TSLA trade still open, not in time order
+    rows = [
+        ("01/03/2024", "09:30:00", "AAPL", 10, 5.0, "Buy", 0.0, 0.0),
+        ("01/03/2024", "09:31:00", "AAPL", 10, 4.0, "Sell", 0.0, 0.0),
+        ("01/02/2024", "09:30:00", "AAPL", 100, 10.0, "Buy", 1.0, 0.0),
+        ("01/02/2024", "09:31:00", "AMD", 10, 20.0, "Short", 0.0, 0.0),
+        ("01/02/2024", "09:32:00", "AAPL", 50, 11.0, "Sell", 0.0, 0.01),
+        ("01/02/2024", "09:33:00", "TSLA", 5, 200.0, "Buy", 0.0, 0.0),
+        ("01/02/2024", "09:34:00", "AMD", 10, 18.0, "Cover", 0.0, 0.0),
+        ("01/02/2024", "09:35:00", "AAPL", 50, 12.0, "Sell", 1.0, 0.02),
+    ]
+    return pd.DataFrame(rows, columns=["Date", "Time", "Symbol", "Quantity", "Price", "Side", "Commission",
+                                       "TransFee"])
+
+
+def test_executions_are_grouped_into_round_trips():
+    # In closing order: AMD +$20, AAPL +$150 less $2.03 of costs, then AAPL -$10; 1R is $50
+    r_multiples = r_multiples_from_executions(executions(), 50)
+    np.testing.assert_allclose(r_multiples, [0.4, 147.97 / 50, -0.2])
+
+
+def test_executions_without_costs():
+    r_multiples = r_multiples_from_executions(executions().drop(columns=["Commission", "TransFee"]), 100)
+    np.testing.assert_allclose(r_multiples, [0.2, 1.5, -0.1])
+
+
+def test_invalid_executions():
+    with pytest.raises(ValueError, match="risk amount"):
+        r_multiples_from_executions(executions(), 0)
+    invalid = executions()
+    invalid.loc[1, "Side"] = "Hold"
+    with pytest.raises(ValueError, match="Hold"):
+        r_multiples_from_executions(invalid, 50)
@@ -0,0 +1,65 @@
+import numpy as np
+
+from tradertools.cache import ResultCache, result_nbytes
+
+
+def simulate(size, scale=1.0, seed=None, workers=1):
+    simulate.calls += 1
+    return np.random.default_rng(seed).random(size) * scale
+
+
+simulate.calls = 0
+
+
+def test_unseeded_calls_are_never_cached():
+    cache = ResultCache()
+    calls = simulate.calls
+    for args, kwargs in [((4,), {}), ((4,), {'seed': None}), ((4, 1.0, None), {})]:
+        cache.call(simulate, *args, **kwargs)
+        cache.call(simulate, *args, **kwargs)
+    assert simulate.calls == calls + 6
+    assert len(cache) == 0
+
+
+def test_positional_keyword_and_default_arguments_share_a_key():
+    cache = ResultCache()
+    calls = simulate.calls
+    first = cache.call(simulate, 4, seed=7)
+    assert cache.call(simulate, 4, 1.0, 7) is first
+    assert cache.call(simulate, size=4, scale=1.0, seed=7, workers=4) is first
+    assert simulate.calls == calls + 1
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.call(simulate, 4, 2.0, 7) is not first
+    assert ResultCache.make_key(simulate, (4,), {'seed': 7}) == ResultCache.make_key(simulate, (4, 1.0, 7), {})
+
+
+def test_keys_of_arrays_follow_their_content():
+    key = ResultCache.make_key(simulate, (np.arange(3),), {'seed': 1})
+    assert ResultCache.make_key(simulate, (np.arange(3),), {'seed': 1}) == key
+    assert ResultCache.make_key(simulate, (np.arange(4),), {'seed': 1}) != key
+    assert ResultCache.make_key(simulate, (np.arange(3.0),), {'seed': 1}) != key
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    entry_bytes = result_nbytes(np.zeros(100))
+    cache = ResultCache(max_bytes=3 * entry_bytes)
+    for key in 'abc':
+        cache.put(key, np.zeros(100))
+    cache.get('a')
+    cache.put('d', np.zeros(100))
+    assert 'b' not in cache
+    assert all(key in cache for key in 'acd')
+    assert cache.current_bytes == 3 * entry_bytes
+
+
+def test_byte_cap():
+    cache = ResultCache(max_bytes=1000)
+    cache.put('small', np.zeros(50))
+    cache.put('large', np.zeros(200))
+    assert 'large' not in cache and 'small' in cache
+    cache.put('medium', np.zeros(100))
+    assert 'small' not in cache and 'medium' in cache
+    assert cache.current_bytes == 800 <= cache.max_bytes
+    cache.put('medium', np.zeros(10))
+    assert cache.current_bytes == 80
+    assert not cache.get('medium').flags.writeable
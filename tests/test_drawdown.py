@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from tradertools.drawdown import drawdown_analytics
+
+# Account values: a drawdown recovered after one trade, one never recovered, and a flat curve
+ACCOUNT_PATHS = np.array([
+    [100, 110, 99, 88, 121, 110, 132],
+    [100, 90, 80, 85, 70, 75, 72],
+    [100, 100, 100, 100, 100, 100, 100],
+], dtype=float)
+
+# Cumulative R of two systems, starting from 0 R before the first trade
+R_PATHS = np.array([
+    [1, -1, -2, 3],
+    [-1, -2, 0, 1],
+], dtype=float)
+
+
+@pytest.mark.parametrize("memory_budget_mb", [128, 1e-9])
+def test_account_curves(memory_budget_mb):
+    analytics = drawdown_analytics(ACCOUNT_PATHS, memory_budget_mb=memory_budget_mb)
+    assert analytics['max_drawdown'].tolist() == [-22, -30, 0]
+    np.testing.assert_allclose(analytics['max_drawdown_pct'], [-20, -30, 0])
+    assert analytics['max_drawdown_duration'].tolist() == [2, 6, 0]
+    np.testing.assert_array_equal(analytics['time_to_recovery'], [1, np.nan, 0])
+    assert analytics['longest_losing_streak'].tolist() == [2, 2, 0]
+
+
+def test_r_curves():
+    # Every R is 1% of the starting account, so a drawdown of 3 R from a peak of 1 R is 0.03 / 1.01
+    analytics = drawdown_analytics(R_PATHS, start_value=0, risk_percent=1.0)
+    assert analytics['max_drawdown'].tolist() == [-3, -2]
+    np.testing.assert_allclose(analytics['max_drawdown_pct'], [-3 / 1.01, -2])
+    assert analytics['max_drawdown_duration'].tolist() == [2, 2]
+    np.testing.assert_array_equal(analytics['time_to_recovery'], [1, 1])
+    assert analytics['longest_losing_streak'].tolist() == [2, 2]
+
+
+def test_wiped_out_account():
+    analytics = drawdown_analytics(np.array([[100.0, 50.0, -20.0, 10.0]]))
+    assert analytics['max_drawdown'].tolist() == [-120]
+    assert analytics['max_drawdown_pct'].tolist() == [-100]
+
+
+def test_no_paths():
+    analytics = drawdown_analytics(np.empty((0, 5)))
+    assert all(values.size == 0 for values in analytics.values())
@@ -0,0 +1,97 @@
+from datetime import date, timedelta
+import random
+
+import numpy as np
+import pytest
+
+from tradertools.fees import (FINRA_TAF_SCHEDULE, FIRST_FEE_DATE, SEC_FEE_SCHEDULE, covered_dates,
+                              transaction_fee_reference, transaction_fee_units, transaction_fees)
+
+
+def reference_fees(quantities, prices, sales, dates):
+    return [str(transaction_fee_reference(quantity, price, is_sale, trade_date))
+            for quantity, price, is_sale, trade_date in zip(quantities, prices, sales, dates)]
+
+
+def assert_matches_reference(quantities, prices, sales, dates):
+    fees = transaction_fees(quantities, prices, sales, dates).tolist()
+    assert fees == reference_fees(quantities, prices, sales, dates)
+    return fees
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_executions_match_the_reference(seed):
+    rng = random.Random(seed)
+    first_date = date.fromisoformat(FIRST_FEE_DATE)
+    num_executions = 2000
+    quantities = [rng.choice((0, 1, 100, rng.randint(1, 100000), rng.randint(1, 10 ** 9))) for _ in range(num_executions)]
+    prices = []
+    for _ in range(num_executions):
+        decimals = rng.randint(0, 6)
+        prices.append(f"{rng.randint(0, 10 ** 8) / 10 ** decimals:.{decimals}f}")
+    sales = [rng.random() < 0.5 for _ in range(num_executions)]
+    dates = [first_date + timedelta(days=rng.randrange(5 * 365)) for _ in range(num_executions)]
+    assert_matches_reference(quantities, prices, sales, dates)
+
+
+@pytest.mark.parametrize("quantity, trade_date, fee", [
+    (49923, "2022-06-01", "6.4900"),  # TAF exactly at the 2022 maximum: not capped, four decimals
+    (49924, "2022-06-01", "6.49"),
+    (50000, "2024-06-01", "8.3000"),  # TAF exactly at the 2024 maximum
+    (50001, "2024-06-01", "8.30"),
+    (10 ** 9, "2023-06-01", "7.27"),
+    (50001, "2021-06-01", "5.95"),
+    (50000, "2022-03-01", "6.49"),
+])
+def test_taf_at_the_maximum(quantity, trade_date, fee):
+    assert assert_matches_reference([quantity], ["10"], [False], [trade_date]) == [fee]
+
+
+def test_notionals_too_large_for_int64():
+    quantities = [10 ** 12, 10 ** 20, 100]
+    prices = ["99999.999999", "12.5", "1"]
+    units, _ = transaction_fee_units(quantities, prices, [True] * 3, ["2024-06-01"] * 3)
+    assert units.dtype == object
+    assert_matches_reference(quantities, prices, [True] * 3, ["2024-06-01"] * 3)
+
+
+def test_mixed_price_scales():
+    prices = ["12.5", "0.000001", "100", "1E+2", "012.50", "7", "0.0001", "99999.999999"]
+    num_prices = len(prices)
+    assert_matches_reference([12345] * num_prices, prices, [True] * num_prices, ["2024-06-01"] * num_prices)
+
+
+def test_schedule_boundaries():
+    # Every change of rates, the day before it and the day after, when the schedules cover them
+    first_date = date.fromisoformat(FIRST_FEE_DATE)
+    changes = [date.fromisoformat(row[0]) for row in SEC_FEE_SCHEDULE + FINRA_TAF_SCHEDULE]
+    dates = sorted({change + timedelta(days=offset) for change in changes for offset in (-1, 0, 1)
+                    if change + timedelta(days=offset) >= first_date})
+    num_dates = len(dates)
+    fees = assert_matches_reference([50000] * num_dates, ["182.52"] * num_dates, [True] * num_dates, dates)
+    assert fees[dates.index(date(2024, 5, 21))] != fees[dates.index(date(2024, 5, 22))]
+
+
+def test_fees_before_mid_2022():
+    # SEC fee of $5.10 per million until 2022-05-21, FINRA TAF of $0.000119 in 2021 and $0.000130 in 2022
+    assert assert_matches_reference([100, 100], ["10", "10"], [True, True], ["2021-03-04", "2022-05-21"]) == \
+        ["0.0219", "0.0230"]
+
+
+@pytest.mark.parametrize("trade_date", ["2021-02-24", "2020-06-01", None])
+def test_uncovered_dates_raise(trade_date):
+    with pytest.raises(ValueError):
+        transaction_fees([100], ["10"], [True], [trade_date])
+    with pytest.raises(ValueError):
+        transaction_fee_reference(100, "10", True, trade_date)
+
+
+def test_covered_dates():
+    dates = ["2021-02-24", FIRST_FEE_DATE, None, "2024-06-01"]
+    assert covered_dates(dates).tolist() == [False, True, False, True]
+    assert covered_dates([]).tolist() == []
+
+
+def test_empty_batch():
+    assert transaction_fees([], [], [], []).tolist() == []
+    assert transaction_fees(np.array([], dtype=np.int64), [], [], []).size == 0
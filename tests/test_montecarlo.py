@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from tradertools.montecarlo import equity_curve_paths, stream_equity_curve, stream_monte_carlo
+
+
+def assert_same_results(result, expected):
+    # Summaries are dicts of arrays and scalars, possibly nested; NaNs compare equal
+    if isinstance(expected, dict):
+        assert result.keys() == expected.keys()
+        for key in expected:
+            assert_same_results(result[key], expected[key])
+    elif isinstance(expected, (list, tuple)):
+        assert len(result) == len(expected)
+        for item, expected_item in zip(result, expected):
+            assert_same_results(item, expected_item)
+    else:
+        np.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize("risk_type", ["Fixed Dollar Amount", "Percentage of Equity"])
+def test_ruin_with_integer_parameters(risk_type):
+    # Integer risk and win/loss ratio give the same paths as their float values
+    args = (200, 1000, 10, 50, 2, 100, risk_type)
+    integer_paths = equity_curve_paths(np.random.default_rng(0), *args, ruin_balance=500)
+    float_paths = equity_curve_paths(np.random.default_rng(0), 200, 1000.0, 10.0, 50, 2.0, 100, risk_type,
+                                     ruin_balance=500.0)
+    assert integer_paths.dtype == np.float64
+    np.testing.assert_array_equal(integer_paths, float_paths)
+
+
+def test_ruined_paths_are_frozen():
+    paths = equity_curve_paths(np.random.default_rng(1), 500, 1000, 100, 40, 1, 200, "Fixed Dollar Amount",
+                               ruin_balance=500)
+    ruined = (paths <= 500).any(axis=1)
+    assert ruined.any()
+    assert (paths[ruined, -1] == 500).all()
+
+
+@pytest.mark.parametrize("stream, args", [
+    (stream_monte_carlo, (1.5, -1.0, 1.0, 0.45, 200, 3000)),
+    (stream_equity_curve, (10000, 1, 45, 1.5, 200, 3000, "Percentage of Equity")),
+])
+def test_streaming_results_do_not_depend_on_workers(stream, args):
+    # A small memory budget splits the run in several blocks, shared between the processes
+    one, two = (stream(*args, memory_budget_mb=1, seed=11, workers=workers) for workers in (1, 2))
+    assert_same_results(two, one)
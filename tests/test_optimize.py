@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from tradertools.montecarlo import simulate_equity_curve
+from tradertools.optimize import (RISK_TOLERANCE, bisect_largest, drawdown_probability, golden_section_max,
+                                  growth_rate, kelly_fraction, optimize_risk)
+
+
+@pytest.mark.parametrize("win_percent, win_loss_ratio, kelly", [
+    (55, 1.5, 25.0),
+    (50, 1.0, 0.0),
+    (30, 1.0, 0.0),  # Losing system
+    (60, 0.0, 0.0),  # Wins of nothing
+    (60, -1.0, 0.0),
+])
+def test_kelly_fraction(win_percent, win_loss_ratio, kelly):
+    assert kelly_fraction(win_percent, win_loss_ratio) == pytest.approx(kelly)
+
+
+def test_optimizer_rejects_a_ratio_that_is_not_positive():
+    with pytest.raises(ValueError):
+        optimize_risk(50, 0.0, 100, 100, seed=1)
+
+
+@pytest.mark.parametrize("peak", [0.0, 3.7, 42.0, 99.0])
+def test_golden_section_max(peak):
+    assert golden_section_max(lambda x: -(x - peak) ** 2, 0.0, 99.0) == pytest.approx(peak, abs=RISK_TOLERANCE)
+
+
+def test_bisect_largest():
+    assert bisect_largest(lambda x: x <= 42.3, 0.0, 99.0) == pytest.approx(42.3, abs=RISK_TOLERANCE)
+    assert bisect_largest(lambda x: x <= 42.3, 0.0, 99.0) <= 42.3
+    assert bisect_largest(lambda x: True, 0.0, 99.0) == 99.0
+    assert bisect_largest(lambda x: False, 0.0, 99.0) is None
+
+
+def simulated_paths(risk_percent):
+    # The wins of the simulator only depend on the seed, so every risk is evaluated on the same draws
+    return simulate_equity_curve(10000, risk_percent, 55, 1.5, 200, 500, "Percentage of Equity", seed=2)
+
+
+def test_optimum_agrees_with_the_simulator_under_the_same_draws():
+    paths = simulated_paths(5.0)
+    cumulative_wins = np.cumsum((np.diff(paths, axis=1) > 0).T, axis=0, dtype=np.int32)
+
+    # Growth and drawdown probability of the optimizer are those of the simulated paths
+    assert growth_rate(5.0, cumulative_wins, 1.5) == pytest.approx(np.log(paths[:, -1] / 10000).mean() / 200)
+    max_drawdown = (1 - paths / np.maximum.accumulate(paths, axis=1)).max(axis=1) * 100
+    assert drawdown_probability(5.0, cumulative_wins, 1.5, 10.0) == (max_drawdown > 10.0).mean()
+
+    # Near the Kelly fraction, and no nearby risk gives the simulator a higher growth
+    optimal = golden_section_max(lambda risk: growth_rate(risk, cumulative_wins, 1.5), 0.0, 99.0)
+    assert optimal == pytest.approx(kelly_fraction(55, 1.5), abs=2.0)
+    simulated_growth = [np.log(simulated_paths(risk)[:, -1]).mean() for risk in (optimal - 0.5, optimal, optimal + 0.5)]
+    assert simulated_growth[1] == max(simulated_growth)
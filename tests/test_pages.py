@@ -0,0 +1,34 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+
+PAGES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pages")
+
+MIXED_ALERTS = """02/24/21 09:31 AM ET Buy 100 AAPL Executed @ $12.50
+03/04/21 09:32 AM ET Sell 100 AAPL Executed @ $12.75
+06/01/22 10:15 AM ET Sell Short 200 AMD Executed @ $101.20
+"""
+
+
+def paste_alerts(page):
+    app = AppTest.from_file(os.path.join(PAGES, page), default_timeout=30).run()
+    app.text_area(key="trade_data_text_area").input(MIXED_ALERTS)
+    app.button[0].click().run()
+    assert not app.exception and not app.error
+    return app
+
+
+def test_tradervue_helper_converts_the_covered_alerts_of_a_mixed_paste():
+    app = paste_alerts("4_Tradervue_Helper.py")
+    lines = app.text_area(key="pasted_data_results_text_area").value.splitlines()
+    assert [line.split(',')[0] for line in lines[1:]] == ["03/04/21", "06/01/22"]
+    assert len(app.warning) == 1 and "02/24/21 09:31:00 AAPL" in app.warning[0].value
+
+
+def test_tradersync_helper_converts_the_covered_alerts_of_a_mixed_paste():
+    app = paste_alerts("5_TraderSync_Helper.py")
+    lines = app.text_area(key="pasted_data_results_text_area").value.splitlines()
+    assert lines[1:] == ["03/04/2021,09:32:00,AAPL,100,12.75,Sell,0.00,0.0219",
+                         "06/01/2022,10:15:00,AMD,200,101.20,Sell,0.00,0.4960"]
+    assert len(app.warning) == 1 and "02/24/2021 09:31:00 AAPL" in app.warning[0].value
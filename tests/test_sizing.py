@@ -0,0 +1,64 @@
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradertools.montecarlo import equity_curve_paths
+from tradertools.ruin import freeze_ruined_paths, ruin_times
+from tradertools.sizing import (ROUNDING_STEPS, _sized_curves_numba, load_watchlist_csv, size_watchlist,
+                                sized_equity_curve_paths, sized_equity_curve_reference, sized_equity_curves)
+
+NUMBA = pytest.mark.skipif(_sized_curves_numba is None, reason="Numba is not installed")
+ENGINES = [pytest.param("numba", marks=NUMBA), "numpy"]
+
+
+def test_watchlist_with_a_blank_side():
+    # Only the row without a side is rejected; the sides of the other rows are kept whole
+    watchlist = pd.DataFrame({"Symbol": ["AAPL", "AMD", "TSLA"], "Side": ["Long", np.nan, "Short"],
+                              "Entry": [10.0, 10.0, 10.0], "Stop": [9.0, 9.0, 11.0]})
+    sized = size_watchlist(watchlist, 100, "No Rounding")
+    assert sized["Side"].tolist() == ["Long", "", "Short"]
+    assert sized["Error"].tolist() == ["", "Unknown side", ""]
+    assert sized["Shares"].tolist()[::2] == [100, 100]
+
+
+def test_watchlist_csv_with_a_blank_side():
+    watchlist = load_watchlist_csv(StringIO("Symbol,Side,Entry,Stop\nAAPL,Long,10,9\nAMD,,10,9\n"))
+    assert watchlist["Side"].tolist() == ["Long", ""]
+    assert size_watchlist(watchlist, 100, "No Rounding")["Error"].tolist() == ["", "Unknown side"]
+
+
+@pytest.mark.parametrize("ruin", [{"ruin_balance": 7000.0}, {"ruin_drawdown": 30.0}])
+def test_sized_paths_are_frozen_at_ruin(ruin):
+    args = (400, 10000, 5, 40, 1.5, 150, 1.0, "Round nearest 10")
+    free = sized_equity_curve_paths(np.random.default_rng(3), *args)
+    frozen = sized_equity_curve_paths(np.random.default_rng(3), *args, **ruin)
+    times = ruin_times(free, **ruin)
+    ruined = ~np.isnan(times)
+    assert ruined.any() and not ruined.all()
+    np.testing.assert_array_equal(frozen[~ruined], free[~ruined])
+    for path, free_path, time in zip(frozen[ruined], free[ruined], times[ruined].astype(int)):
+        np.testing.assert_array_equal(path[:time + 1], free_path[:time + 1])
+        assert (path[time:] == path[time]).all()
+
+
+@pytest.mark.parametrize("ruin", [{"ruin_balance": 7000.0}, {"ruin_drawdown": 30.0}])
+def test_freezing_matches_the_unsized_ruin_engine(ruin):
+    # Paths of the unsized engine are already frozen, so freezing them again changes nothing
+    paths = equity_curve_paths(np.random.default_rng(4), 400, 10000, 5, 40, 1.5, 150, "Percentage of Equity", **ruin)
+    np.testing.assert_array_equal(freeze_ruined_paths(paths, **ruin), paths)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("rounding_method", list(ROUNDING_STEPS))
+@pytest.mark.parametrize("max_risk", [None, 150.0])
+@pytest.mark.parametrize("losing_streak", [None, 3])
+def test_engines_match_the_reference(engine, rounding_method, max_risk, losing_streak):
+    # A risk of 2% of $10,000 is above the cap at first, and the cut applies from the third loss in a row
+    wins = np.random.default_rng(5).random((20, 200)) < 0.45
+    parameters = {"balance": 10000.0, "risk_percent": 2.0, "win_loss_ratio": 1.8, "stop_distance": 0.37,
+                  "rounding_method": rounding_method, "max_risk": max_risk, "losing_streak": losing_streak,
+                  "risk_cut": 0.5}
+    np.testing.assert_array_equal(sized_equity_curves(wins, engine=engine, **parameters),
+                                  sized_equity_curve_reference(wins, **parameters))
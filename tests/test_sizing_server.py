@@ -0,0 +1,57 @@
+import pytest
+
+from tradertools.sizing_server import size_batch, size_single
+
+
+def single_result(order):
+    # Result of /size, with the error of a rejected order like the handler answers it
+    try:
+        return size_single(order)
+    except ValueError as error:
+        return {"error": str(error)}
+
+
+@pytest.mark.parametrize("order", [
+    {"side": "Long", "entry": 12.5, "stop": 12.1, "risk": 100, "rounding": "Round nearest 10"},
+    {"side": "Short", "entry": 12.5, "stop": 13.0, "account_size": 10000, "risk_percent": 1},
+    {"side": "Long", "entry": 12.5, "stop": 12.1, "risk": 0},
+    {"side": "Long", "entry": 12.5, "stop": 12.1, "risk": -5},
+    {"side": "Long", "entry": 12.5, "stop": 12.1},
+    {"side": "Long", "entry": 12.5, "stop": 12.1, "account_size": 10000},
+])
+def test_batch_and_single_orders_share_the_risk_rules(order):
+    assert size_batch({"orders": [order]})["results"] == [single_result(order)]
+
+
+@pytest.mark.parametrize("order, error", [
+    ({"side": "Sideways", "entry": 12.5, "stop": 12.1, "risk": 100}, "Unknown side"),
+    ({"entry": 12.5, "stop": 12.1, "risk": 100}, "Unknown side"),
+    ({"side": "Long", "stop": 12.1, "risk": 100}, "Missing entry or stop price"),
+    ({"side": "Short", "entry": 12.5, "stop": None, "risk": 100}, "Missing entry or stop price"),
+    ({"side": "Long", "entry": 12.5, "stop": 12.9, "risk": 100}, "Stop must be below the entry for long trades"),
+    ({"side": "Long", "entry": 12.5, "stop": 12.5, "risk": 100}, "Stop must be below the entry for long trades"),
+    ({"side": "Short", "entry": 12.5, "stop": 12.1, "risk": 100}, "Stop must be above the entry for short trades"),
+    ({"side": "Long", "entry": 12.5, "stop": 12.1, "risk": 100, "rounding": "Round up"}, "Unknown rounding: Round up"),
+    # With several errors, both endpoints report the same one
+    ({"side": "Sideways", "stop": 12.1, "risk": -5}, "Unknown side"),
+    ({"side": "Long", "stop": 12.1, "risk": -5}, "Missing entry or stop price"),
+    ({"side": "Long", "entry": 12.5, "stop": 12.9, "risk": -5}, "Risk must not be negative"),
+    ({"side": "Sideways", "entry": 12.5, "stop": 12.1, "rounding": "Round up"}, "Missing risk"),
+])
+def test_batch_and_single_orders_share_the_error_messages(order, error):
+    single = single_result(order)
+    assert size_batch({"orders": [order]})["results"] == [single]
+    assert single["error"].startswith(error)
+
+
+def test_zero_risk_gives_zero_shares():
+    order = {"side": "Long", "entry": 12.5, "stop": 12.1, "risk": 0}
+    assert size_single(order)["shares"] == 0
+    assert size_batch({"orders": [order]})["results"][0]["shares"] == 0
+
+
+def test_missing_risk_error_is_kept_in_batches():
+    results = size_batch({"orders": [{"side": "Long", "entry": 12.5, "stop": 12.1},
+                                     {"side": "Long", "entry": 12.5, "stop": 12.1, "risk": 100}]})["results"]
+    assert results[0]["error"].startswith("Missing risk")
+    assert results[1]["shares"] == 250
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from tradertools.streaming import QuantileSketch, RunningMoments
+
+PERCENTILES = [0, 1, 5, 25, 50, 75, 95, 99, 100]
+
+
+def sample_values(seed, size=(20000, 3)):
+    # Columns of negative and positive values of very different scales, with exact zeros among them
+    rng = np.random.default_rng(seed)
+    values = rng.normal(0, 1, size) * np.array([1.0, 1000.0, 0.01]) + np.array([0.0, 500.0, -0.02])
+    values[rng.random(size) < 0.05] = 0.0
+    return values
+
+
+@pytest.mark.parametrize("relative_accuracy", [0.01, 0.05])
+def test_quantiles_are_within_the_relative_accuracy(relative_accuracy):
+    values = sample_values(0)
+    sketch = QuantileSketch(values.shape[1], relative_accuracy)
+    sketch.add(values)
+    expected = np.percentile(values, PERCENTILES, axis=0, method='lower')
+    np.testing.assert_allclose(sketch.quantiles(PERCENTILES), expected, rtol=relative_accuracy * (1 + 1e-9))
+
+
+def test_merged_sketches_match_a_single_sketch():
+    values = sample_values(1)
+    whole = QuantileSketch(values.shape[1])
+    whole.add(values)
+    chunks = [QuantileSketch(values.shape[1]) for _ in range(4)]
+    for sketch, chunk in zip(chunks, np.array_split(values, 4)):
+        sketch.add(chunk)
+    # The order in which chunks are merged does not matter
+    for order in ([0, 1, 2, 3], [3, 1, 0, 2]):
+        merged = QuantileSketch(values.shape[1])
+        for index in order:
+            merged.merge(chunks[index])
+        np.testing.assert_array_equal(merged.counts, whole.counts)
+        np.testing.assert_array_equal(merged.quantiles(PERCENTILES), whole.quantiles(PERCENTILES))
+
+
+def test_non_finite_values_and_empty_columns():
+    sketch = QuantileSketch(2)
+    sketch.add(np.array([[1.0, np.nan], [np.inf, np.nan], [3.0, -np.inf]]))
+    assert sketch.counts.tolist() == [2, 0]
+    quantiles = sketch.quantiles([50])
+    assert np.isnan(quantiles[0, 1])
+    assert quantiles[0, 0] == pytest.approx(1.0, rel=sketch.relative_accuracy)
+
+
+def test_running_moments_match_numpy():
+    values = sample_values(2)
+    moments = RunningMoments(values.shape[1])
+    for chunk in np.array_split(values, [1, 2, 500, 7000, 7000]):
+        moments.add(chunk)
+    assert moments.count == values.shape[0]
+    np.testing.assert_allclose(moments.mean, np.mean(values, axis=0), rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(moments.variance, np.var(values, axis=0, ddof=1), rtol=1e-10)
+    np.testing.assert_allclose(moments.std, np.std(values, axis=0, ddof=1), rtol=1e-10)
+
+
+def test_merged_running_moments_match_numpy():
+    values = sample_values(3)
+    parts = []
+    for chunk in np.array_split(values, 3):
+        part = RunningMoments(values.shape[1])
+        part.add(chunk)
+        parts.append(part)
+    merged = RunningMoments(values.shape[1])
+    for part in parts[::-1]:
+        merged.merge(part)
+    np.testing.assert_allclose(merged.mean, np.mean(values, axis=0), rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(merged.variance, np.var(values, axis=0, ddof=1), rtol=1e-10)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from tradertools.montecarlo import simulate_equity_curve
+from tradertools.streaming import QuantileSketch
+from tradertools.sweep import sweep_equity_curve
+
+
+RELATIVE_ACCURACY = QuantileSketch().relative_accuracy
+
+
+def max_drawdown_pct(paths):
+    return (1 - paths / np.maximum.accumulate(paths, axis=1)).max(axis=1) * 100
+
+
+@pytest.mark.parametrize("risk_type, risk", [("Percentage of Equity", 1.0), ("Fixed Dollar Amount", 100.0)])
+@pytest.mark.parametrize("win_percent", [0, 100])
+def test_one_point_sweep_matches_the_simulator_within_the_sketch_error(risk_type, risk, win_percent):
+    # Every simulation follows the same curve when all trades win or all lose, so only the sketch's error remains
+    sweep = sweep_equity_curve(10000, (risk,), (win_percent,), (2,), 50, 200, risk_type, seed=1)
+    paths = simulate_equity_curve(10000, risk, win_percent, 2, 50, 200, risk_type, seed=1)
+    np.testing.assert_allclose(sweep['median_terminal'].ravel(), np.median(paths[:, -1]), rtol=RELATIVE_ACCURACY)
+    np.testing.assert_allclose(sweep['p95_drawdown_pct'].ravel(), np.percentile(max_drawdown_pct(paths), 95),
+                               rtol=RELATIVE_ACCURACY, atol=1e-9)
+
+
+@pytest.mark.parametrize("risk_type, risk", [("Percentage of Equity", 1.0), ("Fixed Dollar Amount", 100.0)])
+def test_one_point_sweep_agrees_with_the_simulator(risk_type, risk):
+    # The sweep draws its own random numbers, so the figures also differ by sampling noise
+    sweep = sweep_equity_curve(10000, (risk,), (45,), (2,), 100, 4000, risk_type, seed=5)
+    paths = simulate_equity_curve(10000, risk, 45, 2, 100, 4000, risk_type, seed=5)
+    np.testing.assert_allclose(sweep['median_terminal'].ravel(), np.median(paths[:, -1]), rtol=0.02)
+    np.testing.assert_allclose(sweep['p95_drawdown_pct'].ravel(), np.percentile(max_drawdown_pct(paths), 95), rtol=0.05)
+
+
+def test_drawdown_quantile_stays_within_100_percent():
+    sweep = sweep_equity_curve(10000, (50,), (50,), (2,), 20, 2000, 'Percentage of Equity', seed=1)
+    assert 0 <= sweep['p95_drawdown_pct'].max() <= 100
@@ -0,0 +1,146 @@
+from io import BytesIO, StringIO
+import random
+
+import pytest
+
+from benchmarks.alerts_throughput import alert_lines, clear_caches, reference_conversion
+from benchmarks.power_etrade_throughput import power_etrade_csv
+from tradertools.tradervue import (convert_alerts, convert_power_etrade_csv, iter_lines, parse_trade_line,
+                                   parse_trade_line_reference, process_power_etrade_csv_reference)
+
+
+MIXED_ALERTS = """02/24/21 09:31 AM ET Buy 100 AAPL Executed @ $12.50
+03/04/21 09:32 AM ET Sell 100 AAPL Executed @ $12.75
+06/01/22 10:15 AM ET Sell Short 200 AMD Executed @ $101.20
+"""
+
+MIXED_POWER_ETRADE = b"""Orders for account XXXX-1234
+Order Number,Symbol,Description,Status,Fill,Order Type,Limit Price,Time
+1,AAPL,Buy 100 AAPL to Open,Executed,100 @ 12.50,Limit,12.50,"02/24/2021, 09:31:05 AM"
+2,AAPL,Sell 100 AAPL to Close,Executed,100 @ 12.75,Limit,12.75,"03/04/2021, 09:32:10 AM"
+3,AMD,Sell 200 AMD to Open,Cancelled,--,Limit,101.20,"01/04/2021, 10:15:00 AM"
+4,AMD,Sell 200 AMD to Open,Executed,200 @ 101.20,Limit,101.20,"06/01/2022, 10:15:00 AM"
+"""
+
+
+def test_alerts_before_the_fee_schedules_are_left_out():
+    skipped = []
+    lines = list(convert_alerts(StringIO(MIXED_ALERTS), skipped=skipped))
+    assert lines == ["03/04/21,09:32:00,AAPL,100,12.75,Sell,0.00,0.0219",
+                     "06/01/22,10:15:00,AMD,200,101.20,Short,0.00,0.4960"]
+    assert skipped == ["02/24/21 09:31:00 AAPL"]
+
+
+def test_power_etrade_orders_before_the_fee_schedules_are_left_out():
+    skipped = []
+    lines = list(convert_power_etrade_csv(BytesIO(MIXED_POWER_ETRADE), skipped=skipped))
+    assert lines == process_power_etrade_csv_reference(BytesIO(MIXED_POWER_ETRADE))
+    assert [line.split(',')[0] for line in lines] == ["03/04/2021", "06/01/2022"]
+    assert skipped == ["02/24/2021 09:31:05 AAPL"]
+
+
+ALERT_LINES = [
+    "10/21/22 09:31 AM ET Buy 100 AAPL Executed @ $12.50",
+    "10/21/22 09:31 AM ET Sell Short 100 AAPL @ $12.5 Executed",
+    "10/21/22 12:05 PM ET Buy to cover 7 AMD Executed @ $101",
+    "10/21/22 04:00 PM ET Sell 30 SPY Executed @ $400.",
+    "10/21/22 09:31 AM ET Your order to Buy 100 AAPL has been placed.",
+    "10/21/22 09:31 AM ET Buy 100 AAPL Cancelled @ $12.50",
+    "",
+]
+
+
+def mutations(line, rng):
+    # Variants of an alert line: spacing, prefixes, case, digits and literals the parser must treat like the reference
+    yield line
+    yield line.replace(' ', '  ')
+    yield line.replace(' ', '\t', 2)
+    yield line.replace(' ', '\u00a0', 1)
+    yield "Alert: " + line
+    yield line + " " + line
+    yield line.lower()
+    yield line.replace('ET', 'EST')
+    yield line.replace('@', '')
+    yield line.replace('$', '')
+    yield line.replace('1', '\u0661')
+    yield line[:rng.randrange(len(line) + 1)]
+    position = rng.randrange(len(line) + 1)
+    yield line[:position] + rng.choice(' 0@$/:ET') + line[position:]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_parse_trade_line_matches_the_reference(seed):
+    rng = random.Random(seed)
+    for line in ALERT_LINES:
+        for variant in mutations(line, rng):
+            try:
+                expected = parse_trade_line_reference(variant)
+            except ValueError:
+                with pytest.raises(ValueError):
+                    parse_trade_line(variant)
+                continue
+            assert parse_trade_line(variant) == expected, variant
+
+
+@pytest.mark.parametrize("line", ["13/21/22 09:31 AM ET Buy 100 AAPL Executed @ $12.50",
+                                  "10/21/22 13:31 PM ET Buy 100 AAPL Executed @ $12.50"])
+def test_invalid_timestamps_raise_like_the_reference(line):
+    with pytest.raises(ValueError):
+        parse_trade_line_reference(line)
+    with pytest.raises(ValueError):
+        parse_trade_line(line)
+
+
+# Lines with multibyte UTF-8 characters (2, 3 and 4 bytes), Windows line endings and an empty line
+MULTIBYTE_TEXT = "Note: café\n\n10/21/22 09:31 AM ET Buy 100 AAPL Executed @ $12.50 – ok\r\n€ 🚀\nlast line"
+
+
+@pytest.mark.parametrize("text", [MULTIBYTE_TEXT, MULTIBYTE_TEXT + "\n", "", "\n", "no line ending"])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64, 1024])
+def test_iter_lines_across_chunk_boundaries(text, chunk_size):
+    # Chunks of a few bytes split the multibyte characters and the line endings
+    data = text.encode()
+    expected = [line.decode() for line in BytesIO(data).readlines()]
+    assert list(iter_lines(BytesIO(data), chunk_size=chunk_size)) == expected
+    assert list(iter_lines(StringIO(text, newline=''), chunk_size=chunk_size)) == StringIO(text, newline='').readlines()
+
+
+def test_invalid_utf8_raises():
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_lines(BytesIO("café".encode()[:-1]), chunk_size=2))
+
+
+def test_alerts_conversion_matches_the_reference():
+    data = "\n".join(alert_lines(5000)).encode()
+    clear_caches()
+    assert list(convert_alerts(BytesIO(data))) == reference_conversion(BytesIO(data))
+
+
+@pytest.mark.parametrize("seed", range(2))
+@pytest.mark.parametrize("chunk_rows", [7, 400, 100000])
+def test_power_etrade_conversion_matches_the_reference(seed, chunk_rows):
+    data = power_etrade_csv(1000, seed=seed)
+    lines = list(convert_power_etrade_csv(BytesIO(data), chunk_rows=chunk_rows))
+    assert lines == process_power_etrade_csv_reference(BytesIO(data))
+    assert lines
+
+
+# Orders the generated exports do not have: unknown sides, odd prices and quantities, only unfilled orders
+UNUSUAL_POWER_ETRADE = b"""Orders for account XXXX-1234
+Order Number,Symbol,Description,Status,Fill,Order Type,Limit Price,Time
+1,AAPL,Exercise 1 AAPL,Executed,1 @ 0.0001,Limit,0.0001,"06/01/2022, 12:00:00 PM"
+2,BRK,Buy 1 BRK to Open,Executed,1 @ 612345.678901,Limit,612345.68,"06/01/2022, 12:00:00 AM"
+3,F,Sell 2000000 F to Close,Executed,2000000 @ 12,Market,--,"12/30/2024, 03:59:59 PM"
+4,F,Sell 5 F to Close,Open,--,Limit,13,"12/30/2024, 04:00:00 PM"
+"""
+
+UNFILLED_POWER_ETRADE = b"""Orders for account XXXX-1234
+Order Number,Symbol,Description,Status,Fill,Order Type,Limit Price,Time
+1,F,Sell 5 F to Close,Cancelled,--,Limit,13,"12/30/2024, 04:00:00 PM"
+"""
+
+
+@pytest.mark.parametrize("data", [UNUSUAL_POWER_ETRADE, UNFILLED_POWER_ETRADE])
+def test_unusual_power_etrade_orders_match_the_reference(data):
+    assert list(convert_power_etrade_csv(BytesIO(data), chunk_rows=2)) == \
+        process_power_etrade_csv_reference(BytesIO(data))
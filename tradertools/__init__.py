@@ -0,0 +1,6 @@
+"""
+Simulation and sizing core shared by the Tradertools Streamlit pages.
+
+Nothing in this package imports Streamlit, so it can be used from scripts,
+notebooks and batch jobs as well as from the pages.
+"""
@@ -0,0 +1,43 @@
+"""
+Command line batch runner: `python -m tradertools config.json --output results/`.
+
+The config (or the manifest of an earlier batch, to reproduce it) is described in `tradertools.batch`.
+Options given on the command line override the config.
+"""
+import argparse
+import json
+import os
+import sys
+
+from tradertools.batch import BATCH_ENGINES, OUTPUT_DTYPES, OUTPUT_FORMATS, run_batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m tradertools',
+                                     description="Run Monte Carlo simulations headless and write the paths to disk.")
+    parser.add_argument('config', help=f"JSON batch config or manifest. Engines: {', '.join(BATCH_ENGINES)}.")
+    parser.add_argument('-o', '--output', required=True, help="Output directory for the path files and manifest.")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, help="Path file format.")
+    parser.add_argument('--dtype', choices=OUTPUT_DTYPES, help="Type of the written path values.")
+    parser.add_argument('--simulations', type=int, help="Number of simulations per grid point.")
+    parser.add_argument('--seed', type=int, help="Master seed.")
+    parser.add_argument('--workers', type=int, help="Number of worker processes.")
+    parser.add_argument('--memory-budget', type=int, help="Memory budget per block and worker, in MB.")
+    args = parser.parse_args(argv)
+
+    with open(args.config) as f:
+        config = json.load(f)
+    # A manifest carries the resolved config of its batch
+    config = config.get('config', config)
+    overrides = {'format': args.format, 'dtype': args.dtype, 'num_simulations': args.simulations, 'seed': args.seed,
+                 'workers': args.workers, 'memory_budget_mb': args.memory_budget}
+    config.update({key: value for key, value in overrides.items() if value is not None})
+
+    manifest = run_batch(config, args.output, base_directory=os.path.dirname(os.path.abspath(args.config)),
+                         report=print)
+    print(f"Wrote {len(manifest['points'])} grid point(s) to {args.output} (seed {manifest['config']['seed']})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""
+Headless batch runs of the Monte Carlo engines, for scheduled jobs (see `python -m tradertools --help`).
+
+A batch is described by a JSON config: an engine, its parameters, an optional grid of parameter values
+and the number of simulations. Paths are written to disk block by block as the engine produces them,
+as a memory-mapped `.npy` array or as a Parquet file, so a run never holds more than a few blocks in
+memory. Each grid point also gets the streaming summary of its paths in the manifest.
+
+Every grid point is simulated from the same master seed, so points share their random draws (common
+random numbers, as in `tradertools.sweep`). The seed is recorded in the manifest, and the manifest's
+'config' is itself a valid config that reproduces the batch bit for bit. R-multiples files are recorded
+by absolute path with their SHA-256 hash, so a manifest reads the same files from any directory and
+refuses to run if one of them has changed.
+"""
+from datetime import datetime, timezone
+import hashlib
+import itertools
+import json
+import os
+
+import numpy as np
+
+from tradertools.bootstrap import bootstrap_run, load_r_multiples_csv
+from tradertools.montecarlo import DEFAULT_MEMORY_BUDGET_MB, equity_curve_run, iter_blocks, monte_carlo_run
+from tradertools.sizing import sized_equity_curve_run
+
+
+# Engines available to batch runs: name -> builder of its `ProgressiveRun`
+BATCH_ENGINES = {
+    'monte_carlo': monte_carlo_run,
+    'bootstrap': bootstrap_run,
+    'equity_curve': equity_curve_run,
+    'sized_equity_curve': sized_equity_curve_run,
+}
+
+OUTPUT_FORMATS = ('npy', 'parquet')
+OUTPUT_DTYPES = ('float64', 'float32')
+
+MANIFEST_NAME = 'manifest.json'
+
+
+# Function to list the parameters of every grid point of a config
+def grid_points(parameters, grid=None):
+    """
+    Returns one parameter dictionary per combination of the `grid` values ({name: [values]}),
+    each being `parameters` updated with the combination. Without a grid, returns [parameters].
+    """
+    if not grid:
+        return [dict(parameters)]
+    names = list(grid)
+    return [{**parameters, **dict(zip(names, values))} for values in itertools.product(*(grid[name] for name in names))]
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _resolve_files(config, base_directory):
+    # Makes the R-multiples file names of the parameters and the grid absolute, and records the hash of every
+    # file in 'file_hashes'. Raises ValueError when a file no longer has the hash the config recorded
+    parameters, grid = dict(config.get('parameters') or {}), dict(config.get('grid') or {})
+    paths = []
+    if 'r_multiples_file' in parameters:
+        parameters['r_multiples_file'] = os.path.abspath(os.path.join(base_directory, parameters['r_multiples_file']))
+        paths.append(parameters['r_multiples_file'])
+    if 'r_multiples_file' in grid:
+        grid['r_multiples_file'] = [os.path.abspath(os.path.join(base_directory, name)) for name in grid['r_multiples_file']]
+        paths.extend(grid['r_multiples_file'])
+    if not paths:
+        return config
+
+    recorded = config.get('file_hashes') or {}
+    file_hashes = {}
+    for path in paths:
+        file_hashes[path] = _file_sha256(path)
+        if path in recorded and recorded[path] != file_hashes[path]:
+            raise ValueError(f"R-multiples file changed since the batch was run: {path}")
+    return {**config, 'parameters': parameters, 'grid': grid, 'file_hashes': file_hashes}
+
+
+def _engine_parameters(parameters, base_directory):
+    # Bootstrap histories can be given inline ('r_multiples') or as a CSV path ('r_multiples_file')
+    parameters = dict(parameters)
+    if 'r_multiples_file' in parameters:
+        path = os.path.join(base_directory, parameters.pop('r_multiples_file'))
+        with open(path) as f:
+            parameters['r_multiples'] = load_r_multiples_csv(f)
+    return parameters
+
+
+def _json_value(value):
+    # Plain JSON types for the manifest: numpy scalars and arrays become numbers and lists, NaN becomes null
+    if isinstance(value, dict):
+        return {str(k): _json_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_json_value(v) for v in value]
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    return value
+
+
+def _summary_figures(summary):
+    # The scalar figures of a streaming summary; the bands and sample paths stay out of the manifest
+    figures = {key: summary[key] for key in ('num_simulations', 'terminal_mean', 'terminal_std', 'terminal_quantiles',
+                                             'drawdown_stats')}
+    if 'ruin' in summary:
+        figures['ruin'] = summary['ruin']['stats']
+    return _json_value(figures)
+
+
+class _NpyWriter:
+    # Writes blocks of rows into a memory-mapped .npy file of the final shape
+    def __init__(self, path, num_rows, num_columns, dtype):
+        self.array = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(num_rows, num_columns))
+        self.num_written = 0
+
+    def write(self, block):
+        self.array[self.num_written:self.num_written + block.shape[0]] = block
+        self.num_written += block.shape[0]
+
+    def close(self):
+        self.array.flush()
+        del self.array
+
+
+class _ParquetWriter:
+    # Writes blocks of rows as row groups of a long table: one (path, step, value) row per path value
+    def __init__(self, path, num_rows, num_columns, dtype):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet output requires pyarrow to be installed.") from None
+        self.pa = pa
+        self.schema = pa.schema([('path', pa.int64()), ('step', pa.int32()), ('value', pa.from_numpy_dtype(dtype))])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.dtype = dtype
+        self.num_written = 0
+
+    def write(self, block):
+        num_rows, num_columns = block.shape
+        columns = [
+            np.repeat(np.arange(self.num_written, self.num_written + num_rows, dtype=np.int64), num_columns),
+            np.tile(np.arange(num_columns, dtype=np.int32), num_rows),
+            block.astype(self.dtype, copy=False).ravel(),
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+        self.num_written += num_rows
+
+    def close(self):
+        self.writer.close()
+
+
+# Function to run one grid point and stream its paths to a file
+def write_paths(run, path, output_format='npy', dtype='float64'):
+    """
+    Simulates every block of a streaming `ProgressiveRun`, writing the paths to `path` and folding
+    them into the run summary as they arrive.
+
+    Returns:
+    - The shape of the written path matrix and the run result (the summary, passed through `finish`).
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    if dtype not in OUTPUT_DTYPES:
+        raise ValueError(f"Unsupported output dtype: {dtype}")
+
+    writer_class = _NpyWriter if output_format == 'npy' else _ParquetWriter
+    writer = writer_class(path, run.num_simulations, run.summary.num_columns, np.dtype(dtype))
+    try:
+        blocks = iter_blocks(run.path_function, run.path_args, run.num_simulations, run.block_size, seed=run.seed,
+                             workers=run.workers)
+        for block in blocks:
+            writer.write(block)
+            run.summary.add(block)
+            run.num_done += block.shape[0]
+            run.blocks_done += 1
+    finally:
+        writer.close()
+    return (run.num_simulations, run.summary.num_columns), run.result()
+
+
+# Function to run a batch config and write its paths and manifest
+def run_batch(config, output_directory, base_directory='.', report=None):
+    """
+    Runs every grid point of a batch config.
+
+    Args:
+    - config: Dictionary with 'engine' (see `BATCH_ENGINES`), 'parameters' (keyword arguments of the
+      engine, except the run settings below), and optionally 'grid' ({parameter: [values]}),
+      'num_simulations', 'seed' (None draws fresh entropy, which is recorded), 'memory_budget_mb',
+      'workers', 'format' ('npy' or 'parquet') and 'dtype' ('float64' or 'float32').
+    - output_directory: Directory that receives one path file per grid point and the manifest.
+    - base_directory: Directory that relative file names in the parameters are read from.
+    - report: Optional function called with a progress message after every grid point.
+
+    Returns:
+    - The manifest dictionary, also written to `manifest.json` in `output_directory`.
+    """
+    engine = config['engine']
+    if engine not in BATCH_ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    config = {
+        'num_simulations': 10000,
+        'memory_budget_mb': DEFAULT_MEMORY_BUDGET_MB,
+        'workers': 1,
+        'format': 'npy',
+        'dtype': 'float64',
+        **config,
+    }
+    # A missing or null 'parameters' or 'grid' is empty
+    for key in ('parameters', 'grid'):
+        if config.get(key) is None:
+            config[key] = {}
+        elif not isinstance(config[key], dict):
+            raise ValueError(f"'{key}' must be an object, not {type(config[key]).__name__}")
+    if config.get('seed') is None:
+        config['seed'] = np.random.SeedSequence().entropy
+    config = _resolve_files(config, base_directory)
+
+    os.makedirs(output_directory, exist_ok=True)
+    extension = 'npy' if config['format'] == 'npy' else 'parquet'
+    points = []
+    for i, parameters in enumerate(grid_points(config['parameters'], config['grid'])):
+        run = BATCH_ENGINES[engine](
+            num_simulations=config['num_simulations'], streaming=True, memory_budget_mb=config['memory_budget_mb'],
+            seed=config['seed'], workers=config['workers'], **_engine_parameters(parameters, base_directory),
+        )
+        file_name = f'point_{i:04d}.{extension}'
+        shape, summary = write_paths(run, os.path.join(output_directory, file_name), config['format'], config['dtype'])
+        points.append({'parameters': _json_value(parameters), 'file': file_name, 'shape': list(shape),
+                       'summary': _summary_figures(summary)})
+        if report is not None:
+            report(f"{file_name}: {shape[0]:,} paths x {shape[1]:,} steps, {parameters}")
+
+    manifest = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'config': _json_value(config),
+        'numpy': np.__version__,
+        'points': points,
+    }
+    with open(os.path.join(output_directory, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+    return manifest
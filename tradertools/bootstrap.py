@@ -0,0 +1,173 @@
+"""
+Bootstrap Monte Carlo driven by a real list of R-multiples.
+
+Instead of modelling trades as an average win/loss plus Gaussian noise, every simulated trade is drawn
+from the trader's own history, so fat tails and skew are kept as they are. The block bootstrap resamples
+runs of consecutive trades to also keep streaks. All resample indices of a block of simulations are
+drawn in a single call.
+"""
+import numpy as np
+import pandas as pd
+
+from tradertools.montecarlo import DEFAULT_MEMORY_BUDGET_MB, r_curve_run
+
+
+# Column names accepted for R-multiples in an uploaded CSV (compared case-insensitively, without spaces)
+R_COLUMN_NAMES = ('r', 'rmultiple', 'r-multiple', 'r_multiple', 'rmultiples', 'r-multiples')
+
+# Signed direction of every side in the Tradervue generic import format
+SIDE_DIRECTIONS = {'Buy': 1, 'Cover': 1, 'Sell': -1, 'Short': -1}
+
+
+# Function to generate cumulative R curves by resampling a trade history
+def bootstrap_paths(rng, num_simulations, r_multiples, num_trades, block_length=1):
+    """
+    Generates cumulative R curves of shape (num_simulations, num_trades) from resampled R-multiples.
+
+    Args:
+    - rng: numpy Generator.
+    - num_simulations: Number of curves to generate.
+    - r_multiples: 1-D array with the R-multiple of every historical trade.
+    - num_trades: Number of trades per curve.
+    - block_length: 1 for an i.i.d. bootstrap. Longer values resample runs of consecutive trades
+      (circular block bootstrap), keeping streaks of the original history.
+    """
+    r_multiples = np.asarray(r_multiples, dtype=float)
+    num_history = r_multiples.size
+    if block_length <= 1:
+        indices = rng.integers(0, num_history, size=(num_simulations, num_trades))
+    else:
+        # Random block starts; every block continues through the history, wrapping around at the end
+        num_blocks = -(-num_trades // block_length)
+        starts = rng.integers(0, num_history, size=(num_simulations, num_blocks, 1))
+        indices = (starts + np.arange(block_length)) % num_history
+        indices = indices.reshape(num_simulations, num_blocks * block_length)[:, :num_trades]
+    trade_results = r_multiples[indices]
+    return np.cumsum(trade_results, axis=1, out=trade_results)
+
+
+def bootstrap_run(r_multiples, num_trades, num_simulations, block_length=1, streaming=False,
+                  memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, sample_paths=100, band_points=200, seed=None, workers=1,
+                  risk_percent=1.0):
+    """
+    Progressive version of `bootstrap_simulation` and `stream_bootstrap` (see `r_curve_run`).
+    The expected equity curve grows by the mean R-multiple of the history every trade.
+    """
+    r_multiples = np.asarray(r_multiples, dtype=float)
+    expected_equity_curve = np.arange(1, num_trades + 1) * r_multiples.mean()
+    return r_curve_run(
+        bootstrap_paths, (r_multiples, num_trades, block_length), expected_equity_curve, num_trades, num_simulations,
+        streaming=streaming, memory_budget_mb=memory_budget_mb, sample_paths=sample_paths, band_points=band_points,
+        seed=seed, workers=workers, risk_percent=risk_percent,
+    )
+
+
+def bootstrap_simulation(r_multiples, num_trades, num_simulations, block_length=1, seed=None, workers=1,
+                         risk_percent=1.0):
+    """
+    Bootstrap counterpart of `monte_carlo_simulation`.
+
+    Returns:
+    - The (num_simulations, num_trades) matrix of R curves, the expected equity curve (mean R per trade),
+      and the drawdown summary of `summarize_drawdowns`.
+    """
+    return bootstrap_run(r_multiples, num_trades, num_simulations, block_length=block_length, seed=seed,
+                         workers=workers, risk_percent=risk_percent).run_to_end()
+
+
+def stream_bootstrap(r_multiples, num_trades, num_simulations, block_length=1,
+                     memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, sample_paths=100, band_points=200, seed=None,
+                     workers=1, risk_percent=1.0):
+    """
+    Streaming version of `bootstrap_simulation`: returns the run summary (see `stream_paths`)
+    with the expected equity curve added under 'expected_equity_curve'.
+    """
+    return bootstrap_run(r_multiples, num_trades, num_simulations, block_length=block_length, streaming=True,
+                         memory_budget_mb=memory_budget_mb, sample_paths=sample_paths, band_points=band_points,
+                         seed=seed, workers=workers, risk_percent=risk_percent).run_to_end()
+
+
+# Function to read R-multiples from an uploaded CSV
+def load_r_multiples_csv(file_obj):
+    """
+    Reads a CSV of R-multiples. The column can be named R, R-Multiple or R_Multiple (any case);
+    otherwise the file must have exactly one numeric column.
+
+    Returns:
+    - A 1-D float array without missing values.
+    """
+    df = pd.read_csv(file_obj)
+    normalized = {column: str(column).strip().lower().replace(' ', '') for column in df.columns}
+    matches = [column for column, name in normalized.items() if name in R_COLUMN_NAMES]
+    if matches:
+        column = matches[0]
+    else:
+        numeric = df.select_dtypes('number').columns
+        if len(numeric) != 1:
+            raise ValueError("Could not find the R-multiple column. Name it 'R' or 'R-Multiple'.")
+        column = numeric[0]
+
+    r_multiples = pd.to_numeric(df[column], errors='coerce').dropna().to_numpy(dtype=float)
+    if r_multiples.size == 0:
+        raise ValueError("The file does not contain any R-multiple.")
+    return r_multiples
+
+
+# Function to derive R-multiples from executions in the Tradervue generic import format
+def r_multiples_from_executions(executions, risk_amount):
+    """
+    Groups executions into round-trip trades and returns the R-multiple of every closed trade.
+
+    A trade starts when a symbol's position leaves zero and closes when it returns to zero. Its P&L is
+    the net cash flow of its executions minus commissions and fees, divided by `risk_amount` (1R in $).
+
+    Args:
+    - executions: DataFrame with the Date, Time, Symbol, Quantity, Price, Side, Commission and TransFee
+      columns produced by the Tradervue helper.
+    - risk_amount: Dollar amount of 1R.
+
+    Returns:
+    - A 1-D float array with one R-multiple per closed trade, in closing order.
+    """
+    if risk_amount <= 0:
+        raise ValueError("The risk amount must be positive.")
+    direction = executions['Side'].map(SIDE_DIRECTIONS)
+    if direction.isna().any():
+        raise ValueError("Unknown execution side: " + ', '.join(executions['Side'][direction.isna()].astype(str).unique()))
+
+    df = pd.DataFrame({
+        'order': np.arange(len(executions)),
+        'timestamp': pd.to_datetime(executions['Date'].astype(str) + ' ' + executions['Time'].astype(str), format='mixed'),
+        'symbol': executions['Symbol'].astype(str),
+        'shares': direction * executions['Quantity'].astype(float),
+    })
+    costs = executions.get('Commission', 0) + executions.get('TransFee', 0)
+    df['cash_flow'] = -df['shares'] * executions['Price'].astype(float) - costs
+    df = df.sort_values(['symbol', 'timestamp', 'order'], kind='stable')
+
+    # A new trade starts after every execution that leaves the position flat
+    position = df.groupby('symbol')['shares'].cumsum().round(8)
+    flat = position.eq(0)
+    df['trade'] = flat.groupby(df['symbol']).cumsum() - flat
+    df['flat'] = flat
+
+    trades = df.groupby(['symbol', 'trade']).agg(
+        pnl=('cash_flow', 'sum'), closed=('flat', 'last'), closed_at=('timestamp', 'last'), order=('order', 'last'),
+    )
+    closed = trades[trades['closed']].sort_values(['closed_at', 'order'])
+    return closed['pnl'].to_numpy(dtype=float) / risk_amount
+
+
+def load_executions_csv(file_obj, risk_amount):
+    """
+    Reads an export of the Tradervue helper (Date,Time,Symbol,Quantity,Price,Side,Commission,TransFee)
+    and returns the R-multiples of its closed trades.
+    """
+    executions = pd.read_csv(file_obj)
+    missing = {'Date', 'Time', 'Symbol', 'Quantity', 'Price', 'Side'} - set(executions.columns)
+    if missing:
+        raise ValueError("Missing columns in the executions file: " + ', '.join(sorted(missing)))
+    r_multiples = r_multiples_from_executions(executions, risk_amount)
+    if r_multiples.size == 0:
+        raise ValueError("The file does not contain any closed trade.")
+    return r_multiples
@@ -0,0 +1,184 @@
+"""
+Size-capped LRU caches for simulation results and rendered charts.
+
+Results are keyed on the function and its arguments bound by name, defaults included (seed among
+them), so a rerun with the same inputs (or a
+page rerun that only changes how results are displayed) reuses the stored matrix or summary. Charts are
+keyed on a fingerprint of the plotted data plus the plot options.
+"""
+from collections import OrderedDict
+import hashlib
+import inspect
+import sys
+import threading
+
+import numpy as np
+
+
+# Default size caps of the shared simulation and chart caches
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CHART_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def result_nbytes(value):
+    """
+    Approximate memory used by a result made of numpy arrays, dicts, lists, tuples and scalars.
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(result_nbytes(k) + result_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(result_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def fingerprint(*values):
+    """
+    Returns a hex digest identifying the content of numpy arrays, dicts, lists, tuples and scalars.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+
+    def feed(value):
+        if isinstance(value, np.ndarray):
+            digest.update(f'ndarray{value.shape}{value.dtype}'.encode())
+            digest.update(np.ascontiguousarray(value).data)
+        elif isinstance(value, dict):
+            digest.update(b'dict')
+            for key in sorted(value, key=repr):
+                feed(key)
+                feed(value[key])
+        elif isinstance(value, (list, tuple)):
+            digest.update(f'{type(value).__name__}{len(value)}'.encode())
+            for item in value:
+                feed(item)
+        else:
+            digest.update(repr(value).encode())
+
+    for value in values:
+        feed(value)
+    return digest.hexdigest()
+
+
+def _call_arguments(function, args, kwargs):
+    # Every argument of the call by name, defaults included, however it was passed
+    bound = inspect.signature(function).bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = dict(bound.arguments)
+    for name, parameter in bound.signature.parameters.items():
+        if parameter.kind is inspect.Parameter.VAR_KEYWORD:
+            arguments.update(arguments.pop(name))
+    return arguments
+
+
+def _freeze(value):
+    # Cached results are shared between reruns and sessions, so their arrays are made read-only
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, dict):
+        for item in value.values():
+            _freeze(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _freeze(item)
+    return value
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a cap on the total size of the stored results, in bytes.
+
+    Args:
+    - max_bytes: Maximum total size of the cached results. Least recently used entries are evicted
+      first, and results larger than the cap are never stored.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        size = result_nbytes(value)
+        if size > self.max_bytes:
+            return
+        _freeze(value)
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    @staticmethod
+    def make_key(function, args, kwargs, ignore=()):
+        """
+        Builds the cache key of a call from the function's qualified name and its arguments, bound to the
+        parameters by name with the defaults applied: the same call gives the same key whether an argument
+        is passed by position, by keyword or left to its default. Arguments listed in `ignore` (e.g. the
+        number of workers) do not change the result and are left out.
+        """
+        def hashable(value):
+            # Arrays (e.g. an imported trade history) are keyed on their content
+            if isinstance(value, np.ndarray):
+                return ('ndarray', fingerprint(value))
+            if isinstance(value, tuple):
+                return tuple(hashable(item) for item in value)
+            return value
+
+        arguments = _call_arguments(function, args, kwargs)
+        arguments_key = tuple(sorted((name, hashable(value)) for name, value in arguments.items()
+                                     if name not in ignore))
+        return (function.__module__, function.__qualname__, arguments_key)
+
+    def call(self, function, *args, ignore=('workers',), **kwargs):
+        """
+        Returns function(*args, **kwargs), computing it only when the same call is not cached yet.
+
+        Calls whose seed is None, passed or left to its default, are not reproducible, so they are computed
+        every time and never stored. The returned arrays are read-only because they may be shared with
+        later calls.
+        """
+        if _call_arguments(function, args, kwargs).get('seed', 0) is None:
+            return function(*args, **kwargs)
+
+        key = self.make_key(function, args, kwargs, ignore)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = function(*args, **kwargs)
+        self.put(key, value)
+        return value
+
+
+# Caches shared by all sessions of the app process
+simulation_cache = ResultCache()
+chart_cache = ResultCache(CHART_CACHE_MAX_BYTES)
@@ -0,0 +1,149 @@
+"""
+Drawdown analytics computed on whole path matrices at once.
+
+Drawdowns are measured in the units of the paths (R or $) and as a percentage of the account.
+For account equity curves the paths are the account values themselves. For R curves, the account is
+modelled as 1 + risk_percent / 100 * R, i.e. every R is `risk_percent` of the starting account.
+"""
+import numpy as np
+
+
+# Memory budget for the temporaries of one block of rows, and rough bytes of temporaries per path value
+ANALYTICS_MEMORY_BUDGET_MB = 128
+_BYTES_PER_CELL = 80
+
+
+def _longest_run(mask):
+    # Length of the longest run of True values in every row: position minus position of the last False
+    positions = np.arange(1, mask.shape[1] + 1)
+    last_false = np.maximum.accumulate(np.where(mask, 0, positions), axis=1)
+    return (positions - last_false).max(axis=1, initial=0)
+
+
+def _analyze_block(paths, start_value, risk_percent):
+    num_paths, num_steps = paths.shape
+
+    peaks = np.maximum.accumulate(paths, axis=1)
+    if start_value is not None:
+        np.maximum(peaks, start_value, out=peaks)
+    drawdowns = paths - peaks
+
+    # Max drawdown in path units and the step where it bottoms out
+    troughs = np.argmin(drawdowns, axis=1)
+    rows = np.arange(num_paths)
+    max_drawdown = drawdowns[rows, troughs]
+
+    # Max drawdown as a percentage of the account value at the running peak
+    if risk_percent is None:
+        account_peaks = peaks
+    else:
+        account_peaks = 1 + risk_percent / 100 * peaks
+        drawdowns *= risk_percent / 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns_pct = np.where(account_peaks > 0, drawdowns / account_peaks, np.nan) * 100
+    max_drawdown_pct = np.maximum(np.nanmin(drawdowns_pct, axis=1, initial=0.0), -100.0)
+
+    # Longest stretch spent below a previous peak
+    underwater = drawdowns < 0
+    max_duration = _longest_run(underwater)
+
+    # Trades needed to climb back from the trough of the max drawdown to its peak (NaN if never recovered)
+    trough_peaks = peaks[rows, troughs]
+    recovered = (paths >= trough_peaks[:, None]) & (np.arange(num_steps) > troughs[:, None])
+    has_recovered = recovered.any(axis=1) & (max_drawdown < 0)
+    time_to_recovery = np.where(has_recovered, np.argmax(recovered, axis=1) - troughs, np.nan)
+    time_to_recovery[max_drawdown == 0] = 0
+
+    # Longest run of consecutive losing trades
+    if start_value is None:
+        changes = np.diff(paths, axis=1)
+    else:
+        changes = np.diff(paths, axis=1, prepend=start_value)
+    longest_losing_streak = _longest_run(changes < 0)
+
+    return {
+        'max_drawdown': max_drawdown,
+        'max_drawdown_pct': max_drawdown_pct,
+        'max_drawdown_duration': max_duration,
+        'time_to_recovery': time_to_recovery,
+        'longest_losing_streak': longest_losing_streak,
+    }
+
+
+def drawdown_analytics(paths, start_value=None, risk_percent=None, memory_budget_mb=ANALYTICS_MEMORY_BUDGET_MB):
+    """
+    Computes per-path drawdown figures for a matrix of paths.
+
+    Args:
+    - paths: Array of shape (num_paths, num_steps).
+    - start_value: Value the paths start from when it is not their first column (e.g. 0 for R curves).
+    - risk_percent: For R curves, the percentage of the account risked per R. None means the paths are
+      account values.
+    - memory_budget_mb: Approximate memory allowed for the temporaries of one block of rows.
+
+    Returns:
+    - A dictionary of arrays with one value per path: 'max_drawdown' (path units, <= 0),
+      'max_drawdown_pct' (<= 0), 'max_drawdown_duration' (trades), 'time_to_recovery' (trades from the
+      trough of the max drawdown back to its peak, NaN if never recovered) and 'longest_losing_streak'.
+    """
+    paths = np.asarray(paths, dtype=float)
+    block_rows = max(1, int(memory_budget_mb * 1024 * 1024 // (max(1, paths.shape[1]) * _BYTES_PER_CELL)))
+    blocks = [_analyze_block(paths[i:i + block_rows], start_value, risk_percent)
+              for i in range(0, paths.shape[0], block_rows)]
+    if not blocks:
+        blocks = [_analyze_block(np.empty((0, paths.shape[1])), start_value, risk_percent)]
+    return {name: np.concatenate([block[name] for block in blocks]) for name in blocks[0]}
+
+
+def drawdown_stats_table(unit, max_drawdown, avg_max_drawdown, median_max_drawdown, max_drawdown_pct,
+                         avg_max_drawdown_pct, p95_max_drawdown_pct, avg_duration, max_duration,
+                         avg_time_to_recovery, unrecovered_pct, avg_losing_streak, max_losing_streak):
+    """
+    Packages drawdown figures in the dictionary shown on the page, keyed by display label.
+    """
+    return {
+        f'Max Drawdown ({unit})': max_drawdown,
+        f'Avg Max Drawdown ({unit})': avg_max_drawdown,
+        f'Median Max Drawdown ({unit})': median_max_drawdown,
+        'Max Drawdown (%)': max_drawdown_pct,
+        'Avg Max Drawdown (%)': avg_max_drawdown_pct,
+        '95th Percentile Max Drawdown (%)': p95_max_drawdown_pct,
+        'Avg Longest Drawdown Duration (trades)': avg_duration,
+        'Longest Drawdown Duration (trades)': max_duration,
+        'Avg Time to Recovery (trades)': avg_time_to_recovery,
+        'Unrecovered Max Drawdowns (%)': unrecovered_pct,
+        'Avg Longest Losing Streak (trades)': avg_losing_streak,
+        'Max Losing Streak (trades)': max_losing_streak,
+    }
+
+
+def summarize_drawdowns(analytics, unit='R', bins=30):
+    """
+    Summarizes the per-path figures of `drawdown_analytics`.
+
+    Returns:
+    - A dictionary with 'stats' (see `drawdown_stats_table`) and 'histogram', a (counts, bin_edges)
+      pair of the per-path max drawdown in path units.
+    """
+    max_drawdown = analytics['max_drawdown']
+    if max_drawdown.size == 0:
+        return {'stats': {}, 'histogram': (np.zeros(0, dtype=np.int64), np.zeros(1))}
+
+    recovery = analytics['time_to_recovery']
+    recovered = ~np.isnan(recovery)
+    stats = drawdown_stats_table(
+        unit,
+        max_drawdown=float(max_drawdown.min()),
+        avg_max_drawdown=float(max_drawdown.mean()),
+        median_max_drawdown=float(np.median(max_drawdown)),
+        max_drawdown_pct=float(analytics['max_drawdown_pct'].min()),
+        avg_max_drawdown_pct=float(analytics['max_drawdown_pct'].mean()),
+        p95_max_drawdown_pct=float(np.percentile(analytics['max_drawdown_pct'], 5)),
+        avg_duration=float(analytics['max_drawdown_duration'].mean()),
+        max_duration=int(analytics['max_drawdown_duration'].max()),
+        avg_time_to_recovery=float(recovery[recovered].mean()) if recovered.any() else float('nan'),
+        unrecovered_pct=float((~recovered).mean() * 100),
+        avg_losing_streak=float(analytics['longest_losing_streak'].mean()),
+        max_losing_streak=int(analytics['longest_losing_streak'].max()),
+    )
+    return {'stats': stats, 'histogram': np.histogram(max_drawdown, bins=bins)}
@@ -0,0 +1,223 @@
+"""
+Regulatory transaction fees of US stock executions: the SEC Section 31 fee and the FINRA Trading
+Activity Fee (TAF), at the rates in force on each trade date. The schedules below start on 2021-02-25: fees of
+earlier trade dates raise ValueError rather than being charged at rates that did not apply, and
+`covered_dates` tells the helpers which executions to leave out of an import.
+
+The helpers charge the TAF, rounded up to $0.0001 and capped per execution, on every execution, and
+the SEC fee, rounded up to the cent, on sales. `transaction_fees` computes a whole batch with NumPy in
+integer units of $0.0001, so the rounding is exact: its texts are those of `str()` of the Decimal
+reference `transaction_fee_reference`, execution by execution.
+"""
+from decimal import Decimal, ROUND_UP
+
+import numpy as np
+import pandas as pd
+
+
+# SEC Section 31 fee rates: (effective date, dollars per million dollars sold)
+SEC_FEE_SCHEDULE = (
+    ('2021-02-25', '5.10'),
+    ('2022-05-22', '22.90'),
+    ('2023-02-27', '8.00'),
+    ('2024-05-22', '27.80'),
+    ('2025-05-14', '0.00'),
+)
+
+# FINRA TAF rates: (effective date, dollars per share, maximum per execution). The maximums have two decimals,
+# which is how a capped fee is written. The first row is the earliest date the helpers need, not when its rates
+# came into force
+FINRA_TAF_SCHEDULE = (
+    ('2021-01-01', '0.000119', '5.95'),
+    ('2022-01-01', '0.000130', '6.49'),
+    ('2023-01-01', '0.000145', '7.27'),
+    ('2024-01-01', '0.000166', '8.30'),
+)
+
+# Fees are computed in units of $0.0001; the SEC fee is rounded up to the cent (100 units)
+FEE_UNIT = Decimal('0.0001')
+CENT_UNITS = 100
+
+# First trade date both schedules have rates for
+FIRST_FEE_DATE = max(SEC_FEE_SCHEDULE[0][0], FINRA_TAF_SCHEDULE[0][0])
+
+
+def _check_dates(dates):
+    # Raises ValueError for missing trade dates and for those before FIRST_FEE_DATE, whose rates are not known
+    if np.isnat(dates).any():
+        raise ValueError("Missing trade date.")
+    uncovered = dates < np.datetime64(FIRST_FEE_DATE, 'D')
+    if uncovered.any():
+        raise ValueError(f"No fee rates before {FIRST_FEE_DATE} (trade date {np.min(dates[uncovered])}).")
+
+
+def _schedule_index(schedule, dates):
+    # Row of the schedule in force on every date (checked by `_check_dates`)
+    effective = np.array([row[0] for row in schedule], dtype='datetime64[D]')
+    return np.searchsorted(effective, dates, side='right') - 1
+
+
+# Function to tell which trade dates have fee rates
+def covered_dates(dates):
+    """
+    Args:
+    - dates: Trade dates (dates, datetime64 or ISO strings); missing dates are not covered.
+
+    Returns:
+    - A boolean array: whether each date is on or after FIRST_FEE_DATE.
+    """
+    dates = _trade_days(dates)
+    return ~np.isnat(dates) & (dates >= np.datetime64(FIRST_FEE_DATE, 'D'))
+
+
+# Function to get the fee rates in force on a trade date
+def fee_rates(trade_date):
+    """
+    Returns:
+    - The SEC fee rate (dollars per dollar sold), the FINRA TAF rate (dollars per share) and the TAF
+      maximum, as Decimals.
+    """
+    trade_date = np.datetime64(trade_date, 'D')
+    _check_dates(trade_date)
+    _, sec_per_million = SEC_FEE_SCHEDULE[_schedule_index(SEC_FEE_SCHEDULE, trade_date)]
+    _, taf_rate, taf_cap = FINRA_TAF_SCHEDULE[_schedule_index(FINRA_TAF_SCHEDULE, trade_date)]
+    return Decimal(sec_per_million) / 1000000, Decimal(taf_rate), Decimal(taf_cap)
+
+
+# Function to calculate the fees of one execution with Decimals
+def transaction_fee_reference(quantity, price, is_sale, trade_date):
+    """
+    Reference of `transaction_fees`, one execution at a time.
+
+    Args:
+    - quantity: Number of shares.
+    - price: Price per share (Decimal, or anything Decimal reads exactly, such as a string).
+    - is_sale: Whether the SEC fee applies.
+    - trade_date: Date of the execution (date, datetime64 or ISO string), covered by both schedules.
+
+    Returns:
+    - The total fee as a Decimal.
+    """
+    sec_rate, taf_rate, taf_cap = fee_rates(trade_date)
+    finra_taf_fee = min((taf_rate * quantity).quantize(FEE_UNIT, rounding=ROUND_UP), taf_cap)
+    sec_fee = Decimal('0')
+    if is_sale:
+        sec_fee = (sec_rate * quantity * Decimal(price)).quantize(Decimal('0.01'), rounding=ROUND_UP)
+    return finra_taf_fee + sec_fee
+
+
+def _integer_units(values, scale):
+    # Exact integers of Decimals multiplied by 10**scale
+    return [int(value.scaleb(scale)) for value in values]
+
+
+# Function to write prices as integers
+def price_units(prices):
+    """
+    Writes prices exactly as integers of a common number of decimals. Each distinct price is read once.
+
+    Returns:
+    - An integer array (object dtype when int64 is too small) and its number of decimals.
+    """
+    codes, unique = pd.factorize(pd.Series(prices, dtype=object))
+    unique = [Decimal(value) for value in unique]
+    # The exponent of infinities and NaNs is a letter
+    exponents = [value.as_tuple().exponent for value in unique]
+    if not all(isinstance(exponent, int) for exponent in exponents):
+        raise ValueError("Prices must be finite numbers.")
+    scale = max([0] + [-exponent for exponent in exponents])
+    units = _integer_units(unique, scale)
+    dtype = np.int64 if all(abs(value) < 2 ** 62 for value in units) else object
+    return np.array(units, dtype=dtype)[codes], scale
+
+
+def _trade_days(dates):
+    # Dates as datetime64[D]; each distinct date or text is converted once
+    dates = np.asarray(dates)
+    if dates.dtype.kind == 'M':
+        return dates.astype('datetime64[D]')
+    codes, unique = pd.factorize(dates.astype(object), use_na_sentinel=False)
+    return np.array(['NaT' if pd.isna(value) else value for value in unique], dtype='datetime64[D]')[codes]
+
+
+def _ceil_divide(numerator, denominator):
+    # Division rounded up, for non-negative numerators (Decimal's ROUND_UP)
+    return -(-numerator // denominator)
+
+
+# Function to calculate the fees of a batch of executions in units of $0.0001
+def transaction_fee_units(quantities, prices, sales, dates):
+    """
+    Args:
+    - quantities: Number of shares of every execution.
+    - prices: Price per share of every execution (Decimals or strings).
+    - sales: Whether the SEC fee applies to every execution.
+    - dates: Trade date of every execution (dates, datetime64 or ISO strings), covered by both schedules.
+
+    Returns:
+    - The total fee of every execution in units of $0.0001, and whether its TAF was capped.
+    """
+    quantities = np.asarray(quantities)
+    if quantities.dtype.kind not in 'iu':
+        # Python integers too large for int64, or Decimals: exact integers either way
+        quantities = np.array([int(quantity) for quantity in quantities], dtype=object)
+    prices, scale = price_units(prices)
+    sales = np.asarray(sales, dtype=bool)
+    dates = _trade_days(dates)
+    _check_dates(dates)
+    if (quantities < 0).any() or (prices < 0).any():
+        raise ValueError("Quantities and prices must not be negative.")
+
+    sec_schedule = np.array([int(Decimal(rate).scaleb(2)) for _, rate in SEC_FEE_SCHEDULE], dtype=np.int64)
+    taf_schedule = np.array([int(Decimal(rate).scaleb(6)) for _, rate, _ in FINRA_TAF_SCHEDULE], dtype=np.int64)
+    cap_schedule = np.array([int(Decimal(cap).scaleb(4)) for _, _, cap in FINRA_TAF_SCHEDULE], dtype=np.int64)
+    taf_row = _schedule_index(FINRA_TAF_SCHEDULE, dates)
+
+    # TAF: millionths of a dollar per share, rounded up to $0.0001, then capped
+    finra_taf_fee = _ceil_divide(taf_schedule[taf_row] * quantities, 100)
+    caps = cap_schedule[taf_row]
+    capped = finra_taf_fee > caps
+    finra_taf_fee = np.where(capped, caps, finra_taf_fee)
+
+    # SEC fee: hundredths of a dollar per million dollars, times the price in units of 10**-scale, rounded up
+    # to the cent. Products that could overflow int64 are computed with Python integers
+    sec_rates = sec_schedule[_schedule_index(SEC_FEE_SCHEDULE, dates)] * sales
+    bound = sec_rates.astype(float) * quantities.astype(float) * prices.astype(float)
+    if len(bound) and bound.max() >= 2 ** 62:
+        sec_rates, quantities, prices = sec_rates.astype(object), quantities.astype(object), prices.astype(object)
+    sec_fee = _ceil_divide(sec_rates * quantities * prices, 10 ** (6 + scale)) * CENT_UNITS
+    return finra_taf_fee + sec_fee, capped
+
+
+def _fee_text(units, capped):
+    # Four decimals, or two when the TAF was capped (the maximum and the SEC fee both have two)
+    whole, fraction = divmod(int(units), 10000)
+    return f"{whole}.{fraction // 100:02d}" if capped else f"{whole}.{fraction:04d}"
+
+
+# Function to format fees in units of $0.0001
+def format_fee_units(units, capped):
+    """
+    Writes fees like `str()` of the Decimal reference. A batch has few distinct fees, so each is written once.
+
+    Returns:
+    - An object array of fee texts.
+    """
+    codes, unique = pd.factorize(np.asarray(units) * 2 + np.asarray(capped, dtype=bool))
+    texts = np.array([_fee_text(key // 2, key % 2) for key in unique], dtype=object)
+    return texts[codes]
+
+
+# Function to calculate the fees of a batch of executions
+def transaction_fees(quantities, prices, sales, dates):
+    """
+    Fees of a batch of executions, as the texts of `transaction_fee_reference` (see `transaction_fee_units`
+    for the arguments).
+
+    Returns:
+    - An object array of fee texts.
+    """
+    if len(quantities) == 0:
+        return np.array([], dtype=object)
+    units, capped = transaction_fee_units(quantities, prices, sales, dates)
+    return format_fee_units(units, capped)
@@ -0,0 +1,180 @@
+"""
+Client-side (Vega-Lite) rendering of the Monte Carlo charts.
+
+Instead of an image, the browser receives a compact float32 payload: percentile bands and a capped
+number of sample paths, min/max-downsampled along the trade axis. The payload size is bounded by
+`MAX_POINTS_PER_LINE` and `MAX_INTERACTIVE_PATHS` whatever the number of simulations and trades, and
+zooming, panning and hovering happen in the browser without a server round trip.
+"""
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from tradertools.montecarlo import percentile_bands
+from tradertools.plotting import BAND_COLOR, uses_percentile_bands
+
+
+# Maximum number of points sent per line along the trade axis
+MAX_POINTS_PER_LINE = 500
+
+# Maximum number of individual paths sent to the browser
+MAX_INTERACTIVE_PATHS = 200
+
+
+def _kmb_label_expr(small_values_expr):
+    # Vega expression with the same K/M/B suffixes as `format_func` and `CustomScalarFormatter`
+    return (
+        "datum.value >= 1000000000 ? format(datum.value / 1000000000, '.1f') + 'B' : "
+        "datum.value >= 1000000 ? format(datum.value / 1000000, '.1f') + 'M' : "
+        "datum.value >= 1000 ? format(datum.value / 1000, '.1f') + 'K' : "
+        f"{small_values_expr}"
+    )
+
+
+# Arithmetic axis: `format_func` truncates small values to integers
+ARITHMETIC_LABEL_EXPR = _kmb_label_expr("toString(datum.value < 0 ? ceil(datum.value) : floor(datum.value))")
+
+# Logarithmic axis: `CustomScalarFormatter` keeps one decimal for small values
+LOG_LABEL_EXPR = _kmb_label_expr("format(datum.value, '.1f')")
+
+
+def minmax_downsample(paths, max_points=MAX_POINTS_PER_LINE):
+    """
+    Downsamples every row of `paths` to at most `max_points` points by keeping, in each bucket of steps,
+    the minimum and the maximum in their original order. Extremes survive, unlike with plain striding.
+
+    Returns:
+    - (steps, values) arrays of shape (num_paths, num_points).
+    """
+    paths = np.asarray(paths, dtype=float)
+    num_paths, num_steps = paths.shape
+    num_buckets = max(1, max_points // 2)
+    if num_steps <= max_points:
+        return np.broadcast_to(np.arange(num_steps), paths.shape), paths
+
+    # Pad the trade axis with the last value so it splits into equal buckets
+    bucket_width = -(-num_steps // num_buckets)
+    padded = np.pad(paths, ((0, 0), (0, num_buckets * bucket_width - num_steps)), mode='edge')
+    buckets = padded.reshape(num_paths, num_buckets, bucket_width)
+
+    starts = np.arange(num_buckets) * bucket_width
+    min_steps = np.minimum(starts + buckets.argmin(axis=2), num_steps - 1)
+    max_steps = np.minimum(starts + buckets.argmax(axis=2), num_steps - 1)
+    steps = np.sort(np.stack([min_steps, max_steps], axis=2), axis=2).reshape(num_paths, -1)
+    values = np.take_along_axis(paths, steps, axis=1)
+    return steps, values
+
+
+def interactive_chart_data(simulations_results, expected_equity_curve, chart_type='Auto', bands=None, sample_paths=20,
+                           max_points=MAX_POINTS_PER_LINE):
+    """
+    Builds the compact float32 payload of the interactive chart.
+
+    Returns:
+    - A dictionary of numpy arrays: 'band_steps' and 'band_values' (5 x steps, percentiles 5/25/50/75/95)
+      when bands are drawn, 'path_ids', 'path_steps' and 'path_values' for the individual paths, and
+      'expected_steps'/'expected_values' for the expected equity curve.
+    """
+    simulations_results = np.asarray(simulations_results, dtype=float)
+    use_bands = uses_percentile_bands(len(simulations_results), chart_type, bands)
+    data = {}
+
+    if use_bands:
+        if bands is None:
+            bands = percentile_bands(simulations_results, band_points=max_points)
+        steps = np.asarray(bands['steps'])
+        keep = np.unique(np.linspace(0, steps.size - 1, min(max_points, steps.size)).round().astype(np.int64))
+        data['band_steps'] = steps[keep].astype(np.int32)
+        data['band_values'] = np.stack([np.asarray(bands['bands'][p])[keep] for p in (5, 25, 50, 75, 95)]).astype(np.float32)
+        num_paths = min(sample_paths, len(simulations_results))
+    else:
+        num_paths = min(MAX_INTERACTIVE_PATHS, len(simulations_results))
+
+    if num_paths:
+        steps, values = minmax_downsample(simulations_results[:num_paths], max_points)
+        data['path_ids'] = np.repeat(np.arange(num_paths, dtype=np.int32), steps.shape[1])
+        data['path_steps'] = steps.astype(np.int32).ravel()
+        data['path_values'] = values.astype(np.float32).ravel()
+
+    if expected_equity_curve is not None:
+        expected = np.asarray(expected_equity_curve, dtype=float)[None, :]
+        steps, values = minmax_downsample(expected, max_points)
+        data['expected_steps'] = steps.astype(np.int32).ravel()
+        data['expected_values'] = values.astype(np.float32).ravel()
+    return data
+
+
+def build_interactive_chart(data, x_label='Trade Number', y_label='Equity ($)', scale_type='Arithmetic Scale'):
+    """
+    Builds the layered Vega-Lite chart (zoomable, with hover tooltips) from `interactive_chart_data`.
+    """
+    log_scale = scale_type == 'Logarithmic Scale'
+    y_scale = alt.Scale(type='log') if log_scale else alt.Scale(zero=False)
+    y_axis = alt.Axis(title=y_label, labelExpr=LOG_LABEL_EXPR if log_scale else ARITHMETIC_LABEL_EXPR)
+    x_axis = alt.Axis(title=x_label)
+    layers = []
+
+    if 'path_values' in data:
+        paths = pd.DataFrame({'Path': data['path_ids'], 'Trade': data['path_steps'], 'Value': data['path_values']})
+        opacity = 0.5 if 'band_values' in data else 0.75
+        layers.append(alt.Chart(paths).mark_line(strokeWidth=0.7, opacity=opacity).encode(
+            x=alt.X('Trade:Q', axis=x_axis),
+            y=alt.Y('Value:Q', scale=y_scale, axis=y_axis),
+            color=alt.Color('Path:N', legend=None),
+            detail='Path:N',
+            tooltip=[alt.Tooltip('Path:N'), alt.Tooltip('Trade:Q'), alt.Tooltip('Value:Q', format=',.2f')],
+        ))
+
+    if 'band_values' in data:
+        bands = pd.DataFrame({'Trade': data['band_steps']})
+        for label, values in zip(('P5', 'P25', 'Median', 'P75', 'P95'), data['band_values']):
+            bands[label] = values
+        base = alt.Chart(bands).encode(x=alt.X('Trade:Q', axis=x_axis))
+        hover = alt.selection_point(fields=['Trade'], nearest=True, on='pointerover', empty=False)
+        layers += [
+            base.mark_area(color=BAND_COLOR, opacity=0.2).encode(
+                y=alt.Y('P5:Q', scale=y_scale, axis=y_axis), y2='P95:Q'),
+            base.mark_area(color=BAND_COLOR, opacity=0.35).encode(y=alt.Y('P25:Q', scale=y_scale), y2='P75:Q'),
+            base.mark_line(color=BAND_COLOR, strokeWidth=2).encode(y=alt.Y('Median:Q', scale=y_scale)),
+            base.mark_rule(color='gray').encode(
+                opacity=alt.condition(hover, alt.value(0.8), alt.value(0)),
+                tooltip=[alt.Tooltip('Trade:Q')] + [alt.Tooltip(f'{label}:Q', format=',.2f')
+                                                    for label in ('P5', 'P25', 'Median', 'P75', 'P95')],
+            ).add_params(hover),
+        ]
+
+    if 'expected_values' in data:
+        expected = pd.DataFrame({'Trade': data['expected_steps'], 'Expected Performance': data['expected_values']})
+        layers.append(alt.Chart(expected).mark_line(color='white', strokeDash=[6, 4], strokeWidth=2).encode(
+            x=alt.X('Trade:Q', axis=x_axis),
+            y=alt.Y('Expected Performance:Q', scale=y_scale),
+            tooltip=[alt.Tooltip('Trade:Q'), alt.Tooltip('Expected Performance:Q', format=',.2f')],
+        ))
+
+    return alt.layer(*layers).properties(
+        title='Monte Carlo Simulation of Trading Performance', height=500,
+    ).interactive(bind_y=True)
+
+
+def build_heatmap(values, x_values, y_values, x_label, y_label, value_label, title='', reverse_colors=False):
+    """
+    Builds a Vega-Lite heatmap of a (len(y_values), len(x_values)) grid, e.g. a parameter sweep.
+
+    Args:
+    - values: 2-D array with one row per y value and one column per x value.
+    - x_values, y_values: Parameter values along each axis.
+    - x_label, y_label, value_label: Axis and color legend titles.
+    - title: Chart title.
+    - reverse_colors: Use the reversed color scheme, for metrics where lower is better (e.g. drawdowns).
+    """
+    values = np.asarray(values, dtype=float)
+    y_grid, x_grid = np.meshgrid(y_values, x_values, indexing='ij')
+    cells = pd.DataFrame({'x': np.round(x_grid.ravel(), 4), 'y': np.round(y_grid.ravel(), 4), 'value': values.ravel()})
+    color = alt.Color('value:Q', title=value_label, scale=alt.Scale(scheme='viridis', reverse=reverse_colors))
+    return alt.Chart(cells).mark_rect().encode(
+        x=alt.X('x:O', title=x_label, axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y('y:O', title=y_label, sort='descending'),
+        color=color,
+        tooltip=[alt.Tooltip('x:Q', title=x_label), alt.Tooltip('y:Q', title=y_label),
+                 alt.Tooltip('value:Q', title=value_label, format=',.2f')],
+    ).properties(title=title, height=400)
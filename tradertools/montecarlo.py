@@ -0,0 +1,457 @@
+"""
+Monte Carlo engines behind the Know your System page.
+
+Simulations are split into fixed-size blocks of paths. Every block draws from its own child of a
+master `np.random.SeedSequence`, and blocks can run in a process pool. The block partition depends
+only on the run size and memory budget, never on the number of workers, so a given master seed
+produces bit-identical results with one worker or many.
+
+Paths are returned as whole (simulations x trades) matrices. The `stream_*` variants fold every
+block into an online summary instead and only keep a few sample paths.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+
+from tradertools.drawdown import drawdown_analytics, summarize_drawdowns
+from tradertools.ruin import ruin_thresholds
+from tradertools.streaming import DEFAULT_PERCENTILES, PathSummary, band_steps_for, chunk_size_for_budget
+
+
+# Memory budget per block (and per worker) used when none is given
+DEFAULT_MEMORY_BUDGET_MB = 256
+
+# Number of trades simulated at once by the ruin engine before dropping ruined paths
+RUIN_TIME_BLOCK = 32
+
+
+# Function to generate cumulative R-multiple curves for the Know your System model
+def r_multiple_paths(rng, num_simulations, avg_win, avg_loss, std_dev, win_ratio, num_trades):
+    """
+    Generates cumulative R curves of shape (num_simulations, num_trades). Each trade is the average
+    win or average loss, chosen with probability `win_ratio`, plus Gaussian noise of `std_dev`.
+    """
+    # Draw the win/loss mask and the random variation for every trade of every simulation at once
+    wins = rng.random((num_simulations, num_trades)) < win_ratio
+    noise = rng.standard_normal((num_simulations, num_trades)) * std_dev
+
+    # Each trade is the average win or loss plus its random variation; the equity curve is the running sum
+    trade_results = np.where(wins, avg_win, avg_loss) + noise
+    return np.cumsum(trade_results, axis=1, out=trade_results)
+
+
+# Function to generate account equity curves for fixed-dollar or percent-of-equity risk
+def equity_curve_paths(rng, num_simulations, balance, risk_per_trade, win_percent, win_loss_ratio, num_trades, risk_type,
+                       ruin_balance=None, ruin_drawdown=None):
+    """
+    Generates equity curves of shape (num_simulations, num_trades + 1) starting at `balance`.
+    With a ruin threshold (see `tradertools.ruin.ruin_thresholds`), paths stop trading once they
+    cross it and keep their balance from then on.
+    """
+    if ruin_balance is not None or ruin_drawdown is not None:
+        return _equity_curve_paths_with_ruin(rng, num_simulations, balance, risk_per_trade, win_percent,
+                                             win_loss_ratio, num_trades, risk_type, ruin_balance, ruin_drawdown)
+
+    # Draw every trade outcome of every simulation at once
+    wins = rng.random((num_simulations, num_trades)) < win_percent / 100
+
+    simulations_results = np.empty((num_simulations, num_trades + 1))
+    simulations_results[:, 0] = balance
+    steps = simulations_results[:, 1:]
+
+    if risk_type == "Percentage of Equity":
+        # Compounding: each trade multiplies the balance by (1 + r * outcome)
+        risk_fraction = risk_per_trade / 100
+        steps.fill(1 - risk_fraction)
+        np.copyto(steps, 1 + risk_fraction * win_loss_ratio, where=wins)
+        np.cumprod(steps, axis=1, out=steps)
+        steps *= balance
+    else:  # Fixed Dollar Amount
+        # Fixed risk: each trade adds a constant profit or loss to the balance
+        steps.fill(-risk_per_trade)
+        np.copyto(steps, risk_per_trade * win_loss_ratio, where=wins)
+        np.cumsum(steps, axis=1, out=steps)
+        steps += balance
+
+    return simulations_results
+
+
+def _equity_curve_paths_with_ruin(rng, num_simulations, balance, risk_per_trade, win_percent, win_loss_ratio,
+                                  num_trades, risk_type, ruin_balance, ruin_drawdown):
+    # Simulates RUIN_TIME_BLOCK trades at a time for the paths still alive only. Ruined paths are
+    # frozen at the balance where they crossed the threshold and dropped from the next time blocks,
+    # so the work falls with the fraction of live paths.
+    simulations_results = np.empty((num_simulations, num_trades + 1))
+    simulations_results[:, 0] = balance
+
+    if risk_type == "Percentage of Equity":
+        win_step, loss_step = 1 + risk_per_trade / 100 * win_loss_ratio, 1 - risk_per_trade / 100
+    else:  # Fixed Dollar Amount
+        win_step, loss_step = risk_per_trade * win_loss_ratio, -risk_per_trade
+
+    live = np.arange(num_simulations)
+    current = np.full(num_simulations, float(balance))
+    peaks = current.copy()
+    for start in range(0, num_trades, RUIN_TIME_BLOCK):
+        if live.size == 0:
+            break
+        stop = min(start + RUIN_TIME_BLOCK, num_trades)
+        wins = rng.random((live.size, stop - start)) < win_percent / 100
+        # Float steps even when the risk and the ratio are ints, so the running balance can be added in place
+        steps = np.where(wins, float(win_step), float(loss_step))
+        if risk_type == "Percentage of Equity":
+            np.cumprod(steps, axis=1, out=steps)
+            steps *= current[:, None]
+        else:
+            np.cumsum(steps, axis=1, out=steps)
+            steps += current[:, None]
+
+        # Freeze every path from the first trade that crosses its ruin threshold
+        breached = steps <= ruin_thresholds(steps, ruin_balance, ruin_drawdown, peaks=peaks)
+        ruined = breached.any(axis=1)
+        if ruin_drawdown is not None:
+            peaks = np.maximum(peaks, steps.max(axis=1))
+        if ruined.any():
+            ruin_steps = np.argmax(breached[ruined], axis=1)
+            ruined_paths = steps[ruined]
+            frozen = ruined_paths[np.arange(ruin_steps.size), ruin_steps]
+            frozen_mask = np.arange(stop - start) >= ruin_steps[:, None]
+            steps[ruined] = np.where(frozen_mask, frozen[:, None], ruined_paths)
+            simulations_results[live[ruined], stop + 1:] = frozen[:, None]
+
+        simulations_results[live, start + 1:stop + 1] = steps
+        survivors = ~ruined
+        live, current, peaks = live[survivors], steps[survivors, -1], peaks[survivors]
+
+    return simulations_results
+
+
+def _simulate_block(task):
+    """
+    Simulates one block of paths. Runs in the worker processes, so it must stay a module-level function.
+    Returns the paths, or their `PathSummary` when summary settings are given.
+    """
+    path_function, path_args, seed_sequence, block_simulations, summary_kwargs = task
+    rng = np.random.default_rng(seed_sequence)
+    paths = path_function(rng, block_simulations, *path_args)
+    if summary_kwargs is None:
+        return paths
+    summary = PathSummary(paths.shape[1], **summary_kwargs)
+    summary.add(paths)
+    return summary
+
+
+def block_seed(seed_sequence, index):
+    """
+    Returns the seed of block `index`, the same child `seed_sequence.spawn` would give, without
+    changing the spawn counter of `seed_sequence`. Any block can be regenerated on its own.
+    """
+    return np.random.SeedSequence(seed_sequence.entropy, spawn_key=seed_sequence.spawn_key + (index,),
+                                  pool_size=seed_sequence.pool_size)
+
+
+def iter_blocks(path_function, path_args, num_simulations, block_size, seed=None, workers=1, summary_kwargs=None,
+                start_block=0):
+    """
+    Yields the results of every block of a run, in block order.
+
+    Args:
+    - path_function: Generator called as path_function(rng, block_simulations, *path_args).
+    - path_args: Remaining arguments of the generator.
+    - num_simulations: Total number of paths to simulate.
+    - block_size: Number of paths per block. Must not depend on `workers` for results to be reproducible.
+    - seed: Master seed (int, SeedSequence or None for fresh entropy). Block i uses the i-th spawned child.
+    - workers: Number of worker processes. 1 runs everything in the current process.
+    - summary_kwargs: When given, each block is returned as a `PathSummary` built with these settings
+      instead of its path matrix.
+    - start_block: Index of the first block to simulate, to resume a run where it stopped.
+    """
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    num_blocks = -(-num_simulations // block_size)
+    tasks = (
+        (path_function, path_args, block_seed(seed_sequence, i), min(block_size, num_simulations - i * block_size),
+         summary_kwargs)
+        for i in range(start_block, num_blocks)
+    )
+
+    if workers <= 1 or num_blocks - start_block <= 1:
+        for task in tasks:
+            yield _simulate_block(task)
+        return
+
+    # Keep a bounded number of blocks in flight so finished results do not pile up in memory
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, num_blocks - start_block), mp_context=context) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_simulate_block, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class ProgressiveRun:
+    """
+    A simulation run that advances one block at a time. It can be previewed between blocks, stopped,
+    and resumed later with `advance`; every block keeps its own seed, so a resumed run ends with exactly
+    the result of an uninterrupted one.
+
+    Args:
+    - path_function, path_args, num_simulations, seed, workers: See `iter_blocks`.
+    - num_columns: Number of values per path returned by the generator.
+    - streaming: Fold blocks into a `PathSummary` instead of keeping the full path matrix.
+    - memory_budget_mb: Approximate memory allowed for one block (per worker), in megabytes.
+    - summary_kwargs: Settings of the `PathSummary` in streaming mode.
+    - finish: Function applied to the path matrix (or to the summary dictionary in streaming mode)
+      by `result`, e.g. to add drawdown statistics.
+    """
+
+    def __init__(self, path_function, path_args, num_simulations, num_columns, streaming=False,
+                 memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, seed=None, workers=1, summary_kwargs=None, finish=None):
+        self.path_function = path_function
+        self.path_args = path_args
+        self.num_simulations = num_simulations
+        self.streaming = streaming
+        self.block_size = chunk_size_for_budget(num_columns, memory_budget_mb)
+        self.num_blocks = -(-num_simulations // self.block_size)
+        # Fresh entropy is drawn once, so resuming continues the same run
+        self.seed = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.workers = workers
+        self.summary_kwargs = summary_kwargs or {}
+        self.finish = finish
+        self.blocks_done = 0
+        self.num_done = 0
+        if streaming:
+            self.summary = PathSummary(num_columns, **self.summary_kwargs)
+        else:
+            self.paths = np.empty((num_simulations, num_columns))
+
+    @property
+    def complete(self):
+        return self.blocks_done == self.num_blocks
+
+    def advance(self):
+        """
+        Simulates the remaining blocks, yielding the run itself after each one.
+        """
+        blocks = iter_blocks(self.path_function, self.path_args, self.num_simulations, self.block_size,
+                             seed=self.seed, workers=self.workers,
+                             summary_kwargs=self.summary_kwargs if self.streaming else None,
+                             start_block=self.blocks_done)
+        for block in blocks:
+            block_simulations = min(self.block_size, self.num_simulations - self.num_done)
+            if self.streaming:
+                self.summary.merge(block)
+            else:
+                self.paths[self.num_done:self.num_done + block_simulations] = block
+            self.num_done += block_simulations
+            self.blocks_done += 1
+            yield self
+
+    def preview(self):
+        """
+        Returns the results so far without `finish`: the summary dictionary in streaming mode,
+        otherwise the rows of the path matrix simulated so far.
+        """
+        return self.summary.result() if self.streaming else self.paths[:self.num_done]
+
+    def result(self):
+        """
+        Returns the results so far, passed through `finish`. Partial when the run is not complete.
+        """
+        value = self.preview()
+        return self.finish(value) if self.finish is not None else value
+
+    def run_to_end(self):
+        """
+        Simulates every remaining block and returns `result`.
+        """
+        for _ in self.advance():
+            pass
+        return self.result()
+
+
+def simulate_paths(path_function, path_args, num_simulations, num_columns, seed=None, workers=1,
+                   memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Runs a path generator block by block and returns the full (num_simulations, num_columns) matrix.
+    """
+    return ProgressiveRun(path_function, path_args, num_simulations, num_columns, memory_budget_mb=memory_budget_mb,
+                          seed=seed, workers=workers).run_to_end()
+
+
+def _r_curve_finish(expected_equity_curve, risk_percent, streaming):
+    # Adds the expected curve (and, for path matrices, the drawdown summary) to the results of R-curve runs
+    def finish(value):
+        if streaming:
+            return {**value, 'expected_equity_curve': expected_equity_curve}
+        analytics = drawdown_analytics(value, start_value=0.0, risk_percent=risk_percent)
+        return value, expected_equity_curve, summarize_drawdowns(analytics, unit='R')
+    return finish
+
+
+def r_curve_run(path_function, path_args, expected_equity_curve, num_trades, num_simulations, streaming=False,
+                memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, sample_paths=100, band_points=200, seed=None, workers=1,
+                risk_percent=1.0):
+    """
+    Builds the `ProgressiveRun` of a generator of cumulative R curves. Its result is the same as
+    `monte_carlo_simulation` (or `stream_monte_carlo` in streaming mode) for that generator.
+    """
+    summary_kwargs = {'band_points': band_points, 'sample_paths': sample_paths, 'start_value': 0.0,
+                      'risk_percent': risk_percent, 'unit': 'R'}
+    return ProgressiveRun(path_function, path_args, num_simulations, num_trades, streaming=streaming,
+                          memory_budget_mb=memory_budget_mb, seed=seed, workers=workers, summary_kwargs=summary_kwargs,
+                          finish=_r_curve_finish(expected_equity_curve, risk_percent, streaming))
+
+
+def monte_carlo_run(avg_win, avg_loss, std_dev, win_ratio, num_trades, num_simulations, streaming=False,
+                    memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, sample_paths=100, band_points=200, seed=None, workers=1,
+                    risk_percent=1.0):
+    """
+    Progressive version of `monte_carlo_simulation` and `stream_monte_carlo` (see `r_curve_run`).
+    """
+    # Calculate expected equity curve based on the expected performance of the given stats
+    expected_performance = avg_win * win_ratio + avg_loss * (1 - win_ratio)
+    expected_equity_curve = np.arange(1, num_trades + 1) * expected_performance
+    return r_curve_run(
+        r_multiple_paths, (avg_win, avg_loss, std_dev, win_ratio, num_trades), expected_equity_curve, num_trades,
+        num_simulations, streaming=streaming, memory_budget_mb=memory_budget_mb, sample_paths=sample_paths,
+        band_points=band_points, seed=seed, workers=workers, risk_percent=risk_percent,
+    )
+
+
+# Function for Monte Carlo simulation including drawdown statistics
+def monte_carlo_simulation(avg_win, avg_loss, std_dev, win_ratio, num_trades, num_simulations, seed=None, workers=1,
+                           risk_percent=1.0):
+    """
+    Simulates cumulative R curves for a system described by its average win, average loss, trade standard
+    deviation and win ratio.
+
+    Args:
+    - risk_percent: Percentage of the account risked per R, used to express drawdowns in %.
+
+    Returns:
+    - The (num_simulations, num_trades) matrix of R curves, the expected equity curve, and the drawdown
+      summary of `summarize_drawdowns` (stats table and max drawdown histogram).
+    """
+    return monte_carlo_run(avg_win, avg_loss, std_dev, win_ratio, num_trades, num_simulations, seed=seed,
+                           workers=workers, risk_percent=risk_percent).run_to_end()
+
+
+def equity_curve_run(balance, risk_per_trade, win_percent, win_loss_ratio, num_trades, num_simulations, risk_type,
+                     streaming=False, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, sample_paths=100, band_points=200,
+                     seed=None, workers=1, ruin_balance=None, ruin_drawdown=None):
+    """
+    Progressive version of `simulate_equity_curve` and `stream_equity_curve`: returns their
+    `ProgressiveRun`, whose result is the same as theirs.
+    """
+    summary_kwargs = {'band_points': band_points, 'sample_paths': sample_paths, 'ruin_balance': ruin_balance,
+                      'ruin_drawdown': ruin_drawdown}
+    return ProgressiveRun(
+        equity_curve_paths,
+        (balance, risk_per_trade, win_percent, win_loss_ratio, num_trades, risk_type, ruin_balance, ruin_drawdown),
+        num_simulations, num_trades + 1, streaming=streaming, memory_budget_mb=memory_budget_mb, seed=seed,
+        workers=workers, summary_kwargs=summary_kwargs,
+    )
+
+
+# Function to simulate the equity curve based on trading parameters
+def simulate_equity_curve(balance, risk_per_trade, win_percent, win_loss_ratio, num_trades, num_simulations, risk_type,
+                          seed=None, workers=1, ruin_balance=None, ruin_drawdown=None):
+    """
+    Simulate multiple equity curves based on the specified trading parameters.
+    
+    Args:
+    - balance: Initial trading balance.
+    - risk_per_trade: Risk per trade, as a percentage of equity or fixed dollar amount.
+    - win_percent: Percentage of winning trades.
+    - win_loss_ratio: Ratio of average win to average loss.
+    - num_trades: Number of trades per simulation.
+    - num_simulations: Number of simulations to run.
+    - risk_type: 'Percentage of Equity' or 'Fixed Dollar Amount' to specify how risk is calculated.
+    - seed: Master seed for reproducible runs. None draws fresh entropy.
+    - workers: Number of worker processes to spread the simulations over.
+    - ruin_balance: Minimum account size at which a simulation is ruined and stops trading. None disables it.
+    - ruin_drawdown: Drawdown from the running peak, in %, at which a simulation is ruined. None disables it.
+    
+    Returns:
+    - A 2-D numpy array of shape (num_simulations, num_trades + 1) with one equity curve per row,
+      starting at the initial balance. Ruined curves stay flat from the trade that ruined them.
+    """
+    return equity_curve_run(balance, risk_per_trade, win_percent, win_loss_ratio, num_trades, num_simulations,
+                            risk_type, seed=seed, workers=workers, ruin_balance=ruin_balance,
+                            ruin_drawdown=ruin_drawdown).run_to_end()
+
+
+# Function to compute percentile bands of a full path matrix, in the same format as the streaming summary
+def percentile_bands(simulations_results, percentiles=DEFAULT_PERCENTILES, band_points=1000):
+    """
+    Returns {'steps': step indices, 'bands': {percentile: values}} for at most `band_points` evenly
+    spaced steps of a (num_simulations, num_steps) matrix.
+    """
+    simulations_results = np.asarray(simulations_results)
+    steps = band_steps_for(simulations_results.shape[1], band_points)
+    values = np.percentile(simulations_results[:, steps], percentiles, axis=0)
+    return {'steps': steps, 'bands': {p: values[i] for i, p in enumerate(percentiles)}}
+
+
+# Function to run any path generator block by block and fold the blocks into a summary
+def stream_paths(path_function, path_args, num_simulations, num_columns, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB,
+                 sample_paths=100, band_points=200, start_value=None, risk_percent=None, unit='$', seed=None, workers=1,
+                 ruin_balance=None, ruin_drawdown=None):
+    """
+    Generates `num_simulations` paths in blocks that fit in `memory_budget_mb` and folds every block
+    into a `PathSummary`. Only the summary and `sample_paths` full paths are kept.
+
+    Args:
+    - path_function: Generator called as path_function(rng, block_simulations, *path_args).
+    - path_args: Remaining arguments of the generator.
+    - num_simulations: Total number of paths to simulate.
+    - num_columns: Number of values per path returned by the generator.
+    - memory_budget_mb: Approximate memory allowed for one block (per worker), in megabytes.
+    - sample_paths: Number of full paths kept for plotting.
+    - band_points: Maximum number of steps at which percentile bands are tracked.
+    - start_value: Initial peak used for drawdowns when the paths do not include their start.
+    - risk_percent: For R curves, the percentage of the account risked per R (drawdowns in %).
+    - unit: Unit of the path values used in the drawdown labels.
+    - seed: Master seed for reproducible runs. None draws fresh entropy.
+    - workers: Number of worker processes. Block summaries are merged back in block order.
+    - ruin_balance, ruin_drawdown: Ruin threshold of account equity curves (see `tradertools.ruin`).
+
+    Returns:
+    - The summary dictionary produced by `PathSummary.result`.
+    """
+    summary_kwargs = {'band_points': band_points, 'sample_paths': sample_paths, 'start_value': start_value,
+                      'risk_percent': risk_percent, 'unit': unit, 'ruin_balance': ruin_balance,
+                      'ruin_drawdown': ruin_drawdown}
+    return ProgressiveRun(path_function, path_args, num_simulations, num_columns, streaming=True,
+                          memory_budget_mb=memory_budget_mb, seed=seed, workers=workers,
+                          summary_kwargs=summary_kwargs).run_to_end()
+
+
+def stream_monte_carlo(avg_win, avg_loss, std_dev, win_ratio, num_trades, num_simulations,
+                       memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, sample_paths=100, band_points=200, seed=None, workers=1,
+                       risk_percent=1.0):
+    """
+    Streaming version of `monte_carlo_simulation`: returns the run summary (see `stream_paths`)
+    with the expected equity curve added under 'expected_equity_curve'.
+    """
+    return monte_carlo_run(avg_win, avg_loss, std_dev, win_ratio, num_trades, num_simulations, streaming=True,
+                           memory_budget_mb=memory_budget_mb, sample_paths=sample_paths, band_points=band_points,
+                           seed=seed, workers=workers, risk_percent=risk_percent).run_to_end()
+
+
+def stream_equity_curve(balance, risk_per_trade, win_percent, win_loss_ratio, num_trades, num_simulations, risk_type,
+                        memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, sample_paths=100, band_points=200, seed=None, workers=1,
+                        ruin_balance=None, ruin_drawdown=None):
+    """
+    Streaming version of `simulate_equity_curve`: returns the run summary (see `stream_paths`),
+    including the ruin summary under 'ruin' when a ruin threshold is given.
+    """
+    return equity_curve_run(balance, risk_per_trade, win_percent, win_loss_ratio, num_trades, num_simulations,
+                            risk_type, streaming=True, memory_budget_mb=memory_budget_mb, sample_paths=sample_paths,
+                            band_points=band_points, seed=seed, workers=workers, ruin_balance=ruin_balance,
+                            ruin_drawdown=ruin_drawdown).run_to_end()
@@ -0,0 +1,154 @@
+"""
+Risk-per-trade optimizer for the percent-of-equity Equity Curve Simulator.
+
+Every candidate risk is evaluated on one fixed set of simulated win/loss sequences (common random
+numbers), so the objective is a smooth, deterministic function of the risk and can be searched with
+golden-section search (growth) and bisection (drawdown constraint) instead of rerunning simulations.
+With percent-of-equity risk r and win/loss ratio b, the log equity after t trades with K_t wins is
+t * log(1 - r) + K_t * (log(1 + r * b) - log(1 - r)), so the running win counts are all that is kept.
+"""
+import numpy as np
+
+from tradertools.sweep import scan_drawdowns
+
+
+# Largest risk per trade searched, in %. Risking 100% makes a single loss fatal.
+MAX_RISK_PERCENT = 99.0
+
+# Precision of the searches, in risk percentage points
+RISK_TOLERANCE = 0.01
+
+
+# Function to compute the Kelly fraction of a system with fixed win/loss sizes
+def kelly_fraction(win_percent, win_loss_ratio):
+    """
+    Returns the growth-optimal risk per trade in %, f* = p - (1 - p) / b, floored at 0 for losing systems.
+    A win/loss ratio that is not positive never wins anything, so its f* is 0 too.
+    """
+    if win_loss_ratio <= 0:
+        return 0.0
+    p = win_percent / 100
+    return max(0.0, (p - (1 - p) / win_loss_ratio) * 100)
+
+
+# Function to draw the common outcome sequences every candidate risk is evaluated on
+def outcome_sequences(win_percent, num_trades, num_simulations, seed=None):
+    """
+    Returns the running number of wins of every simulation, an int32 array of shape (num_trades, num_simulations).
+    """
+    rng = np.random.default_rng(seed)
+    wins = rng.random((num_trades, num_simulations)) < win_percent / 100
+    return np.cumsum(wins, axis=0, dtype=np.int32)
+
+
+def _log_coefficients(risk_percent, win_loss_ratio):
+    # Log equity change per trade and extra change per win
+    per_trade = np.log1p(-risk_percent / 100)
+    return per_trade, np.log1p(risk_percent / 100 * win_loss_ratio) - per_trade
+
+
+# Function to compute the simulated growth rate of a risk per trade
+def growth_rate(risk_percent, cumulative_wins, win_loss_ratio):
+    """
+    Returns the mean log growth per trade over the simulations of `outcome_sequences`.
+    """
+    per_trade, per_win = _log_coefficients(risk_percent, win_loss_ratio)
+    num_trades = cumulative_wins.shape[0]
+    return float(per_trade + per_win * cumulative_wins[-1].mean() / num_trades)
+
+
+# Function to compute how often a risk per trade exceeds a max drawdown
+def drawdown_probability(risk_percent, cumulative_wins, win_loss_ratio, max_drawdown):
+    """
+    Returns the fraction of the simulations of `outcome_sequences` whose max drawdown is larger than
+    `max_drawdown` (in %) when risking `risk_percent` of equity per trade.
+    """
+    per_trade, per_win = _log_coefficients(risk_percent, win_loss_ratio)
+    rows = (per_trade * (t + 1) + per_win * cumulative_wins[t] for t in range(cumulative_wins.shape[0]))
+    _, drawdown_pct = scan_drawdowns(rows, 0.0, log_space=True)
+    return float((drawdown_pct > max_drawdown).mean())
+
+
+# Function to find the maximum of a unimodal function on an interval
+def golden_section_max(function, low, high, tolerance=RISK_TOLERANCE):
+    """
+    Golden-section search for the maximum of a unimodal `function` on [low, high].
+    Returns the argument of the maximum, within `tolerance`.
+    """
+    inverse_phi = (np.sqrt(5) - 1) / 2
+    x1, x2 = high - inverse_phi * (high - low), low + inverse_phi * (high - low)
+    f1, f2 = function(x1), function(x2)
+    while high - low > tolerance:
+        if f1 < f2:
+            low, x1, f1 = x1, x2, f2
+            x2 = low + inverse_phi * (high - low)
+            f2 = function(x2)
+        else:
+            high, x2, f2 = x2, x1, f1
+            x1 = high - inverse_phi * (high - low)
+            f1 = function(x1)
+    return (low + high) / 2
+
+
+# Function to find the largest value that still satisfies a monotone constraint
+def bisect_largest(is_acceptable, low, high, tolerance=RISK_TOLERANCE):
+    """
+    Bisection for the largest x in [low, high] with is_acceptable(x), assuming acceptable values
+    form an interval starting at `low`. Returns None when `low` itself is not acceptable.
+    """
+    if not is_acceptable(low):
+        return None
+    if is_acceptable(high):
+        return high
+    while high - low > tolerance:
+        middle = (low + high) / 2
+        if is_acceptable(middle):
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+# Function to find the growth-optimal and the drawdown-constrained risk per trade
+def optimize_risk(win_percent, win_loss_ratio, num_trades, num_simulations, max_drawdown=20.0, tolerance=5.0,
+                  seed=None):
+    """
+    Searches the risk per trade (% of equity) of a system with the given win % and win/loss ratio.
+
+    Args:
+    - win_percent: Percentage of winning trades.
+    - win_loss_ratio: Ratio of average win to average loss.
+    - num_trades: Number of trades per simulation.
+    - num_simulations: Number of simulated outcome sequences shared by all candidates.
+    - max_drawdown: Max drawdown to stay within, in %.
+    - tolerance: Largest acceptable probability of a drawdown beyond `max_drawdown`, in %.
+    - seed: Seed of the outcome sequences. None draws fresh entropy.
+
+    Returns:
+    - A dictionary with 'kelly' (theoretical f*), 'optimal' (risk maximizing the simulated growth),
+      'optimal_growth' (mean log growth per trade at that risk), 'max_risk' (largest risk whose
+      probability of exceeding `max_drawdown` is at most `tolerance`, None if even the smallest risk
+      fails) and 'max_risk_probability' (that probability, in %). Risks are in %.
+    """
+    if not win_loss_ratio > 0:
+        raise ValueError("Win/loss ratio must be positive.")
+    cumulative_wins = outcome_sequences(win_percent, num_trades, num_simulations, seed=seed)
+
+    optimal = golden_section_max(lambda risk: growth_rate(risk, cumulative_wins, win_loss_ratio),
+                                 0.0, MAX_RISK_PERCENT)
+
+    max_risk = bisect_largest(
+        lambda risk: drawdown_probability(risk, cumulative_wins, win_loss_ratio, max_drawdown) * 100 <= tolerance,
+        RISK_TOLERANCE, MAX_RISK_PERCENT,
+    )
+    probability = None
+    if max_risk is not None:
+        probability = drawdown_probability(max_risk, cumulative_wins, win_loss_ratio, max_drawdown) * 100
+
+    return {
+        'kelly': kelly_fraction(win_percent, win_loss_ratio),
+        'optimal': float(optimal),
+        'optimal_growth': growth_rate(optimal, cumulative_wins, win_loss_ratio),
+        'max_risk': max_risk,
+        'max_risk_probability': probability,
+    }
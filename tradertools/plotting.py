@@ -0,0 +1,168 @@
+"""
+Server-side rendering of the Monte Carlo charts with matplotlib.
+
+Charts are drawn with the object-oriented API on standalone `Figure` objects: nothing touches pyplot's
+global figure registry or the global style, so figures are released as soon as they are encoded and
+rendering is safe from concurrent sessions.
+"""
+import io
+
+import numpy as np
+import matplotlib.ticker as ticker
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.ticker import ScalarFormatter
+
+from tradertools.montecarlo import percentile_bands
+from tradertools.streaming import band_steps_for
+
+
+# Chart types offered on the page
+CHART_TYPES = ("Auto", "Percentile Bands", "Individual Paths")
+
+# Above this many simulations, 'Auto' draws percentile bands instead of every path
+FAN_CHART_THRESHOLD = 500
+
+# Maximum number of points drawn per line along the trade axis
+MAX_POINTS_PER_LINE = 1000
+
+# Colors of the dark theme, set explicitly on every figure instead of through the global style
+BACKGROUND_COLOR = 'black'
+FOREGROUND_COLOR = 'white'
+BAND_COLOR = '#56b0ff'
+PATH_COLORS = ['#8dd3c7', '#feffb3', '#bfbbd9', '#fa8174', '#81b1d2', '#fdb462', '#b3de69', '#bc82bd', '#ccebc4', '#ffed6f']
+
+
+# Custom formatter function for the Y-axis
+def format_func(value, tick_number):
+    """
+    Converts numerical value to a string with K, M, or B suffix.
+    Args:
+    - value: The numerical value of the tick.
+    - tick_number: The tick number (unused here but required by FuncFormatter).
+    Returns:
+    - Formatted string with appropriate suffix.
+    """
+    if value >= 1_000_000_000:
+        return f'{value / 1_000_000_000:.1f}B'
+    elif value >= 1_000_000:
+        return f'{value / 1_000_000:.1f}M'
+    elif value >= 1_000:
+        return f'{value / 1_000:.1f}K'
+    else:
+        return int(value)
+
+
+# Formatter of the logarithmic Y-axis, with the suffixes of `format_func`
+class CustomScalarFormatter(ScalarFormatter):
+    def __call__(self, x, pos=None):
+        # Called for every tick; `x` is the value itself, not its logarithm
+        if x >= 1_000_000_000:
+            return f'{x / 1_000_000_000:.1f}B'
+        elif x >= 1_000_000:
+            return f'{x / 1_000_000:.1f}M'
+        elif x >= 1_000:
+            return f'{x / 1_000:.1f}K'
+        else:
+            return f'{x:.1f}'
+
+
+def _path_collection(paths, colors, max_points, **kwargs):
+    # All paths as a single LineCollection, downsampled to at most `max_points` points along the trade axis
+    steps = band_steps_for(paths.shape[1], max_points)
+    segments = np.empty((paths.shape[0], steps.size, 2))
+    segments[:, :, 0] = steps
+    segments[:, :, 1] = paths[:, steps]
+    return LineCollection(segments, colors=colors, **kwargs)
+
+
+def uses_percentile_bands(num_simulations, chart_type, bands=None):
+    """
+    Tells whether a chart of `chart_type` draws percentile bands rather than every path.
+    """
+    if chart_type == 'Auto':
+        return bands is not None or num_simulations > FAN_CHART_THRESHOLD
+    return chart_type == 'Percentile Bands'
+
+
+def render_monte_carlo_chart(simulations_results, expected_equity_curve, x_label='Trade Number', y_label='Equity ($)',
+                             scale_type='Arithmetic Scale', chart_type='Auto', bands=None, sample_paths=20,
+                             image_format='png'):
+    """
+    Renders the results of Monte Carlo simulations with options for custom axis labels
+    and a choice between arithmetic and logarithmic scale for the Y-axis.
+
+    Args:
+    - simulations_results: A list of lists or a numpy array containing the simulation results
+      (or a sample of them when `bands` is given).
+    - expected_equity_curve: A list containing the expected equity curve. Can be None.
+    - x_label: The label for the X-axis.
+    - y_label: The label for the Y-axis.
+    - scale_type: 'Arithmetic Scale' or 'Logarithmic Scale' to specify the Y-axis scale.
+    - chart_type: 'Individual Paths' draws every path, 'Percentile Bands' draws the 5/25/50/75/95
+      percentile bands plus `sample_paths` paths, and 'Auto' picks bands for large runs.
+    - bands: Precomputed {'steps', 'bands'} percentiles (e.g. from a streaming summary). Computed from
+      `simulations_results` when None.
+    - sample_paths: Number of individual paths drawn on top of the percentile bands.
+    - image_format: 'png' or 'svg'.
+
+    Returns:
+    - The encoded image as bytes.
+    """
+    simulations_results = np.asarray(simulations_results, dtype=float)
+    use_bands = uses_percentile_bands(len(simulations_results), chart_type, bands)
+
+    fig = Figure(figsize=(14, 8), facecolor=BACKGROUND_COLOR)  # Set figure size
+    try:
+        ax = fig.add_subplot()
+        ax.set_facecolor(BACKGROUND_COLOR)
+        ax.tick_params(colors=FOREGROUND_COLOR)
+
+        # Apply 'plain' formatting to avoid scientific notation
+        ax.ticklabel_format(style='plain', axis='y', useOffset=False)
+
+        # Set the Y-axis scale and formatter based on the user's choice
+        if scale_type == 'Logarithmic Scale':
+            ax.set_yscale('log')
+            ax.yaxis.set_major_formatter(CustomScalarFormatter())
+        else:
+            ax.yaxis.set_major_formatter(ticker.FuncFormatter(format_func))
+
+        # Plot simulation results and expected performance curve if provided
+        if use_bands:
+            if bands is None:
+                bands = percentile_bands(simulations_results, band_points=MAX_POINTS_PER_LINE)
+            steps, values = bands['steps'], bands['bands']
+            ax.fill_between(steps, values[5], values[95], color=BAND_COLOR, alpha=0.2, linewidth=0, label='5th-95th Percentile')
+            ax.fill_between(steps, values[25], values[75], color=BAND_COLOR, alpha=0.35, linewidth=0, label='25th-75th Percentile')
+            ax.plot(steps, values[50], color=BAND_COLOR, linewidth=2, label='Median')
+            if len(simulations_results) and sample_paths:
+                ax.add_collection(_path_collection(simulations_results[:sample_paths], PATH_COLORS, MAX_POINTS_PER_LINE,
+                                                   alpha=0.5, linewidths=0.7))
+        elif len(simulations_results):
+            ax.add_collection(_path_collection(simulations_results, PATH_COLORS, MAX_POINTS_PER_LINE,
+                                               alpha=0.75, linewidths=0.7))
+        ax.autoscale_view()
+        if expected_equity_curve is not None:
+            ax.plot(expected_equity_curve, color=FOREGROUND_COLOR, linestyle='--', label='Expected Performance', linewidth=2)
+
+        # Set plot properties including custom axis labels
+        ax.set_xlabel(x_label, fontsize=14, color=FOREGROUND_COLOR)
+        ax.set_ylabel(y_label, fontsize=14, color=FOREGROUND_COLOR)
+        ax.set_title('Monte Carlo Simulation of Trading Performance', fontsize=18, color=FOREGROUND_COLOR, fontweight='bold')
+        ax.grid(color='gray', linestyle='-', linewidth=0.5)
+        ax.spines['bottom'].set_color('grey')
+        ax.spines['top'].set_color('grey')
+        ax.spines['right'].set_color('grey')
+        ax.spines['left'].set_color('grey')
+        if expected_equity_curve is not None or use_bands:
+            ax.legend(loc='upper left', frameon=False, labelcolor=FOREGROUND_COLOR)
+        fig.text(0.95, 0.01, 'tradertools.streamlit.app', ha='right', va='bottom', fontsize=10,
+                 color=FOREGROUND_COLOR, alpha=0.85)
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=image_format, facecolor=BACKGROUND_COLOR)
+        return buffer.getvalue()
+    finally:
+        # Drop every artist right away instead of waiting for the figure to be garbage collected
+        fig.clear()
@@ -0,0 +1,139 @@
+"""
+Risk of ruin: the first trade at which an account equity curve crosses a ruin threshold.
+
+A path is ruined once its balance falls to a minimum account size, or once it falls a given
+percentage below its running peak, whichever comes first. The Monte Carlo engine freezes ruined
+paths at that balance, so the first crossing found here is the trade at which the path was stopped.
+"""
+import numpy as np
+
+
+# Memory budget for the temporaries of one block of rows, and rough bytes of temporaries per path value
+ANALYTICS_MEMORY_BUDGET_MB = 128
+_BYTES_PER_CELL = 24
+
+
+# Function to compute the balance at or below which a path is ruined, step by step
+def ruin_thresholds(paths, ruin_balance=None, ruin_drawdown=None, peaks=None):
+    """
+    Returns the ruin threshold of every value of `paths` (same shape).
+
+    Args:
+    - paths: Array of account values of shape (num_paths, num_steps).
+    - ruin_balance: Minimum account size. None disables it.
+    - ruin_drawdown: Drawdown from the running peak, in %, that ruins the account. None disables it.
+    - peaks: Running peaks of earlier steps, one per path, when `paths` continues an earlier chunk.
+    """
+    thresholds = np.full(paths.shape, -np.inf if ruin_balance is None else float(ruin_balance))
+    if ruin_drawdown is not None:
+        running_peaks = np.maximum.accumulate(paths, axis=1)
+        if peaks is not None:
+            np.maximum(running_peaks, peaks[:, None], out=running_peaks)
+        np.maximum(thresholds, running_peaks * (1 - ruin_drawdown / 100), out=thresholds)
+    return thresholds
+
+
+# Function to find the trade at which every path is ruined
+def ruin_times(paths, ruin_balance=None, ruin_drawdown=None, memory_budget_mb=ANALYTICS_MEMORY_BUDGET_MB):
+    """
+    Finds the first step at which each path reaches its ruin threshold (see `ruin_thresholds`).
+
+    Args:
+    - paths: Array of account values of shape (num_paths, num_steps), starting at the initial balance.
+
+    Returns:
+    - A float array with the ruin step of every path (the trade number when the first column is the
+      initial balance), NaN for paths that are never ruined.
+    """
+    paths = np.asarray(paths, dtype=float)
+    times = np.full(paths.shape[0], np.nan)
+    if ruin_balance is None and ruin_drawdown is None:
+        return times
+
+    block_rows = max(1, int(memory_budget_mb * 1024 * 1024 // (max(1, paths.shape[1]) * _BYTES_PER_CELL)))
+    for start in range(0, paths.shape[0], block_rows):
+        block = paths[start:start + block_rows]
+        breached = block <= ruin_thresholds(block, ruin_balance, ruin_drawdown)
+        ruined = breached.any(axis=1)
+        times[start:start + block.shape[0]] = np.where(ruined, np.argmax(breached, axis=1), np.nan)
+    return times
+
+
+# Function to stop ruined paths at the balance where they crossed their threshold
+def freeze_ruined_paths(paths, ruin_balance=None, ruin_drawdown=None):
+    """
+    Holds every ruined path at its value at the first crossing (see `ruin_times`) for the rest of its
+    steps, like the Monte Carlo engine does while simulating. Values up to the crossing never depend on
+    later trades, so freezing a path after simulating it whole gives the same result.
+
+    Returns:
+    - The frozen paths (a new array when a path was ruined).
+    """
+    times = ruin_times(paths, ruin_balance, ruin_drawdown)
+    ruined = np.flatnonzero(~np.isnan(times))
+    if ruined.size == 0:
+        return paths
+    paths = np.array(paths, dtype=float)
+    steps = times[ruined].astype(np.int64)
+    frozen = paths[ruined, steps]
+    after = np.arange(paths.shape[1]) > steps[:, None]
+    paths[ruined] = np.where(after, frozen[:, None], paths[ruined])
+    return paths
+
+
+# Function to summarize how often and how fast the simulated accounts were ruined
+def summarize_ruin(ruin_counts, num_paths, bins=30):
+    """
+    Summarizes ruin from the number of paths ruined at every trade.
+
+    Args:
+    - ruin_counts: Integer array where ruin_counts[t] is the number of paths ruined at trade t.
+    - num_paths: Total number of simulated paths, ruined or not.
+    - bins: Maximum number of bars of the time-to-ruin histogram.
+
+    Returns:
+    - A dictionary with 'probability' (fraction of ruined paths), 'stats' (figures keyed by display
+      label), 'cumulative_probability' (fraction of paths ruined by every trade) and 'histogram', a
+      (counts, bin_edges) pair of the time to ruin.
+    """
+    ruin_counts = np.asarray(ruin_counts, dtype=np.int64)
+    num_ruined = int(ruin_counts.sum())
+    cumulative = np.cumsum(ruin_counts)
+    probability = num_ruined / num_paths if num_paths else 0.0
+
+    trades = np.arange(ruin_counts.size)
+    if num_ruined:
+        avg_time = float((trades * ruin_counts).sum() / num_ruined)
+        median_time = int(np.searchsorted(cumulative, (num_ruined + 1) // 2))
+        first_time = int(np.argmax(ruin_counts > 0))
+        edges = np.unique(np.linspace(first_time, ruin_counts.size, min(bins, ruin_counts.size - first_time) + 1)
+                          .round().astype(np.int64))
+        histogram = (np.add.reduceat(ruin_counts, edges[:-1]), edges)
+    else:
+        avg_time = median_time = first_time = float('nan')
+        histogram = (np.zeros(0, dtype=np.int64), np.zeros(1))
+
+    stats = {
+        'Probability of Ruin (%)': probability * 100,
+        'Ruined Simulations': num_ruined,
+        'Avg Trades to Ruin': avg_time,
+        'Median Trades to Ruin': median_time,
+        'Fastest Ruin (trades)': first_time,
+    }
+    return {
+        'probability': probability,
+        'stats': stats,
+        'cumulative_probability': cumulative / num_paths if num_paths else cumulative.astype(float),
+        'histogram': histogram,
+    }
+
+
+# Function to compute the ruin summary of a full matrix of equity curves
+def ruin_analysis(paths, ruin_balance=None, ruin_drawdown=None, bins=30):
+    """
+    Runs `ruin_times` on a (num_paths, num_steps) matrix and returns the summary of `summarize_ruin`.
+    """
+    paths = np.asarray(paths, dtype=float)
+    times = ruin_times(paths, ruin_balance, ruin_drawdown)
+    ruined = times[~np.isnan(times)].astype(np.int64)
+    return summarize_ruin(np.bincount(ruined, minlength=paths.shape[1]), paths.shape[0], bins=bins)
@@ -0,0 +1,473 @@
+"""
+Position sizing: whole-share sizing of a trade, and equity curves with path-dependent sizing rules.
+
+Sizing in whole shares, capping the risk in dollars or cutting the risk after a losing streak makes
+every trade depend on the equity and the history of the path, so these curves cannot be written as a
+`cumprod`. They are simulated trade by trade, over all simulations at once, by one of two engines:
+
+- 'numba': a compiled loop over simulations and trades, used when Numba is installed.
+- 'numpy': a loop over trades with every simulation as one vector operation.
+
+Both do exactly the same floating-point operations, in the same order, as the plain Python reference
+`sized_equity_curve_reference`, so all three give bit-identical curves for the same win/loss draws.
+"""
+from math import ceil
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional
+    njit = None
+
+from tradertools.montecarlo import DEFAULT_MEMORY_BUDGET_MB, ProgressiveRun
+from tradertools.ruin import freeze_ruined_paths
+
+
+# Rounding methods of the Position Sizing page and their share lot (None rounds up to a whole share)
+ROUNDING_STEPS = {
+    "No Rounding": None,
+    "Round nearest 10": 10,
+    "Round nearest 50": 50,
+    "Round nearest 100": 100,
+    "Round nearest 500": 500,
+    "Round nearest 1000": 1000,
+}
+ROUNDING_METHODS = list(ROUNDING_STEPS)
+
+SIZING_ENGINES = ("auto", "numba", "numpy")
+
+# Accepted watchlist headers of every field, compared in lower case without spaces, dashes or underscores
+WATCHLIST_COLUMNS = {
+    "Symbol": ("symbol", "ticker"),
+    "Side": ("side", "direction", "tradetype"),
+    "Entry": ("entry", "entryprice", "buyprice", "price"),
+    "Stop": ("stop", "stoploss", "stopprice", "stoplossprice"),
+    "Risk ($)": ("risk", "risk$", "riskamount", "riskusd"),
+}
+
+# Price increment of the entry and stop inputs, and number of increments on each side of the current
+# prices covered by a `SizingGrid`
+PRICE_TICK = 0.01
+SIZING_GRID_LEVELS = 25
+
+# Spellings of the trade direction in a watchlist, in lower case
+LONG_SIDES = ("long", "buy", "b", "l")
+SHORT_SIDES = ("short", "sell", "sellshort", "ss", "s")
+
+
+# Function to apply rounding based on the selected method
+def apply_rounding(shares, method):
+    step = ROUNDING_STEPS[method]
+    if step is None:
+        return ceil(shares)
+    return round(shares / step) * step
+
+
+# Function to apply the rounding of `apply_rounding` to an array of share counts
+def round_shares(shares, method):
+    """
+    Vectorized `apply_rounding`: gives the same share counts, as floats, for every element of `shares`.
+    """
+    step = ROUNDING_STEPS[method]
+    shares = np.asarray(shares, dtype=float)
+    if step is None:
+        return np.ceil(shares)
+    # np.round rounds halves to even, like the built-in round
+    return np.round(shares / step) * step
+
+
+# Errors of orders that cannot be sized, shared by `calculate_shares`, `size_orders` and the sizing service
+UNKNOWN_SIDE_ERROR = "Unknown side"
+MISSING_PRICE_ERROR = "Missing entry or stop price"
+NEGATIVE_RISK_ERROR = "Risk must not be negative"
+LONG_STOP_ERROR = "Stop must be below the entry for long trades"
+SHORT_STOP_ERROR = "Stop must be above the entry for short trades"
+
+
+# Function to calculate the initial number of shares based on risk, stop loss, and rounding method
+def calculate_shares(risk_amount, entry_price, stop_loss_price, rounding_method, trade_type):
+    # Stop loss distance depending on the trade direction
+    if trade_type == "Long":
+        stop_loss_distance = entry_price - stop_loss_price
+    elif trade_type == "Short":
+        stop_loss_distance = stop_loss_price - entry_price
+    else:
+        raise ValueError(UNKNOWN_SIDE_ERROR)
+
+    if not stop_loss_distance > 0:
+        raise ValueError(LONG_STOP_ERROR if trade_type == "Long" else SHORT_STOP_ERROR)
+
+    number_of_shares = risk_amount / abs(stop_loss_distance)
+    return apply_rounding(number_of_shares, rounding_method)
+
+
+def _price_band(price, levels, tick):
+    # Prices at every tick around `price`, rounded to the tick, with `price` itself exactly in the middle
+    decimals = max(0, int(round(-np.log10(tick))))
+    band = np.round(price + np.arange(-levels, levels + 1) * tick, decimals)
+    band[levels] = price
+    return band
+
+
+class SizingGrid:
+    """
+    Shares and real risk of every (stop, entry) pair in a band of prices around the current ones, computed
+    in one vectorized pass. Nudging the entry or the stop by a few ticks then becomes a lookup, with
+    exactly the result of `calculate_shares`.
+
+    Args:
+    - risk_amount: Dollar risk per trade.
+    - entry_price, stop_loss_price: Current prices, the middle of the band.
+    - rounding_method: Share rounding (see `ROUNDING_METHODS`).
+    - trade_type: 'Long' or 'Short'.
+    - levels: Number of ticks on each side of the current prices.
+    - tick: Price increment.
+    """
+
+    def __init__(self, risk_amount, entry_price, stop_loss_price, rounding_method, trade_type,
+                 levels=SIZING_GRID_LEVELS, tick=PRICE_TICK):
+        if trade_type not in ("Long", "Short"):
+            raise ValueError(UNKNOWN_SIDE_ERROR)
+        self.risk_amount = risk_amount
+        self.rounding_method = rounding_method
+        self.trade_type = trade_type
+        self.tick = tick
+        self.entry_prices = _price_band(entry_price, levels, tick)
+        self.stop_prices = _price_band(stop_loss_price, levels, tick)
+
+        # Rows are stop prices, columns entry prices
+        if trade_type == "Long":
+            distance = self.entry_prices[None, :] - self.stop_prices[:, None]
+        else:
+            distance = self.stop_prices[:, None] - self.entry_prices[None, :]
+        valid = distance > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shares = round_shares(np.where(valid, risk_amount / np.where(valid, distance, 1.0), np.nan), rounding_method)
+        self.distance = distance
+        self.shares = shares
+        self.real_risk = shares * distance
+
+    def matches(self, risk_amount, rounding_method, trade_type):
+        """
+        Tells whether the grid was computed for these sizing parameters.
+        """
+        return (risk_amount, rounding_method, trade_type) == (self.risk_amount, self.rounding_method, self.trade_type)
+
+    def _index(self, prices, price):
+        i = int(round((price - prices[0]) / self.tick))
+        return i if 0 <= i < prices.size and prices[i] == price else None
+
+    def lookup(self, entry_price, stop_loss_price):
+        """
+        Returns the (shares, real risk) of a pair of prices, NaN when the stop is on the wrong side of
+        the entry, or None when the pair is outside the grid.
+        """
+        row, column = self._index(self.stop_prices, stop_loss_price), self._index(self.entry_prices, entry_price)
+        if row is None or column is None:
+            return None
+        return self.shares[row, column], self.real_risk[row, column]
+
+    def ladder(self, entry_price):
+        """
+        Returns the sizing ladder of an entry price of the grid: a DataFrame with the shares and real
+        risk of every valid stop price of the band, farthest stop first.
+        """
+        column = self._index(self.entry_prices, entry_price)
+        if column is None:
+            raise ValueError("The entry price is outside the sizing grid.")
+        ladder = pd.DataFrame({
+            "Stop Loss Price ($)": self.stop_prices,
+            "Stop Distance ($)": self.distance[:, column],
+            "Shares": self.shares[:, column],
+            "Real R ($)": self.real_risk[:, column],
+        })
+        ladder = ladder[ladder["Shares"].notna() & (ladder["Stop Loss Price ($)"] > 0)]
+        ladder = ladder.sort_values("Stop Distance ($)", ascending=False, ignore_index=True)
+        ladder["Shares"] = ladder["Shares"].astype("int64")
+        return ladder
+
+
+# Function to size one order like the Position Sizing page
+def size_order(entry_price, stop_loss_price, trade_type, risk_amount, rounding_method="No Rounding"):
+    """
+    Sizes one order with `calculate_shares`, which raises ValueError for invalid orders.
+
+    Returns:
+    - A dictionary with 'shares', 'real_risk' (the R shown on the page: shares times the stop
+      distance, after rounding), 'notional' and 'stop_distance'.
+    """
+    shares = calculate_shares(risk_amount, entry_price, stop_loss_price, rounding_method, trade_type)
+    stop_distance = abs(entry_price - stop_loss_price)
+    return {
+        "shares": int(shares),
+        "real_risk": shares * stop_distance,
+        "notional": shares * entry_price,
+        "stop_distance": stop_distance,
+    }
+
+
+# Function to size many orders at once
+def size_orders(sides, entry_prices, stop_prices, risk_amounts, rounding_method="No Rounding"):
+    """
+    Vectorized `size_order` over arrays of orders, with the same share counts and real risk.
+
+    Args:
+    - sides: Trade directions (see `LONG_SIDES` and `SHORT_SIDES`, any case).
+    - entry_prices, stop_prices, risk_amounts: Float arrays, NaN for missing values. A risk of 0 gives 0 shares,
+      like `calculate_shares`.
+    - rounding_method: Share rounding (see `ROUNDING_METHODS`).
+
+    Returns:
+    - A dictionary of arrays: 'side' ('Long' or 'Short', or the given side when unknown), 'shares',
+      'real_risk' and 'notional' (NaN for orders that cannot be sized) and 'error' (the reason, or '').
+    """
+    given_sides = np.char.strip(np.asarray(sides, dtype=str))
+    side = np.char.lower(given_sides)
+    entry = np.asarray(entry_prices, dtype=float)
+    stop = np.asarray(stop_prices, dtype=float)
+    risk = np.broadcast_to(np.asarray(risk_amounts, dtype=float), entry.shape)
+
+    is_long = np.isin(side, LONG_SIDES)
+    is_short = np.isin(side, SHORT_SIDES)
+    distance = np.where(is_short, stop - entry, entry - stop)
+    errors = np.select(
+        [~(is_long | is_short), np.isnan(entry) | np.isnan(stop), ~(risk >= 0), is_long & ~(distance > 0),
+         is_short & ~(distance > 0)],
+        [UNKNOWN_SIDE_ERROR, MISSING_PRICE_ERROR, NEGATIVE_RISK_ERROR, LONG_STOP_ERROR, SHORT_STOP_ERROR],
+        default="",
+    )
+    valid = errors == ""
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shares = round_shares(np.where(valid, risk / np.where(valid, distance, 1.0), np.nan), rounding_method)
+    return {
+        "side": np.select([is_long, is_short], ["Long", "Short"], default=given_sides),
+        "shares": shares,
+        "real_risk": shares * distance,
+        "notional": shares * entry,
+        "error": errors,
+    }
+
+
+# Function to read a watchlist of trade setups from a CSV
+def load_watchlist_csv(file_obj):
+    """
+    Reads a CSV of trade setups with symbol, side, entry and stop columns and an optional per-row risk
+    (see `WATCHLIST_COLUMNS` for the accepted headers).
+
+    Returns:
+    - A DataFrame with the columns of `WATCHLIST_COLUMNS`, prices and risk as floats (NaN when missing).
+    """
+    df = pd.read_csv(file_obj, skipinitialspace=True)
+    normalized = {str(column).strip().lower().replace(" ", "").replace("_", "").replace("-", ""): column
+                  for column in df.columns}
+    watchlist = pd.DataFrame(index=df.index)
+    for field, names in WATCHLIST_COLUMNS.items():
+        column = next((normalized[name] for name in names if name in normalized), None)
+        if column is None and field != "Risk ($)":
+            raise ValueError(f"Missing column in the watchlist: {field}")
+        if field in ("Symbol", "Side"):
+            watchlist[field] = df[column].fillna("").astype(str).str.strip()
+        else:
+            watchlist[field] = pd.to_numeric(df[column], errors="coerce") if column is not None else np.nan
+    return watchlist
+
+
+# Function to size every setup of a watchlist at once
+def size_watchlist(watchlist, risk_amount, rounding_method):
+    """
+    Computes the position of every row of `load_watchlist_csv` in one vectorized pass, with the same
+    rules as `calculate_shares`.
+
+    Args:
+    - watchlist: DataFrame with Symbol, Side, Entry, Stop and, optionally, Risk ($) columns.
+    - risk_amount: Dollar risk of the rows without their own risk.
+    - rounding_method: Share rounding (see `ROUNDING_METHODS`).
+
+    Returns:
+    - The watchlist with 'Shares', 'Real R ($)' and 'Notional ($)' columns added, and an 'Error'
+      column explaining why a row could not be sized (its figures are then empty).
+    """
+    risk = watchlist["Risk ($)"].to_numpy(dtype=float) if "Risk ($)" in watchlist else np.full(len(watchlist), np.nan)
+    risk = np.where(np.isnan(risk), risk_amount, risk)
+    # Blank sides become "" (an unknown side) rather than NaN, which numpy would write as a 1-character text
+    sides = watchlist["Side"].fillna("").astype(str).to_numpy(dtype=object)
+    orders = size_orders(sides, watchlist["Entry"].to_numpy(dtype=float),
+                         watchlist["Stop"].to_numpy(dtype=float), risk, rounding_method)
+
+    sized = watchlist.copy()
+    sized["Side"] = orders["side"]
+    sized["Risk ($)"] = risk
+    sized["Shares"] = pd.array(orders["shares"], dtype="Float64").astype("Int64")
+    sized["Real R ($)"] = orders["real_risk"]
+    sized["Notional ($)"] = orders["notional"]
+    sized["Error"] = orders["error"]
+    return sized
+
+
+# Function to size a whole trade: the plain Python reference of the sizing engines
+def sized_equity_curve_reference(wins, balance, risk_percent, win_loss_ratio, stop_distance,
+                                 rounding_method="No Rounding", max_risk=None, losing_streak=None, risk_cut=0.5):
+    """
+    Simulates equity curves trade by trade with `apply_rounding`. Slow; kept as the reference the
+    engines are checked against.
+
+    Args:
+    - wins: Boolean array of shape (num_simulations, num_trades), True for winning trades.
+    - balance: Initial trading balance.
+    - risk_percent: Risk per trade, as a percentage of the current equity.
+    - win_loss_ratio: Ratio of average win to average loss.
+    - stop_distance: Distance from entry to stop loss per share, in dollars. A loss costs shares * stop_distance.
+    - rounding_method: Share rounding of the Position Sizing page (see `ROUNDING_METHODS`).
+    - max_risk: Largest dollar risk per trade. None disables the cap.
+    - losing_streak: After this many losses in a row, the risk is multiplied by `risk_cut` until the
+      next win. None disables the rule.
+    - risk_cut: Risk multiplier applied during a losing streak.
+
+    Returns:
+    - A (num_simulations, num_trades + 1) array of equity curves starting at `balance`. Accounts
+      that are wiped out stop trading.
+    """
+    risk_fraction = risk_percent / 100
+    curves = []
+    for row in np.asarray(wins, dtype=bool).tolist():
+        equity = float(balance)
+        curve = [equity]
+        losses = 0
+        for win in row:
+            risk_amount = equity * risk_fraction
+            if losing_streak is not None and losses >= losing_streak:
+                risk_amount = risk_amount * risk_cut
+            if max_risk is not None:
+                risk_amount = min(risk_amount, max_risk)
+            shares = apply_rounding(risk_amount / stop_distance, rounding_method) if equity > 0 else 0
+            equity = equity + shares * stop_distance * (win_loss_ratio if win else -1.0)
+            losses = 0 if win else losses + 1
+            curve.append(equity)
+        curves.append(curve)
+    return np.array(curves, dtype=float).reshape(len(curves), -1)
+
+
+def _sizing_parameters(risk_percent, rounding_method, max_risk, losing_streak):
+    # Sentinels used by the engines: step 0 rounds up, an infinite cap and a zero streak disable the rules
+    step = ROUNDING_STEPS[rounding_method] or 0
+    cap = np.inf if max_risk is None else float(max_risk)
+    streak = 0 if losing_streak is None else int(losing_streak)
+    return risk_percent / 100, float(step), cap, streak
+
+
+def _sized_curves_numpy(wins, balance, risk_fraction, win_loss_ratio, stop_distance, step, cap, streak, risk_cut):
+    # One vector operation per trade over all simulations, on trade-major copies of the draws and curves
+    num_simulations, num_trades = wins.shape
+    wins = np.ascontiguousarray(wins.T)
+    curves = np.empty((num_trades + 1, num_simulations))
+    equity = curves[0]
+    equity.fill(balance)
+    losses = np.zeros(num_simulations, dtype=np.int64)
+    for t in range(num_trades):
+        win = wins[t]
+        risk_amount = equity * risk_fraction
+        if streak > 0:
+            risk_amount = np.where(losses >= streak, risk_amount * risk_cut, risk_amount)
+        np.minimum(risk_amount, cap, out=risk_amount)
+        shares = risk_amount / stop_distance
+        shares = np.ceil(shares, out=shares) if step == 0 else np.rint(shares / step) * step
+        shares[equity <= 0] = 0.0
+        shares *= stop_distance
+        shares *= np.where(win, win_loss_ratio, -1.0)
+        equity = np.add(equity, shares, out=curves[t + 1])
+        losses += 1
+        losses[win] = 0
+    return curves.T
+
+
+def _sized_curves_loop(wins, balance, risk_fraction, win_loss_ratio, stop_distance, step, cap, streak, risk_cut):
+    # Trades in the outer loop and simulations in the inner one: the inner iterations are independent,
+    # so the compiled loop overlaps them instead of waiting on one path's chain of divisions.
+    # Draws and curves are trade-major so the inner loop reads and writes contiguous rows.
+    num_simulations, num_trades = wins.shape
+    wins = np.ascontiguousarray(wins.T)
+    curves = np.empty((num_trades + 1, num_simulations))
+    losses = np.zeros(num_simulations, dtype=np.int64)
+    curves[0, :] = balance
+    for t in range(num_trades):
+        equity_row = curves[t]
+        next_row = curves[t + 1]
+        win_row = wins[t]
+        for i in range(num_simulations):
+            equity = equity_row[i]
+            risk_amount = equity * risk_fraction
+            if streak > 0 and losses[i] >= streak:
+                risk_amount = risk_amount * risk_cut
+            risk_amount = min(risk_amount, cap)
+            shares = risk_amount / stop_distance
+            shares = np.ceil(shares) if step == 0 else np.rint(shares / step) * step
+            if equity <= 0:
+                shares = 0.0
+            win = win_row[i]
+            next_row[i] = equity + shares * stop_distance * (win_loss_ratio if win else -1.0)
+            losses[i] = 0 if win else losses[i] + 1
+    return curves.T
+
+
+# Compiled once per process, on first use
+_sized_curves_numba = njit(cache=True, nogil=True)(_sized_curves_loop) if njit is not None else None
+
+
+# Function to simulate equity curves with path-dependent sizing rules
+def sized_equity_curves(wins, balance, risk_percent, win_loss_ratio, stop_distance, rounding_method="No Rounding",
+                        max_risk=None, losing_streak=None, risk_cut=0.5, engine="auto"):
+    """
+    Fast equivalent of `sized_equity_curve_reference` (see its arguments).
+
+    Args:
+    - engine: 'numba' (compiled, requires Numba), 'numpy', or 'auto' to use Numba when it is installed.
+    """
+    if engine not in SIZING_ENGINES:
+        raise ValueError(f"Unknown sizing engine: {engine}")
+    if engine == "numba" and _sized_curves_numba is None:
+        raise ValueError("The numba engine requires Numba to be installed.")
+
+    wins = np.ascontiguousarray(wins, dtype=bool)
+    parameters = _sizing_parameters(risk_percent, rounding_method, max_risk, losing_streak)
+    kernel = _sized_curves_numba if engine != "numpy" and _sized_curves_numba is not None else _sized_curves_numpy
+    risk_fraction, step, cap, streak = parameters
+    return kernel(wins, float(balance), risk_fraction, float(win_loss_ratio), float(stop_distance), step, cap, streak,
+                  float(risk_cut))
+
+
+# Function to generate sized equity curves for the Monte Carlo engine
+def sized_equity_curve_paths(rng, num_simulations, balance, risk_percent, win_percent, win_loss_ratio, num_trades,
+                             stop_distance, rounding_method="No Rounding", max_risk=None, losing_streak=None,
+                             risk_cut=0.5, ruin_balance=None, ruin_drawdown=None, engine="auto"):
+    """
+    Path generator (see `iter_blocks`) of equity curves with sizing rules. Outcomes are drawn like in
+    `equity_curve_paths`, so the same seed gives the same sequence of wins and losses. With a ruin
+    threshold, paths stop trading once they cross it and keep their balance from then on.
+    """
+    wins = rng.random((num_simulations, num_trades)) < win_percent / 100
+    paths = sized_equity_curves(wins, balance, risk_percent, win_loss_ratio, stop_distance,
+                                rounding_method=rounding_method, max_risk=max_risk, losing_streak=losing_streak,
+                                risk_cut=risk_cut, engine=engine)
+    return freeze_ruined_paths(paths, ruin_balance, ruin_drawdown)
+
+
+def sized_equity_curve_run(balance, risk_percent, win_percent, win_loss_ratio, num_trades, num_simulations,
+                           stop_distance, rounding_method="No Rounding", max_risk=None, losing_streak=None, risk_cut=0.5,
+                           streaming=False, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, sample_paths=100,
+                           band_points=200, seed=None, workers=1, ruin_balance=None, ruin_drawdown=None):
+    """
+    `ProgressiveRun` of equity curves with sizing rules, the counterpart of `equity_curve_run`. Like
+    there, paths are frozen at the ruin threshold.
+    """
+    summary_kwargs = {'band_points': band_points, 'sample_paths': sample_paths, 'ruin_balance': ruin_balance,
+                      'ruin_drawdown': ruin_drawdown}
+    return ProgressiveRun(
+        sized_equity_curve_paths,
+        (balance, risk_percent, win_percent, win_loss_ratio, num_trades, stop_distance, rounding_method, max_risk,
+         losing_streak, risk_cut, ruin_balance, ruin_drawdown),
+        num_simulations, num_trades + 1, streaming=streaming, memory_budget_mb=memory_budget_mb, seed=seed,
+        workers=workers, summary_kwargs=summary_kwargs,
+    )
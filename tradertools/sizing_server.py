@@ -0,0 +1,217 @@
+"""
+Local HTTP/JSON service with the sizing math of the Position Sizing page, for order-entry tools.
+
+    python -m tradertools.sizing_server --port 8765
+
+Endpoints:
+- POST /size: one order, e.g. {"side": "Long", "entry": 12.50, "stop": 12.10, "risk": 100,
+  "rounding": "Round nearest 10"}. Returns {"shares", "real_risk", "notional", "stop_distance"}, or
+  status 400 with {"error"}.
+- POST /size/batch: {"orders": [order, ...]} plus optional defaults for every order (e.g. "rounding",
+  "risk"). Returns {"results": [...]} in order, each result being the figures of /size or {"error"}.
+- GET /health: {"status": "ok"}.
+
+Instead of "risk", an order can give "account_size" and "risk_percent", like the page. Results are
+exactly those of the page: `size_order` and `size_orders` share `calculate_shares`'s rounding, and both
+endpoints size a risk of 0 to 0 shares. An invalid order gets the same error from both: they check it in
+the same order and share the messages of `tradertools.sizing`.
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+
+import numpy as np
+
+from tradertools.sizing import (LONG_SIDES, MISSING_PRICE_ERROR, NEGATIVE_RISK_ERROR, ROUNDING_METHODS, SHORT_SIDES,
+                               UNKNOWN_SIDE_ERROR, size_order, size_orders)
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Largest accepted request body, in bytes
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+def _risk_amount(order):
+    # Dollar risk of an order: its own risk, or a percentage of the account size like on the page
+    if order.get("risk") is not None:
+        return float(order["risk"])
+    if order.get("account_size") is not None and order.get("risk_percent") is not None:
+        return float(order["account_size"]) * (float(order["risk_percent"]) / 100)
+    raise ValueError("Missing risk: give 'risk', or 'account_size' and 'risk_percent'.")
+
+
+def _rounding_method(order):
+    rounding_method = order.get("rounding", "No Rounding")
+    if rounding_method not in ROUNDING_METHODS:
+        raise ValueError(f"Unknown rounding: {rounding_method}")
+    return rounding_method
+
+
+def _trade_type(side):
+    # Same spellings as the batch endpoint (see `LONG_SIDES` and `SHORT_SIDES`)
+    side = str(side).strip().lower()
+    if side in LONG_SIDES:
+        return "Long"
+    if side in SHORT_SIDES:
+        return "Short"
+    raise ValueError(UNKNOWN_SIDE_ERROR)
+
+
+# Function to answer a single-order request
+def size_single(order):
+    """
+    Sizes the order of a /size request. Raises ValueError (or TypeError) for invalid orders, checked in the
+    order of `size_batch`: risk, rounding, side, prices, then the sign of the risk and the side of the stop.
+    """
+    risk_amount = _risk_amount(order)
+    rounding_method = _rounding_method(order)
+    trade_type = _trade_type(order.get("side", ""))
+    entry, stop = (np.nan if order.get(key) is None else float(order[key]) for key in ("entry", "stop"))
+    if np.isnan(entry) or np.isnan(stop):
+        raise ValueError(MISSING_PRICE_ERROR)
+    if not risk_amount >= 0:
+        raise ValueError(NEGATIVE_RISK_ERROR)
+    return size_order(entry, stop, trade_type, risk_amount, rounding_method)
+
+
+# Function to answer a batch request
+def size_batch(request):
+    """
+    Sizes every order of a /size/batch request, in one vectorized pass per rounding method.
+    """
+    orders = request.get("orders")
+    if not isinstance(orders, list) or not all(isinstance(order, dict) for order in orders):
+        raise ValueError("'orders' must be a list of orders.")
+    defaults = {key: value for key, value in request.items() if key != "orders"}
+    orders = [{**defaults, **order} for order in orders]
+
+    def number(order, key):
+        value = order.get(key)
+        return np.nan if value is None else float(value)
+
+    sides = np.array([str(order.get("side", "")) for order in orders], dtype=str)
+    entry = np.array([number(order, "entry") for order in orders], dtype=float)
+    stop = np.array([number(order, "stop") for order in orders], dtype=float)
+
+    # Orders whose risk cannot be read get the error of /size, which checks the risk first
+    risk_amounts = np.full(len(orders), np.nan)
+    risk_errors = {}
+    for i, order in enumerate(orders):
+        try:
+            risk_amounts[i] = _risk_amount(order)
+        except (TypeError, ValueError) as error:
+            risk_errors[i] = str(error)
+    roundings = np.array([str(order.get("rounding", "No Rounding")) for order in orders], dtype=str)
+
+    results = [None] * len(orders)
+    for rounding_method in np.unique(roundings).tolist():
+        rows = np.flatnonzero(roundings == rounding_method)
+        if rounding_method not in ROUNDING_METHODS:
+            for i in rows.tolist():
+                results[i] = {"error": f"Unknown rounding: {rounding_method}"}
+            continue
+        sized = size_orders(sides[rows], entry[rows], stop[rows], risk_amounts[rows], rounding_method)
+        for j, i in enumerate(rows.tolist()):
+            if sized["error"][j]:
+                results[i] = {"error": str(sized["error"][j])}
+            else:
+                results[i] = {
+                    "shares": int(sized["shares"][j]),
+                    "real_risk": float(sized["real_risk"][j]),
+                    "notional": float(sized["notional"][j]),
+                    "stop_distance": abs(float(entry[i]) - float(stop[i])),
+                }
+    for i, error in risk_errors.items():
+        results[i] = {"error": error}
+    return {"results": results}
+
+
+ROUTES = {
+    "/size": size_single,
+    "/size/batch": size_batch,
+}
+
+
+class SizingRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON request handler of the sizing service. Connections are kept alive between requests and
+    responses are sent without waiting on Nagle's algorithm, so one order costs one round trip.
+    """
+    protocol_version = "HTTP/1.1"
+    server_version = "tradertools-sizing"
+    disable_nagle_algorithm = True
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        else:
+            self._send(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send(413, {"error": "Request body too large."})
+            return
+        body = self.rfile.read(length)
+        route = ROUTES.get(self.path)
+        if route is None:
+            self._send(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        try:
+            request = json.loads(body or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("The request body must be a JSON object.")
+            payload = route(request)
+        except json.JSONDecodeError:
+            self._send(400, {"error": "Invalid JSON."})
+        except KeyError as e:
+            self._send(400, {"error": f"Missing field: {e.args[0]}"})
+        except (ValueError, TypeError) as e:
+            self._send(400, {"error": str(e)})
+        else:
+            self._send(200, payload)
+
+    def log_message(self, format, *args):
+        # No line per request: logging would cost more than sizing the order
+        pass
+
+
+# Function to create the sizing server
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Returns a threaded HTTP server bound to (host, port). Port 0 picks a free port, available as
+    `server.server_address[1]`. Start it with `serve_forever()`.
+    """
+    return ThreadingHTTPServer((host, port), SizingRequestHandler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tradertools.sizing_server",
+                                     description="Serve the position sizing math as a local JSON API.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Address to listen on (default: %(default)s).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on (default: %(default)s).")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port)
+    print(f"Serving position sizing on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
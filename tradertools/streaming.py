@@ -0,0 +1,375 @@
+"""
+Online reductions used to summarize Monte Carlo runs chunk by chunk.
+
+Every reducer here can be updated with a new chunk of paths and merged with
+another reducer of the same shape, so a run never needs the full path matrix
+in memory.
+"""
+import numpy as np
+
+from tradertools.drawdown import drawdown_analytics, drawdown_stats_table
+from tradertools.ruin import ruin_times, summarize_ruin
+
+
+# Rough number of bytes needed per simulated cell (random draws, path values and temporaries)
+BYTES_PER_CELL = 48
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def chunk_size_for_budget(num_columns, memory_budget_mb, bytes_per_cell=BYTES_PER_CELL):
+    """
+    Returns how many paths of `num_columns` values fit in the given memory budget.
+    """
+    budget_bytes = memory_budget_mb * 1024 * 1024
+    return max(1, int(budget_bytes // (max(1, num_columns) * bytes_per_cell)))
+
+
+class _LogStore:
+    """
+    Counts per logarithmic bucket key for a fixed number of columns.
+    The key range grows on demand, so only the observed range is stored.
+    """
+
+    def __init__(self, num_columns):
+        self.num_columns = num_columns
+        self.offset = 0
+        self.counts = np.zeros((num_columns, 0), dtype=np.int64)
+
+    @property
+    def width(self):
+        return self.counts.shape[1]
+
+    def _extend(self, key_min, key_max):
+        if self.width == 0:
+            self.offset = key_min
+            self.counts = np.zeros((self.num_columns, key_max - key_min + 1), dtype=np.int64)
+            return
+        new_offset = min(self.offset, key_min)
+        new_end = max(self.offset + self.width - 1, key_max)
+        if new_offset == self.offset and new_end == self.offset + self.width - 1:
+            return
+        counts = np.zeros((self.num_columns, new_end - new_offset + 1), dtype=np.int64)
+        start = self.offset - new_offset
+        counts[:, start:start + self.width] = self.counts
+        self.offset = new_offset
+        self.counts = counts
+
+    def add(self, keys, columns):
+        if keys.size == 0:
+            return
+        self._extend(int(keys.min()), int(keys.max()))
+        flat_index = columns * self.width + (keys - self.offset)
+        self.counts += np.bincount(flat_index, minlength=self.counts.size).reshape(self.counts.shape)
+
+    def merge(self, other):
+        if other.width == 0:
+            return
+        self._extend(other.offset, other.offset + other.width - 1)
+        start = other.offset - self.offset
+        self.counts[:, start:start + other.width] += other.counts
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative-error guarantees (DDSketch-style logarithmic buckets).
+
+    Values are mapped to buckets of geometrically growing width, so any quantile is returned with a
+    relative error of at most `relative_accuracy`. Bucket counts are integers, which makes merging
+    exact and independent of the order in which chunks are combined.
+
+    Args:
+    - num_columns: Number of independent columns tracked (e.g. one per trade step).
+    - relative_accuracy: Maximum relative error of the returned quantiles.
+    - min_value: Absolute values below this are counted as zero.
+    """
+
+    def __init__(self, num_columns=1, relative_accuracy=0.01, min_value=1e-9):
+        self.num_columns = num_columns
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.positive = _LogStore(num_columns)
+        self.negative = _LogStore(num_columns)
+        self.zero_counts = np.zeros(num_columns, dtype=np.int64)
+        self.counts = np.zeros(num_columns, dtype=np.int64)
+
+    def add(self, values):
+        """
+        Adds a chunk of values with shape (n, num_columns). Non-finite values are ignored.
+        """
+        values = np.asarray(values, dtype=float).reshape(-1, self.num_columns)
+        columns = np.broadcast_to(np.arange(self.num_columns), values.shape)
+        finite = np.isfinite(values)
+        magnitude = np.abs(values)
+        nonzero = finite & (magnitude >= self.min_value)
+
+        self.counts += finite.sum(axis=0)
+        self.zero_counts += (finite & ~nonzero).sum(axis=0)
+
+        for store, mask in ((self.positive, nonzero & (values > 0)), (self.negative, nonzero & (values < 0))):
+            keys = np.ceil(np.log(magnitude[mask]) / self._log_gamma).astype(np.int64)
+            store.add(keys, columns[mask])
+
+    def merge(self, other):
+        """
+        Adds the counts of another sketch with the same settings into this one.
+        """
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zero_counts += other.zero_counts
+        self.counts += other.counts
+
+    def quantiles(self, percentiles):
+        """
+        Returns an array of shape (len(percentiles), num_columns) with the estimated quantiles.
+        Columns without values return NaN.
+        """
+        # Buckets ordered from the most negative value to the largest positive one
+        ordered = np.concatenate([
+            self.negative.counts[:, ::-1],
+            self.zero_counts[:, None],
+            self.positive.counts,
+        ], axis=1)
+        cumulative = np.cumsum(ordered, axis=1)
+        neg_width = self.negative.width
+
+        results = np.full((len(percentiles), self.num_columns), np.nan)
+        for row, percentile in enumerate(percentiles):
+            rank = np.floor(percentile / 100 * (self.counts - 1))
+            index = np.argmax(cumulative > rank[:, None], axis=1)
+
+            neg_keys = self.negative.offset + (neg_width - 1 - index)
+            pos_keys = self.positive.offset + (index - neg_width - 1)
+            with np.errstate(over='ignore'):
+                neg_values = -2 * self.gamma ** neg_keys.astype(float) / (1 + self.gamma)
+                pos_values = 2 * self.gamma ** pos_keys.astype(float) / (1 + self.gamma)
+            values = np.where(index < neg_width, neg_values, np.where(index == neg_width, 0.0, pos_values))
+            results[row] = np.where(self.counts > 0, values, np.nan)
+        return results
+
+    def histogram(self, bins=30, column=0):
+        """
+        Re-bins the sketch buckets of one column into a regular histogram.
+        Returns a (counts, bin_edges) pair like `np.histogram`.
+        """
+        factor = 2 / (1 + self.gamma)
+        positive_keys = self.positive.offset + np.arange(self.positive.width)
+        negative_keys = self.negative.offset + np.arange(self.negative.width)
+        values = np.concatenate([
+            -factor * self.gamma ** negative_keys.astype(float),
+            [0.0],
+            factor * self.gamma ** positive_keys.astype(float),
+        ])
+        weights = np.concatenate([
+            self.negative.counts[column],
+            self.zero_counts[column:column + 1],
+            self.positive.counts[column],
+        ])
+        if weights.sum() == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(1)
+        occupied = weights > 0
+        counts, edges = np.histogram(values[occupied], bins=bins, weights=weights[occupied])
+        return counts.astype(np.int64), edges
+
+
+class RunningMoments:
+    """
+    Running count, mean and variance per column, merged with Chan's parallel update.
+    """
+
+    def __init__(self, num_columns=1):
+        self.count = 0
+        self.mean = np.zeros(num_columns)
+        self.m2 = np.zeros(num_columns)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float).reshape(-1, self.mean.size)
+        if values.shape[0] == 0:
+            return
+        other = RunningMoments(self.mean.size)
+        other.count = values.shape[0]
+        other.mean = values.mean(axis=0)
+        other.m2 = ((values - other.mean) ** 2).sum(axis=0)
+        self.merge(other)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / total)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * (self.count * other.count / total)
+        self.count = total
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return np.zeros_like(self.mean)
+        return self.m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+
+def band_steps_for(num_columns, band_points):
+    """
+    Returns the (at most `band_points`) evenly spaced column indices used for percentile bands.
+    The last column is always included so terminal values are part of the bands.
+    """
+    return np.unique(np.linspace(0, num_columns - 1, min(band_points, num_columns)).round().astype(np.int64))
+
+
+class PathSummary:
+    """
+    Online summary of a set of simulated paths: terminal-value quantiles and moments, per-step
+    percentile bands and mean curve, per-path drawdown analytics, and a small sample of paths for plotting.
+
+    Args:
+    - num_columns: Number of values per path.
+    - band_points: Maximum number of steps at which percentile bands are tracked.
+    - sample_paths: Number of paths kept in full for plotting.
+    - start_value: Value the paths start from when it is not their first column (e.g. 0 for R curves).
+      Used as the initial peak for drawdowns.
+    - risk_percent: For R curves, the percentage of the account risked per R (see `drawdown_analytics`).
+    - unit: Unit of the path values used in the drawdown labels (e.g. 'R' or '$').
+    - relative_accuracy: Relative error of the quantile sketches.
+    - ruin_balance, ruin_drawdown: Ruin threshold of account equity curves (see `tradertools.ruin`).
+      When given, the number of paths ruined at every step is counted as well.
+    """
+
+    def __init__(self, num_columns, band_points=200, sample_paths=100, start_value=None, risk_percent=None,
+                 unit='$', relative_accuracy=0.01, ruin_balance=None, ruin_drawdown=None):
+        self.num_columns = num_columns
+        self.band_steps = band_steps_for(num_columns, band_points)
+        self.sample_paths = sample_paths
+        self.start_value = start_value
+        self.risk_percent = risk_percent
+        self.unit = unit
+        self.samples = []
+        self.num_sampled = 0
+
+        self.terminal_sketch = QuantileSketch(1, relative_accuracy)
+        self.terminal_moments = RunningMoments(1)
+        self.band_sketch = QuantileSketch(self.band_steps.size, relative_accuracy)
+        self.band_moments = RunningMoments(self.band_steps.size)
+        # Per-path drawdown figures: max drawdown in units and in %, underwater duration and losing streak
+        self.drawdown_sketch = QuantileSketch(2, relative_accuracy)
+        self.drawdown_moments = RunningMoments(4)
+        self.drawdown_extremes = np.array([0.0, 0.0, 0, 0])
+        self.recovery_moments = RunningMoments(1)
+        self.unrecovered = 0
+        # Number of paths ruined at every step
+        self.ruin_balance = ruin_balance
+        self.ruin_drawdown = ruin_drawdown
+        self.ruin_counts = np.zeros(num_columns, dtype=np.int64)
+
+    def add(self, paths):
+        """
+        Folds a chunk of paths with shape (n, num_columns) into the summary.
+        """
+        if self.num_sampled < self.sample_paths:
+            kept = paths[:self.sample_paths - self.num_sampled].copy()
+            self.samples.append(kept)
+            self.num_sampled += kept.shape[0]
+
+        terminal = paths[:, -1:]
+        self.terminal_sketch.add(terminal)
+        self.terminal_moments.add(terminal)
+
+        band_values = paths[:, self.band_steps]
+        self.band_sketch.add(band_values)
+        self.band_moments.add(band_values)
+
+        analytics = drawdown_analytics(paths, start_value=self.start_value, risk_percent=self.risk_percent)
+        figures = np.column_stack([
+            analytics['max_drawdown'],
+            analytics['max_drawdown_pct'],
+            analytics['max_drawdown_duration'],
+            analytics['longest_losing_streak'],
+        ])
+        self.drawdown_sketch.add(figures[:, :2])
+        self.drawdown_moments.add(figures)
+        if figures.shape[0]:
+            self._update_extremes(figures.min(axis=0), figures.max(axis=0))
+        recovery = analytics['time_to_recovery']
+        recovered = ~np.isnan(recovery)
+        self.recovery_moments.add(recovery[recovered])
+        self.unrecovered += int((~recovered).sum())
+
+        if self.ruin_balance is not None or self.ruin_drawdown is not None:
+            times = ruin_times(paths, self.ruin_balance, self.ruin_drawdown)
+            ruined = times[~np.isnan(times)].astype(np.int64)
+            self.ruin_counts += np.bincount(ruined, minlength=self.num_columns)
+
+    def _update_extremes(self, minimums, maximums):
+        # Worst drawdowns are minimums, longest duration and streak are maximums
+        self.drawdown_extremes[:2] = np.minimum(self.drawdown_extremes[:2], minimums[:2])
+        self.drawdown_extremes[2:] = np.maximum(self.drawdown_extremes[2:], maximums[2:])
+
+    def merge(self, other):
+        """
+        Merges another summary built from later paths into this one.
+        """
+        for chunk in other.samples:
+            if self.num_sampled >= self.sample_paths:
+                break
+            kept = chunk[:self.sample_paths - self.num_sampled]
+            self.samples.append(kept)
+            self.num_sampled += kept.shape[0]
+        self.terminal_sketch.merge(other.terminal_sketch)
+        self.terminal_moments.merge(other.terminal_moments)
+        self.band_sketch.merge(other.band_sketch)
+        self.band_moments.merge(other.band_moments)
+        self.drawdown_sketch.merge(other.drawdown_sketch)
+        self.drawdown_moments.merge(other.drawdown_moments)
+        self._update_extremes(other.drawdown_extremes, other.drawdown_extremes)
+        self.recovery_moments.merge(other.recovery_moments)
+        self.unrecovered += other.unrecovered
+        self.ruin_counts += other.ruin_counts
+
+    def result(self, percentiles=DEFAULT_PERCENTILES):
+        """
+        Returns the summary as a dictionary of plain numbers and numpy arrays.
+        """
+        band_quantiles = self.band_sketch.quantiles(percentiles)
+        terminal_quantiles = self.terminal_sketch.quantiles(percentiles)[:, 0]
+        if self.samples:
+            sample_paths = np.concatenate(self.samples)
+        else:
+            sample_paths = np.empty((0, self.num_columns))
+
+        num_paths = self.drawdown_moments.count
+        drawdown_medians = self.drawdown_sketch.quantiles([50, 5])
+        drawdown_stats = drawdown_stats_table(
+            self.unit,
+            max_drawdown=float(self.drawdown_extremes[0]),
+            avg_max_drawdown=float(self.drawdown_moments.mean[0]),
+            median_max_drawdown=float(drawdown_medians[0, 0]),
+            max_drawdown_pct=float(self.drawdown_extremes[1]),
+            avg_max_drawdown_pct=float(self.drawdown_moments.mean[1]),
+            p95_max_drawdown_pct=float(drawdown_medians[1, 1]),
+            avg_duration=float(self.drawdown_moments.mean[2]),
+            max_duration=int(self.drawdown_extremes[2]),
+            avg_time_to_recovery=float(self.recovery_moments.mean[0]) if self.recovery_moments.count else float('nan'),
+            unrecovered_pct=self.unrecovered / num_paths * 100 if num_paths else 0.0,
+            avg_losing_streak=float(self.drawdown_moments.mean[3]),
+            max_losing_streak=int(self.drawdown_extremes[3]),
+        )
+        result = {
+            'num_simulations': int(self.terminal_moments.count),
+            'steps': self.band_steps,
+            'bands': {p: band_quantiles[i] for i, p in enumerate(percentiles)},
+            'mean_curve': self.band_moments.mean,
+            'terminal_mean': float(self.terminal_moments.mean[0]),
+            'terminal_std': float(self.terminal_moments.std[0]),
+            'terminal_quantiles': {p: float(terminal_quantiles[i]) for i, p in enumerate(percentiles)},
+            'drawdown_stats': drawdown_stats,
+            'drawdown_histogram': self.drawdown_sketch.histogram(),
+            'sample_paths': sample_paths,
+        }
+        if self.ruin_balance is not None or self.ruin_drawdown is not None:
+            result['ruin'] = summarize_ruin(self.ruin_counts, num_paths)
+        return result
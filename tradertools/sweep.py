@@ -0,0 +1,202 @@
+"""
+Parameter sweeps: one batched Monte Carlo run over a whole grid of system parameters.
+
+Every grid point reuses the same random draws (common random numbers), so differences between
+neighbouring cells come from the parameters and not from sampling noise. The trick that makes the
+batch cheap is that, for a given win percentage, every equity curve is a linear function of the
+running number of wins K_t:
+
+- percent-of-equity risk r: log(equity_t / balance) = t * log(1 - r) + K_t * (log(1 + r * b) - log(1 - r))
+- fixed dollar risk d: equity_t = balance + d * ((b + 1) * K_t - t)
+- R curves: R_t = avg_loss * t + (avg_win - avg_loss) * K_t + cumulative noise
+
+so the uniform draws are thresholded once per win percentage, and every risk level and win/loss ratio
+is a broadcast over the same running win counts. Curves are scanned one trade at a time over all
+grid points and simulations together, keeping the running peak and the worst drawdown, so no
+(grid points x simulations x trades) array is ever built.
+"""
+import numpy as np
+
+from tradertools.streaming import QuantileSketch, chunk_size_for_budget
+
+
+# Memory budget for the random draws and running state of one chunk of simulations
+SWEEP_MEMORY_BUDGET_MB = 64
+_BYTES_PER_CELL = 16
+
+
+def scan_drawdowns(curve_rows, start_value, log_space=False):
+    """
+    Walks curves one trade at a time, keeping only the running peak and the worst drawdown.
+
+    Args:
+    - curve_rows: Iterable of arrays of the same shape (e.g. (grid points, simulations)), one per trade.
+    - start_value: Value the curves start from, used as the initial peak.
+    - log_space: True when the curves are log equity rather than account values.
+
+    Returns:
+    - The values after the last trade and the max drawdown from the running peak of every curve, in %.
+    """
+    peaks = worst = scratch = values = None
+    for values in curve_rows:
+        if peaks is None:
+            peaks = np.maximum(values, start_value)
+            worst = np.zeros_like(values) if log_space else np.ones_like(values)
+            scratch = np.empty_like(values)
+        else:
+            np.maximum(peaks, values, out=peaks)
+        if log_space:
+            np.subtract(values, peaks, out=scratch)
+        else:
+            np.divide(values, peaks, out=scratch)
+        np.minimum(worst, scratch, out=worst)
+
+    if log_space:
+        drawdown = 1 - np.exp(worst)
+    else:
+        drawdown = np.clip(1 - worst, 0.0, 1.0)
+    return values, drawdown * 100
+
+
+def _sweep_chunks(num_simulations, num_trades, batch_size, seed, memory_budget_mb):
+    # Yields a random generator and the number of simulations of every chunk, each chunk from its own child seed
+    chunk_size = chunk_size_for_budget(num_trades + 4 * max(1, batch_size), memory_budget_mb, _BYTES_PER_CELL)
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    num_chunks = -(-num_simulations // chunk_size)
+    for i, child in enumerate(seed_sequence.spawn(num_chunks)):
+        yield np.random.default_rng(child), min(chunk_size, num_simulations - i * chunk_size)
+
+
+def _sweep_result(terminal_sketch, drawdown_sketch, shape, axes):
+    # The relative error of the sketch can take a drawdown quantile just past 100%
+    return {
+        **axes,
+        'median_terminal': terminal_sketch.quantiles([50])[0].reshape(shape),
+        'p95_drawdown_pct': np.clip(drawdown_sketch.quantiles([95])[0], 0.0, 100.0).reshape(shape),
+    }
+
+
+# Function to sweep the Equity Curve Simulator over risk per trade, win % and win/loss ratio
+def sweep_equity_curve(balance, risk_values, win_percent_values, win_loss_ratio_values, num_trades, num_simulations,
+                       risk_type, seed=None, memory_budget_mb=SWEEP_MEMORY_BUDGET_MB):
+    """
+    Simulates `simulate_equity_curve` for every combination of the given parameter values at once.
+
+    Args:
+    - balance: Initial trading balance.
+    - risk_values: Risk per trade values, as a percentage of equity or fixed dollar amounts.
+    - win_percent_values: Percentages of winning trades.
+    - win_loss_ratio_values: Ratios of average win to average loss.
+    - num_trades: Number of trades per simulation.
+    - num_simulations: Number of simulations per grid point. All grid points share the same draws.
+    - risk_type: 'Percentage of Equity' or 'Fixed Dollar Amount'.
+    - seed: Master seed for reproducible runs. None draws fresh entropy.
+    - memory_budget_mb: Approximate memory allowed for one chunk of simulations.
+
+    Returns:
+    - A dictionary with the axis values ('risk', 'win_percent', 'win_loss_ratio') and two arrays of shape
+      (len(risk_values), len(win_percent_values), len(win_loss_ratio_values)): 'median_terminal' (equity)
+      and 'p95_drawdown_pct' (95th percentile of the max drawdown, in %).
+    """
+    risks = np.asarray(risk_values, dtype=float)
+    win_percents = np.asarray(win_percent_values, dtype=float)
+    ratios = np.asarray(win_loss_ratio_values, dtype=float)
+    shape = (risks.size, win_percents.size, ratios.size)
+    terminal_sketch = QuantileSketch(int(np.prod(shape)))
+    drawdown_sketch = QuantileSketch(int(np.prod(shape)))
+
+    # Per (risk, ratio) pair, a curve is intercept + per_trade * t + per_win * K_t
+    risk_grid, ratio_grid = (grid.ravel()[:, None] for grid in np.meshgrid(risks, ratios, indexing='ij'))
+    if risk_type == "Percentage of Equity":
+        per_trade = np.log1p(-risk_grid / 100)
+        per_win = np.log1p(risk_grid / 100 * ratio_grid) - per_trade
+        intercept, log_space = 0.0, True
+    else:  # Fixed Dollar Amount
+        per_trade = -risk_grid
+        per_win = risk_grid * (ratio_grid + 1)
+        intercept, log_space = float(balance), False
+
+    def curve_rows(wins):
+        cumulative_wins = np.zeros(wins.shape[1])
+        for t in range(wins.shape[0]):
+            cumulative_wins += wins[t]
+            values = per_win * cumulative_wins
+            values += intercept + per_trade * (t + 1)
+            yield values
+
+    for rng, chunk_simulations in _sweep_chunks(num_simulations, num_trades, risk_grid.size, seed, memory_budget_mb):
+        # Trades along the first axis: (trades, simulations)
+        uniforms = rng.random((num_trades, chunk_simulations))
+        terminal = np.empty((chunk_simulations,) + shape)
+        drawdown = np.empty((chunk_simulations,) + shape)
+        for j, win_percent in enumerate(win_percents):
+            values, drawdown_pct = scan_drawdowns(curve_rows(uniforms < win_percent / 100), intercept, log_space)
+            if log_space:
+                values = balance * np.exp(values)
+            terminal[:, :, j, :] = values.T.reshape(chunk_simulations, risks.size, ratios.size)
+            drawdown[:, :, j, :] = drawdown_pct.T.reshape(chunk_simulations, risks.size, ratios.size)
+        terminal_sketch.add(terminal.reshape(chunk_simulations, -1))
+        drawdown_sketch.add(drawdown.reshape(chunk_simulations, -1))
+
+    axes = {'risk': risks, 'win_percent': win_percents, 'win_loss_ratio': ratios}
+    return _sweep_result(terminal_sketch, drawdown_sketch, shape, axes)
+
+
+# Function to sweep the Know Your System model over win % and win/loss ratio
+def sweep_monte_carlo(win_ratio_values, win_loss_ratio_values, avg_loss, std_dev, num_trades, num_simulations,
+                      seed=None, risk_percent=1.0, memory_budget_mb=SWEEP_MEMORY_BUDGET_MB):
+    """
+    Simulates `monte_carlo_simulation` for every combination of win ratio and win/loss ratio at once.
+    The average win of a grid point is its win/loss ratio times the size of `avg_loss`.
+
+    Args:
+    - win_ratio_values: Fractions of winning trades (0 to 1).
+    - win_loss_ratio_values: Ratios of average win to average loss.
+    - avg_loss: Average losing trade in R (negative).
+    - std_dev: Standard deviation of every trade in R.
+    - num_trades: Number of trades per simulation.
+    - num_simulations: Number of simulations per grid point. All grid points share the same draws.
+    - seed: Master seed for reproducible runs. None draws fresh entropy.
+    - risk_percent: Percentage of the account risked per R, used to express drawdowns in %.
+    - memory_budget_mb: Approximate memory allowed for one chunk of simulations.
+
+    Returns:
+    - A dictionary with the axis values ('win_ratio', 'win_loss_ratio') and two arrays of shape
+      (len(win_ratio_values), len(win_loss_ratio_values)): 'median_terminal' (R) and 'p95_drawdown_pct'.
+    """
+    win_ratios = np.asarray(win_ratio_values, dtype=float)
+    ratios = np.asarray(win_loss_ratio_values, dtype=float)
+    shape = (win_ratios.size, ratios.size)
+    terminal_sketch = QuantileSketch(int(np.prod(shape)))
+    drawdown_sketch = QuantileSketch(int(np.prod(shape)))
+    risk_fraction = risk_percent / 100
+    win_minus_loss = (ratios * abs(avg_loss) - avg_loss)[:, None]
+
+    def account_rows(wins, noise):
+        # Account values 1 + risk * R_t for every ratio: (ratios, simulations)
+        cumulative_wins = np.zeros(wins.shape[1])
+        cumulative_noise = np.zeros(wins.shape[1])
+        for t in range(wins.shape[0]):
+            cumulative_wins += wins[t]
+            cumulative_noise += noise[t]
+            values = win_minus_loss * cumulative_wins
+            values += avg_loss * (t + 1) + cumulative_noise
+            values *= risk_fraction
+            values += 1
+            yield values
+
+    for rng, chunk_simulations in _sweep_chunks(num_simulations, 2 * num_trades, ratios.size, seed, memory_budget_mb):
+        # Trades along the first axis: (trades, simulations)
+        uniforms = rng.random((num_trades, chunk_simulations))
+        noise = rng.standard_normal((num_trades, chunk_simulations)) * std_dev
+        terminal = np.empty((chunk_simulations,) + shape)
+        drawdown = np.empty((chunk_simulations,) + shape)
+        for j, win_ratio in enumerate(win_ratios):
+            values, drawdown_pct = scan_drawdowns(account_rows(uniforms < win_ratio, noise), 1.0)
+            terminal[:, j, :] = ((values - 1) / risk_fraction).T
+            drawdown[:, j, :] = drawdown_pct.T
+        terminal_sketch.add(terminal.reshape(chunk_simulations, -1))
+        drawdown_sketch.add(drawdown.reshape(chunk_simulations, -1))
+
+    axes = {'win_ratio': win_ratios, 'win_loss_ratio': ratios}
+    return _sweep_result(terminal_sketch, drawdown_sketch, shape, axes)
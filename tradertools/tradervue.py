@@ -0,0 +1,416 @@
+"""
+Conversion of E*Trade Web Alerts and Power E*Trade exports into the Tradervue "Generic Import Format".
+
+An alerts export is read as a stream: the upload is decoded chunk by chunk, and its lines go through
+filtering, parsing, aggregation and formatting stages that are all generators. Only the aggregated
+executions (one per date, time, symbol, price and side) are held in memory, never the file itself,
+and the formatted lines are written one by one to the download buffer.
+
+A Power E*Trade orders export is a CSV, read in chunks of rows and converted column by column with
+pandas.
+"""
+import codecs
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+import re
+
+import numpy as np
+import pandas as pd
+
+from tradertools.fees import covered_dates, transaction_fee_reference, transaction_fees
+
+
+GENERIC_IMPORT_HEADER = "Date,Time,Symbol,Quantity,Price,Side,Commission,TransFee"
+
+# Size of the chunks read from an uploaded file, in characters or bytes
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Alert of an execution: its timestamp (date, time and AM or PM, which is read as a whole), date, side,
+# quantity, symbol and price. The trailing "Executed" of some alerts is left out: it changes neither the
+# groups nor whether a line matches. Repeats are written out (\d\d rather than \d{2}), which the regex
+# engine runs faster
+EXECUTION_PATTERN = re.compile(
+    r'((\d\d/\d\d/\d\d)\s+\d\d:\d\d\s+[AP]M)\s+ET\s+(Buy(?: to cover)?|Sell(?: Short)?)\s+(\d+)\s+([A-Z]+)\s+(?:Executed\s+)?@\s+\$(\d+\.?\d*)'
+)
+
+# Tradervue side of every side of an alert
+ALERT_SIDES = {'Buy': 'Buy', 'Sell': 'Sell', 'Sell Short': 'Short', 'Buy to cover': 'Cover'}
+
+# Number of distinct timestamps whose time is memoized
+ALERT_TIME_CACHE_SIZE = 65536
+
+# Columns of a Power E*Trade orders export used by the conversion
+POWER_ETRADE_COLUMNS = ['Symbol', 'Fill', 'Description', 'Time']
+
+# Number of rows of a Power E*Trade export converted at once
+POWER_ETRADE_CHUNK_ROWS = 200000
+
+def calculate_transaction_fee(quantity, price, side, trade_date):
+    # The FINRA TAF applies to both buys and sells, the SEC fee only to sells (Sell and Short)
+    return transaction_fee_reference(quantity, price, side in ['Sell', 'Short'], trade_date)
+
+
+def parse_trade_line_reference(line):
+    # Plain version of `parse_trade_line`, kept as the reference of its output
+    match = re.search(
+        r'(\d{2}/\d{2}/\d{2})\s+(\d{2}:\d{2})\s+(AM|PM)\s+ET\s+(Buy(?: to cover)?|Sell(?: Short)?)\s+(\d+)\s+([A-Z]+)\s+(?:Executed\s+)?@\s+\$(\d+\.?\d*)\s*(?:Executed)?', line
+    )
+    if match:
+        time_24h = datetime.strptime(
+            f"{match.group(1)} {match.group(2)} {match.group(3)}", '%m/%d/%y %I:%M %p'
+        ).time()
+
+        # Tradervue sides: "Short", "Cover", "Buy" or "Sell"
+        if "Sell Short" in match.group(4):
+            side = "Short"
+        elif "Buy to cover" in match.group(4):
+            side = "Cover"
+        else:
+            side = match.group(4)
+
+        price = Decimal(match.group(7))
+        return {
+            'date': match.group(1),
+            'time': time_24h,
+            'side': side,
+            'quantity': int(match.group(5)),
+            'symbol': match.group(6),
+            'price': price
+        }
+    else:
+        return None
+
+
+@lru_cache(maxsize=None)
+def _alert_date(date):
+    # Raises ValueError for invalid dates, like the conversion of the full timestamp
+    return datetime.strptime(date, '%m/%d/%y').date()
+
+
+@lru_cache(maxsize=None)
+def _alert_time_of_day(hour_minute, meridiem):
+    return datetime.strptime(f"{hour_minute} {meridiem}", '%I:%M %p').time()
+
+
+@lru_cache(maxsize=ALERT_TIME_CACHE_SIZE)
+def _alert_time(timestamp):
+    # Same result as `strptime` of the timestamp "date hour_minute meridiem", with each date and each time of day
+    # converted once: a file has few of them, even when it has many distinct timestamps
+    date, hour_minute, meridiem = timestamp.split()
+    _alert_date(date)
+    return _alert_time_of_day(hour_minute, meridiem)
+
+
+# Function to parse the alert of an execution
+def parse_trade_line(line):
+    """
+    Parses an alert line like "10/21/22 09:31 AM ET Buy 100 AAPL Executed @ $12.50".
+
+    Lines without the literals every execution alert has are rejected before the regex, which is
+    searched once and only captures what the result needs; the conversion of timestamps is memoized.
+    Results are those of `parse_trade_line_reference`.
+
+    Returns:
+    - A dictionary with the date, time, side, quantity, symbol and price, or None.
+    """
+    if 'ET' not in line or '@' not in line or '$' not in line:
+        return None
+    match = EXECUTION_PATTERN.search(line)
+    if match is None:
+        return None
+    timestamp, date, side, quantity, symbol, price = match.groups()
+    return {
+        'date': date,
+        'time': _alert_time(timestamp),
+        'side': ALERT_SIDES[side],
+        'quantity': int(quantity),
+        'symbol': symbol,
+        'price': Decimal(price)
+    }
+
+
+def format_trade(trade, trans_fee=None):
+    # The fee of a single execution is computed here; `format_trades` passes the fees of a whole batch
+    if trans_fee is None:
+        trans_fee = calculate_transaction_fee(trade['quantity'], trade['price'], trade['side'], _alert_date(trade['date']))
+    # Format the time as a string again.
+    time_str = trade['time'].strftime('%H:%M:%S')
+    return ','.join([
+        trade['date'],
+        time_str,
+        trade['symbol'],
+        str(trade['quantity']),
+        str(trade['price']),
+        trade['side'],
+        '0.00',  # Commission is always 0.00 as per the requirement
+        str(trans_fee)  # Transaction Fee instead of Commission
+    ])
+
+
+# Function to format aggregated executions with the fees of the whole batch
+def format_trades(trades, skipped=None):
+    """
+    Formats executions like `format_trade`, with their fees computed at once by `transaction_fees`.
+
+    Args:
+    - trades: Aggregated executions.
+    - skipped: Optional list that receives "date time symbol" of every execution left out because the fee
+      schedules do not cover its date.
+
+    Returns:
+    - A generator of the Generic Import lines.
+    """
+    trades = list(trades)
+    dates = [_alert_date(trade['date']) for trade in trades]
+    covered = covered_dates(dates)
+    if not covered.all():
+        if skipped is not None:
+            skipped.extend(f"{trade['date']} {trade['time'].strftime('%H:%M:%S')} {trade['symbol']}"
+                           for trade, is_covered in zip(trades, covered) if not is_covered)
+        trades = [trade for trade, is_covered in zip(trades, covered) if is_covered]
+        dates = [trade_date for trade_date, is_covered in zip(dates, covered) if is_covered]
+    fees = transaction_fees([trade['quantity'] for trade in trades],
+                            [trade['price'] for trade in trades],
+                            [trade['side'] in ['Sell', 'Short'] for trade in trades],
+                            dates)
+    return (format_trade(trade, fee) for trade, fee in zip(trades, fees))
+
+
+# Function to read the lines of an uploaded or pasted file without loading it whole
+def iter_lines(file_obj, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yields the lines of a binary (UTF-8) or text file object, with their line endings, like
+    `readlines()` would. Bytes are decoded incrementally, so a character split between two chunks is
+    decoded once both have been read.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    while True:
+        chunk = file_obj.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + (decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def execution_lines(lines):
+    # Cancelled and rejected orders are not executions
+    return (line for line in lines if 'Cancelled' not in line and 'Rejected' not in line)
+
+
+def parse_trades(lines):
+    # Parsed executions of the lines that are alerts of one
+    for line in lines:
+        trade = parse_trade_line(line)
+        if trade:
+            yield trade
+
+
+# Function to merge the partial fills of an order
+def aggregate_trades(trades):
+    """
+    Adds up the quantities of executions with the same date, time, symbol, price and side.
+
+    Returns:
+    - The aggregated executions, in the order of their first fill.
+    """
+    aggregated = {}
+    for trade in trades:
+        trade_key = (trade['date'], trade['time'], trade['symbol'], trade['price'], trade['side'])
+        if trade_key in aggregated:
+            aggregated[trade_key]['quantity'] += trade['quantity']
+        else:
+            aggregated[trade_key] = trade
+    return aggregated.values()
+
+
+# Function to convert E*Trade Web Alerts into Generic Import lines
+def convert_alerts(file_obj, skipped=None):
+    """
+    Runs the streaming pipeline over an alerts file: decoding, filtering, parsing, aggregation and
+    formatting. The fees of the aggregated executions are computed in one batch; executions whose date
+    the fee schedules do not cover are left out and, when `skipped` is a list, described in it.
+
+    Returns:
+    - A generator of the Generic Import lines (without the header), one per aggregated execution.
+    """
+    trades = aggregate_trades(parse_trades(execution_lines(iter_lines(file_obj))))
+    yield from format_trades(trades, skipped)
+
+
+def process_power_etrade_csv_reference(file_obj):
+    # Row by row conversion of a Power E*Trade export, kept as the reference of `convert_power_etrade_csv`
+    df = pd.read_csv(file_obj, skiprows=1)
+
+    processed_trades = []
+    for _, row in df.iterrows():
+        processed_trade = process_power_etrade_trade(row)
+        if processed_trade:
+            processed_trades.append(processed_trade)
+    return processed_trades
+
+
+def process_power_etrade_trade(row):
+    # Extract the relevant fields
+    symbol = row['Symbol']
+    fill_info = row['Fill']
+    description = row['Description']
+    time_str = row['Time']
+
+    # Ignore the rows without a fill
+    if fill_info == '--':
+        return None
+
+    # Extract the quantity and the price
+    quantity_str, price_str = fill_info.split('@')
+    quantity = Decimal(re.search(r'(\d+)', quantity_str).group(1))
+    price = Decimal(price_str.strip()) if '@' in fill_info else Decimal('0.00')
+
+    # Tradervue side of the order
+    if "Sell" in description and "to Open" in description:
+        side = "Short"
+    elif "Buy" in description and "to Close" in description:
+        side = "Cover"
+    elif "Buy" in description and "to Open" in description:
+        side = "Buy"
+    elif "Sell" in description and "to Close" in description:
+        side = "Sell"
+    else:
+        side = 'Unknown'
+
+    # Extract the date and the time
+    date = datetime.strptime(time_str.split(',')[0], '%m/%d/%Y').date()
+    time = datetime.strptime(time_str.split(',')[1].strip(), '%I:%M:%S %p').time()
+
+    # Leave out the executions without fee rates
+    if not covered_dates([date])[0]:
+        return None
+
+    trans_fee = calculate_transaction_fee(quantity, price, side, date)
+
+    # Format the execution as a Tradervue line
+    trade_format = ','.join([
+        date.strftime('%m/%d/%Y'),
+        time.strftime('%H:%M:%S'),
+        symbol,
+        str(quantity),
+        str(price),
+        side,
+        '0.00',  # Commission is always 0.00
+        str(trans_fee)  # Transaction Fee
+    ])
+    return trade_format
+
+
+def _power_etrade_sides(description):
+    # Tradervue side of every order, from its description (first matching rule, like the row by row version)
+    description = description.fillna('')
+    sell = description.str.contains('Sell', regex=False)
+    buy = description.str.contains('Buy', regex=False)
+    to_open = description.str.contains('to Open', regex=False)
+    to_close = description.str.contains('to Close', regex=False)
+    return np.select([sell & to_open, buy & to_close, buy & to_open, sell & to_close],
+                     ['Short', 'Cover', 'Buy', 'Sell'], 'Unknown')
+
+
+def _power_etrade_times(time_text):
+    # Tradervue date and time texts of times like "03/04/2024, 09:31:05 AM", and the dates as datetime64: the date
+    # is before the first comma and the time of day, stripped, before the next one. Each distinct date and time
+    # of day is parsed once
+    if not time_text.str.contains(',', regex=False).all():
+        raise ValueError(f"Invalid Time: {time_text[~time_text.str.contains(',', regex=False)].iloc[0]!r}")
+    date_text = time_text.str.replace(r'(?s),.*', '', regex=True)
+    clock_text = time_text.str.replace(r'(?s)^[^,]*,', '', regex=True).str.replace(r'(?s),.*', '', regex=True).str.strip()
+    date_codes, dates = pd.factorize(date_text)
+    clock_codes, clocks = pd.factorize(clock_text)
+    dates = pd.to_datetime(pd.Series(dates), format='%m/%d/%Y')
+    clocks = pd.to_datetime(pd.Series(clocks), format='%I:%M:%S %p').dt.strftime('%H:%M:%S')
+    return (dates.dt.strftime('%m/%d/%Y').to_numpy(dtype=object)[date_codes],
+            clocks.to_numpy(dtype=object)[clock_codes],
+            dates.to_numpy(dtype='datetime64[D]')[date_codes])
+
+
+def _power_etrade_lines(orders, skipped=None):
+    # Generic Import lines of a chunk of a Power E*Trade export, in the order of its rows. Orders whose date the
+    # fee schedules do not cover are left out, and described in `skipped` when it is a list
+    orders = orders[orders['Fill'] != '--']
+    if orders.empty:
+        return []
+    dates, clocks, trade_dates = _power_etrade_times(orders['Time'])
+    covered = covered_dates(trade_dates)
+    if not covered.all():
+        if skipped is not None:
+            symbols = orders['Symbol'].fillna('').to_numpy(dtype=object)
+            skipped.extend((dates + ' ' + clocks + ' ' + symbols)[~covered].tolist())
+        orders, dates, clocks, trade_dates = orders[covered], dates[covered], clocks[covered], trade_dates[covered]
+        if orders.empty:
+            return []
+
+    # Fills read "<quantity> @ <price>", with a single '@'. The quantity is the first number before it, read
+    # with a regex only when that part is not just a number
+    fill = orders['Fill']
+    invalid = fill.isna() | (fill.str.count('@') != 1)
+    if invalid.any():
+        raise ValueError(f"Invalid Fill: {fill[invalid].iloc[0]!r}")
+    quantity_text = fill.str.replace(r'(?s)@.*', '', regex=True)
+    price_text = fill.str.replace(r'(?s)^[^@]*@', '', regex=True).str.strip()
+    irregular = ~quantity_text.str.fullmatch(r'\s*[0-9]+\s*')
+    if irregular.any():
+        quantity_text[irregular] = quantity_text[irregular].str.extract(r'(\d+)', expand=False)
+        if quantity_text.isna().any():
+            raise ValueError(f"Invalid Fill: {fill[quantity_text.isna()].iloc[0]!r}")
+    quantity = quantity_text.str.strip().astype('int64')
+    side = _power_etrade_sides(orders['Description'])
+
+    # Every distinct price is read once; the fees of the chunk are computed at once, at the rates of each trade date
+    prices = {text: Decimal(text) for text in price_text.unique()}
+    fees = transaction_fees(quantity.to_numpy(), price_text.to_numpy(dtype=object),
+                            np.isin(side, ['Sell', 'Short']), trade_dates)
+
+    lines = (dates + ',' + clocks + ','
+             + orders['Symbol'].fillna('').to_numpy(dtype=object) + ','
+             + quantity.astype(str).to_numpy(dtype=object) + ','
+             + price_text.map({text: str(price) for text, price in prices.items()}).to_numpy(dtype=object) + ','
+             + side.astype(object) + ',0.00,' + fees)
+    return lines.tolist()
+
+
+# Function to convert a Power E*Trade orders export into Generic Import lines
+def convert_power_etrade_csv(file_obj, chunk_rows=POWER_ETRADE_CHUNK_ROWS, skipped=None):
+    """
+    Converts the filled orders of a Power E*Trade CSV export (after its title line), reading only the
+    needed columns, `chunk_rows` rows at a time. Lines are those of `process_power_etrade_csv_reference`;
+    orders whose date the fee schedules do not cover are left out and, when `skipped` is a list,
+    described in it.
+
+    Returns:
+    - A generator of the Generic Import lines (without the header), one per filled order.
+    """
+    chunks = pd.read_csv(file_obj, skiprows=1, usecols=POWER_ETRADE_COLUMNS, dtype=str, chunksize=chunk_rows)
+    for chunk in chunks:
+        yield from _power_etrade_lines(chunk, skipped)
+
+
+# Function to write Generic Import lines to a text buffer
+def write_generic_import(lines, buffer):
+    """
+    Writes the header and the given lines to `buffer` as they are produced, separated by newlines
+    (no newline at the end). Nothing, not even the header, is written when there are no lines.
+
+    Returns:
+    - The number of lines written, without the header.
+    """
+    num_lines = 0
+    for line in lines:
+        if num_lines == 0:
+            buffer.write(GENERIC_IMPORT_HEADER)
+        buffer.write('\n')
+        buffer.write(line)
+        num_lines += 1
+    return num_lines